@@ -1,9 +1,8 @@
-from allowance.ui.main_window import MainWindow
+from allowance.ui.main_window import run_app
 
 def main():
     # Initialize the main window of the application
-    main_window = MainWindow()
-    main_window.run()
+    return run_app()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
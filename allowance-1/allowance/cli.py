@@ -1,4 +1,4 @@
-from allowance.ui.main_window import MainWindow
+from allowance.ui.main_window import run_app
 import argparse
 
 def main():
@@ -7,8 +7,7 @@ def main():
     args = parser.parse_args()
 
     if args.ui:
-        window = MainWindow()
-        window.run()
+        run_app()
     else:
         print("No UI option selected. Use --ui to launch the user interface.")
 
@@ -1,11 +1,62 @@
-from typing import List, Dict
+from collections.abc import Sequence
+from typing import Dict, List, Optional
+import atexit
 import json
 import os
+import threading
+import weakref
+
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+# Write-behind stores that still need flushing when the interpreter exits.
+_open_stores = weakref.WeakSet()
+
+
+class TransactionsView(Sequence):
+    """Read-only view of the stored transactions; it does not copy them."""
+
+    def __init__(self, transactions: List[Dict]):
+        self._transactions = transactions
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [dict(item) for item in self._transactions[index]]
+        return dict(self._transactions[index])
+
+    def __len__(self) -> int:
+        return len(self._transactions)
+
+    def __repr__(self) -> str:
+        return f"TransactionsView({len(self)} transactions)"
+
 
 class DataStore:
-    def __init__(self, filename: str):
+    """JSON-backed store for the balance and transactions.
+
+    With write_behind, mutations only mark the store dirty; a background timer
+    writes the file once per flush_interval however many changes were made,
+    and flush(), close() (or leaving a with block) and interpreter exit write
+    whatever is still pending. Without it every mutation is saved at once.
+    """
+
+    def __init__(self, filename: str, write_behind: bool = False,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL):
         self.filename = filename
+        self.write_behind = write_behind
+        self.flush_interval = flush_interval
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._dirty = False
         self.data = self.load_data()
+        if write_behind:
+            _open_stores.add(self)
+
+    def __enter__(self) -> "DataStore":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
 
     def load_data(self) -> Dict:
         if os.path.exists(self.filename):
@@ -14,21 +65,79 @@ class DataStore:
         return {}
 
     def save_data(self) -> None:
-        with open(self.filename, 'w') as file:
-            json.dump(self.data, file, indent=4)
+        # Only the snapshot is taken under the data lock, so mutations are not
+        # held up by the disk; writes are serialized so a newer snapshot is
+        # never overwritten by an older one.
+        with self._write_lock:
+            with self._lock:
+                text = json.dumps(self.data, indent=4)
+                self._dirty = False
+            try:
+                # Write a sibling file and rename it so a crash mid-write
+                # never leaves a truncated store behind.
+                temporary = f"{self.filename}.tmp"
+                with open(temporary, 'w') as file:
+                    file.write(text)
+                os.replace(temporary, self.filename)
+            except OSError:
+                self._dirty = True
+                raise
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+    def flush(self) -> bool:
+        """Write pending changes now; returns False if there were none."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty:
+                return False
+        self.save_data()
+        return True
+
+    def close(self) -> None:
+        self.flush()
+        _open_stores.discard(self)
+
+    def _changed(self) -> None:
+        if not self.write_behind:
+            self.save_data()
+            return
+        with self._lock:
+            self._dirty = True
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_in_background)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def _flush_in_background(self) -> None:
+        with self._lock:
+            self._timer = None
+            if not self._dirty:
+                return
+        self.save_data()
 
     def get_balance(self) -> float:
         return self.data.get('balance', 0.0)
 
     def update_balance(self, amount: float) -> None:
-        self.data['balance'] = self.get_balance() + amount
-        self.save_data()
+        with self._lock:
+            self.data['balance'] = self.get_balance() + amount
+        self._changed()
 
     def add_transaction(self, transaction: Dict) -> None:
-        if 'transactions' not in self.data:
-            self.data['transactions'] = []
-        self.data['transactions'].append(transaction)
-        self.save_data()
+        with self._lock:
+            self.data.setdefault('transactions', []).append(dict(transaction))
+        self._changed()
+
+    def get_transactions(self) -> TransactionsView:
+        return TransactionsView(self.data.setdefault('transactions', []))
+
 
-    def get_transactions(self) -> List[Dict]:
-        return self.data.get('transactions', [])
\ No newline at end of file
+@atexit.register
+def _flush_open_stores() -> None:
+    for store in list(_open_stores):
+        store.flush()
@@ -1,21 +1,70 @@
+from datetime import date
 from decimal import Decimal
+from typing import Dict, Iterable, Optional
+
+from allowance.services.money import Amount, from_cents, sum_cents, to_cents
+from allowance.services.schedule import AllowanceRule, RecurringSchedule
+
 
 class FinanceService:
-    def __init__(self):
-        self.balance = Decimal('0.00')
+    """Tracks a balance as integer cents; amounts are Decimal at the edges.
+
+    Recurring allowances are described by rules in a RecurringSchedule.
+    Deposits are never stored one by one: apply_schedule credits everything
+    due up to a date at once, and balance_at/projected_allocations answer for
+    any future date in closed form.
+    """
+
+    def __init__(self, schedule: Optional[RecurringSchedule] = None):
+        self.balance_cents = 0
+        self.schedule = schedule or RecurringSchedule()
+        self.allocations_cents: Dict[str, int] = {}
+        self.applied_until: Optional[date] = None
+
+    @property
+    def balance(self) -> Decimal:
+        return from_cents(self.balance_cents)
 
-    def add_transaction(self, amount: Decimal):
-        self.balance += amount
+    def add_transaction(self, amount: Amount):
+        self.balance_cents += to_cents(amount)
 
-    def subtract_transaction(self, amount: Decimal):
-        self.balance -= amount
+    def subtract_transaction(self, amount: Amount):
+        self.balance_cents -= to_cents(amount)
+
+    def add_transactions(self, amounts: Iterable[Amount]):
+        self.balance_cents += sum_cents(to_cents(amount) for amount in amounts)
 
     def get_balance(self) -> Decimal:
         return self.balance
 
-    def calculate_allowance(self, allowance_rate: Decimal, period: int) -> Decimal:
-        return allowance_rate * period
+    def calculate_allowance(self, allowance_rate: Amount, period: int) -> Decimal:
+        return from_cents(to_cents(allowance_rate) * period)
+
+    def apply_allowance(self, allowance_rate: Amount, period: int):
+        self.balance_cents += to_cents(allowance_rate) * period
+
+    def add_schedule(self, rule: AllowanceRule) -> AllowanceRule:
+        return self.schedule.add(rule)
+
+    def apply_schedule(self, until: date) -> Decimal:
+        """Credit the scheduled deposits due up to until; returns their total."""
+        if self.applied_until is not None and until <= self.applied_until:
+            return Decimal("0.00")
+        deposited = self.schedule.total_cents(until, self.applied_until)
+        for name, cents in self.schedule.allocations_cents(until, self.applied_until).items():
+            self.allocations_cents[name] = self.allocations_cents.get(name, 0) + cents
+        self.balance_cents += deposited
+        self.applied_until = until
+        return from_cents(deposited)
+
+    def balance_at(self, when: date) -> Decimal:
+        """Balance on when, counting scheduled deposits not yet applied."""
+        upcoming = self.schedule.total_cents(when, self.applied_until)
+        return from_cents(self.balance_cents + upcoming)
 
-    def apply_allowance(self, allowance_rate: Decimal, period: int):
-        allowance = self.calculate_allowance(allowance_rate, period)
-        self.add_transaction(allowance)
\ No newline at end of file
+    def projected_allocations(self, when: date) -> Dict[str, Decimal]:
+        """What each category will have received from the schedule by when."""
+        totals = dict(self.allocations_cents)
+        for name, cents in self.schedule.allocations_cents(when, self.applied_until).items():
+            totals[name] = totals.get(name, 0) + cents
+        return {name: from_cents(cents) for name, cents in totals.items()}
@@ -0,0 +1,28 @@
+from decimal import ROUND_HALF_EVEN, Decimal
+from typing import Iterable, Union
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+Amount = Union[int, float, Decimal, str]
+
+
+def to_cents(amount: Amount) -> int:
+    if isinstance(amount, int):
+        return amount * 100
+    if isinstance(amount, float):
+        return round(amount * 100)
+    return int((Decimal(amount) * 100).to_integral_value(rounding=ROUND_HALF_EVEN))
+
+
+def from_cents(cents: int) -> Decimal:
+    return Decimal(cents).scaleb(-2)
+
+
+def sum_cents(cents: Iterable[int]) -> int:
+    if numpy is not None:
+        values = numpy.fromiter(cents, dtype=numpy.int64)
+        return int(values.sum())
+    return sum(cents)
@@ -0,0 +1,180 @@
+import calendar
+import heapq
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+from decimal import Decimal
+from typing import Dict, Iterator, Mapping, Optional, Tuple
+
+from allowance.services.money import Amount, from_cents, to_cents
+
+PERIODS = ("week", "month")
+UNALLOCATED = "unallocated"
+
+
+def divide_cents(total: int, weights: Mapping[str, int]) -> Dict[str, int]:
+    """Divide total cents by integer weights; the parts always add up to total."""
+    weight_sum = sum(weights.values())
+    if weight_sum <= 0:
+        return {UNALLOCATED: total}
+    shares = {name: total * weight // weight_sum for name, weight in weights.items()}
+    # Hand the cents lost to rounding to the largest remainders.
+    remainders = sorted(
+        weights, key=lambda name: (total * weights[name]) % weight_sum, reverse=True
+    )
+    for name in remainders[: total - sum(shares.values())]:
+        shares[name] += 1
+    return shares
+
+
+@dataclass
+class AllowanceRule:
+    """A deposit of amount_cents every `every` weeks or months from start.
+
+    Monthly deposits fall on start's day of the month, or on the last day of
+    shorter months. split_cents says how each deposit is divided between
+    categories and must add up to amount_cents.
+    """
+
+    amount_cents: int
+    period: str = "week"
+    start: date = field(default_factory=date.today)
+    every: int = 1
+    end: Optional[date] = None
+    split_cents: Dict[str, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.period not in PERIODS:
+            raise ValueError(f"Unknown period: {self.period}")
+        if self.every < 1:
+            raise ValueError("A rule must repeat at least every 1 period.")
+        if self.amount_cents < 0:
+            raise ValueError("Deposits must be non-negative.")
+        if not self.split_cents:
+            self.split_cents = {UNALLOCATED: self.amount_cents}
+        if sum(self.split_cents.values()) != self.amount_cents:
+            raise ValueError("The split must add up to the deposit amount.")
+
+    @classmethod
+    def create(
+        cls,
+        amount: Amount,
+        period: str = "week",
+        start: Optional[date] = None,
+        split: Optional[Mapping[str, Amount]] = None,
+        **options,
+    ) -> "AllowanceRule":
+        """Build a rule from currency amounts; split values are used as weights."""
+        cents = to_cents(amount)
+        weights = {name: to_cents(value) for name, value in (split or {}).items()}
+        return cls(
+            amount_cents=cents,
+            period=period,
+            start=start or date.today(),
+            split_cents=divide_cents(cents, weights) if weights else {},
+            **options,
+        )
+
+    @classmethod
+    def from_plan(cls, plan, period: str = "week", start: Optional[date] = None, **options):
+        """Deposit a plan's income every period, split like its allocation.
+
+        plan is anything with income and allocation attributes, such as the
+        planner's AllowancePlan; unallocated income is kept under "unallocated".
+        """
+        income = to_cents(plan.income)
+        split = {name: to_cents(value) for name, value in plan.allocation.items()}
+        if income > sum(split.values()):
+            split[UNALLOCATED] = income - sum(split.values())
+        return cls(
+            amount_cents=income,
+            period=period,
+            start=start or date.today(),
+            split_cents=split,
+            **options,
+        )
+
+    def occurrence(self, index: int) -> date:
+        """Date of deposit number index (0 is start), in O(1)."""
+        if self.period == "week":
+            return self.start + timedelta(weeks=index * self.every)
+        year, month = divmod(self.start.month - 1 + index * self.every, 12)
+        year += self.start.year
+        day = min(self.start.day, calendar.monthrange(year, month + 1)[1])
+        return date(year, month + 1, day)
+
+    def count_until(self, when: date) -> int:
+        """Number of deposits made on or before when, in O(1)."""
+        if self.end is not None and when > self.end:
+            when = self.end
+        if when < self.start:
+            return 0
+        if self.period == "week":
+            return (when - self.start).days // (7 * self.every) + 1
+        months = (when.year - self.start.year) * 12 + when.month - self.start.month
+        last = months // self.every
+        if self.occurrence(last) > when:
+            last -= 1
+        return last + 1
+
+    def count_between(self, after: Optional[date], until: date) -> int:
+        """Number of deposits in the half-open range (after, until]."""
+        done = self.count_until(after) if after is not None else 0
+        return max(0, self.count_until(until) - done)
+
+    def iter_deposits(self, after: Optional[date] = None) -> Iterator[Tuple[date, int]]:
+        """Yield (date, cents) for each deposit after after, lazily and forever
+        unless the rule has an end."""
+        index = self.count_until(after) if after is not None else 0
+        while True:
+            when = self.occurrence(index)
+            if self.end is not None and when > self.end:
+                return
+            yield when, self.amount_cents
+            index += 1
+
+
+class RecurringSchedule:
+    """A set of allowance rules answered in closed form at any date."""
+
+    def __init__(self, rules=()):
+        self.rules = list(rules)
+
+    def add(self, rule: AllowanceRule) -> AllowanceRule:
+        self.rules.append(rule)
+        return rule
+
+    def total_cents(self, until: date, after: Optional[date] = None) -> int:
+        return sum(
+            rule.count_between(after, until) * rule.amount_cents for rule in self.rules
+        )
+
+    def allocations_cents(self, until: date, after: Optional[date] = None) -> Dict[str, int]:
+        totals: Dict[str, int] = {}
+        for rule in self.rules:
+            count = rule.count_between(after, until)
+            if not count:
+                continue
+            for name, cents in rule.split_cents.items():
+                totals[name] = totals.get(name, 0) + count * cents
+        return totals
+
+    def iter_deposits(
+        self, after: Optional[date] = None, until: Optional[date] = None
+    ) -> Iterator[Tuple[date, Dict[str, Decimal]]]:
+        """Yield upcoming deposits in date order without materializing them."""
+        streams = [rule.iter_deposits(after) for rule in self.rules]
+        heads = []
+        for order, stream in enumerate(streams):
+            first = next(stream, None)
+            if first is not None:
+                heads.append((first[0], order))
+        heapq.heapify(heads)
+        while heads:
+            when, order = heapq.heappop(heads)
+            if until is not None and when > until:
+                return
+            split = self.rules[order].split_cents
+            yield when, {name: from_cents(cents) for name, cents in split.items()}
+            following = next(streams[order], None)
+            if following is not None:
+                heapq.heappush(heads, (following[0], order))
@@ -1,21 +1,37 @@
 from PyQt5.QtWidgets import QWidget, QLabel, QVBoxLayout
 
+from allowance.services.money import from_cents, to_cents
+
+
 class BalanceView(QWidget):
+    """Shows the balance, kept as integer cents and updated by deltas."""
+
     def __init__(self, balance=0.0):
         super().__init__()
-        self.balance = balance
+        self.balance_cents = to_cents(balance)
         self.init_ui()
 
+    @property
+    def balance(self):
+        return from_cents(self.balance_cents)
+
     def init_ui(self):
         layout = QVBoxLayout()
-        
-        self.balance_label = QLabel(f"Current Balance: ${self.balance:.2f}")
+
+        self.balance_label = QLabel(self._text())
         layout.addWidget(self.balance_label)
 
         self.setLayout(layout)
         self.setWindowTitle("Balance View")
-        self.show()
+
+    def _text(self):
+        return f"Current Balance: ${self.balance:.2f}"
 
     def update_balance(self, new_balance):
-        self.balance = new_balance
-        self.balance_label.setText(f"Current Balance: ${self.balance:.2f}")
\ No newline at end of file
+        self.balance_cents = to_cents(new_balance)
+        self.balance_label.setText(self._text())
+
+    def add_amount(self, amount):
+        """Apply one transaction to the shown total without recomputing it."""
+        self.balance_cents += to_cents(amount)
+        self.balance_label.setText(self._text())
@@ -1,40 +1,49 @@
-from tkinter import Frame, Label, Entry, Button, StringVar, messagebox
+from PyQt5.QtCore import pyqtSignal
+from PyQt5.QtWidgets import QFormLayout, QLineEdit, QMessageBox, QPushButton, QWidget
 
-class TransactionForm(Frame):
-    def __init__(self, master=None):
-        super().__init__(master)
-        self.master = master
+from allowance.services.money import to_cents
+
+
+class TransactionForm(QWidget):
+    """Collects an amount and description and emits them as a transaction."""
+
+    submitted = pyqtSignal(dict)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
         self.create_widgets()
 
     def create_widgets(self):
-        self.amount_label = Label(self, text="Amount:")
-        self.amount_label.grid(row=0, column=0)
+        layout = QFormLayout()
 
-        self.amount_var = StringVar()
-        self.amount_entry = Entry(self, textvariable=self.amount_var)
-        self.amount_entry.grid(row=0, column=1)
+        self.amount_entry = QLineEdit()
+        layout.addRow("Amount:", self.amount_entry)
 
-        self.description_label = Label(self, text="Description:")
-        self.description_label.grid(row=1, column=0)
+        self.description_entry = QLineEdit()
+        layout.addRow("Description:", self.description_entry)
 
-        self.description_var = StringVar()
-        self.description_entry = Entry(self, textvariable=self.description_var)
-        self.description_entry.grid(row=1, column=1)
+        self.submit_button = QPushButton("Submit")
+        self.submit_button.clicked.connect(self.submit_transaction)
+        layout.addRow(self.submit_button)
 
-        self.submit_button = Button(self, text="Submit", command=self.submit_transaction)
-        self.submit_button.grid(row=2, columnspan=2)
+        self.setLayout(layout)
 
     def submit_transaction(self):
-        amount = self.amount_var.get()
-        description = self.description_var.get()
-        
+        amount = self.amount_entry.text().strip()
+        description = self.description_entry.text().strip()
+
         if not amount or not description:
-            messagebox.showerror("Input Error", "Please fill in all fields.")
-            return
-        
-        # Here you would typically handle the transaction submission logic
-        # For example, saving to a database or processing the transaction
-        
-        messagebox.showinfo("Success", f"Transaction submitted:\nAmount: {amount}\nDescription: {description}")
-        self.amount_var.set("")
-        self.description_var.set("")
\ No newline at end of file
+            QMessageBox.warning(self, "Input Error", "Please fill in all fields.")
+            return False
+        try:
+            cents = to_cents(amount)
+        except (ArithmeticError, ValueError):
+            # Decimal rejects text with InvalidOperation, but "nan" gets as far
+            # as int(), which raises ValueError.
+            QMessageBox.warning(self, "Input Error", f"Invalid amount: {amount}")
+            return False
+
+        self.submitted.emit({"amount": cents / 100, "description": description})
+        self.amount_entry.clear()
+        self.description_entry.clear()
+        return True
@@ -0,0 +1,98 @@
+from typing import Dict, Sequence
+
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, QObject, QRunnable, Qt, pyqtSignal
+
+from allowance.services.datastore import DataStore
+
+PAGE_SIZE = 500
+COLUMNS = (("date", "Date"), ("description", "Description"), ("amount", "Amount"))
+
+
+class TransactionTableModel(QAbstractTableModel):
+    """Table model over a transaction sequence that exposes it a page at a time.
+
+    Views only see the rows fetched so far; Qt asks for more through
+    canFetchMore/fetchMore as the user scrolls, so a ledger with a million
+    rows costs the same to show as one with a few hundred.
+    """
+
+    def __init__(self, transactions: Sequence[Dict] = (), page_size: int = PAGE_SIZE, parent=None):
+        super().__init__(parent)
+        self.page_size = page_size
+        self._transactions = transactions
+        self._fetched = min(page_size, len(transactions))
+
+    def set_transactions(self, transactions: Sequence[Dict]) -> None:
+        self.beginResetModel()
+        self._transactions = transactions
+        self._fetched = min(self.page_size, len(transactions))
+        self.endResetModel()
+
+    def rowCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else self._fetched
+
+    def columnCount(self, parent=QModelIndex()) -> int:
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= self._fetched:
+            return None
+        key = COLUMNS[index.column()][0]
+        if role == Qt.DisplayRole:
+            value = self._transactions[index.row()].get(key, "")
+            if key == "amount":
+                return f"{float(value or 0):.2f}"
+            return str(value)
+        if role == Qt.TextAlignmentRole and key == "amount":
+            return int(Qt.AlignRight | Qt.AlignVCenter)
+        return None
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return COLUMNS[section][1]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()) -> bool:
+        return not parent.isValid() and self._fetched < len(self._transactions)
+
+    def fetchMore(self, parent=QModelIndex()) -> None:
+        if parent.isValid():
+            return
+        count = min(self.page_size, len(self._transactions) - self._fetched)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self._fetched, self._fetched + count - 1)
+        self._fetched += count
+        self.endInsertRows()
+
+    def transaction_added(self) -> None:
+        """Show a row appended to the underlying sequence if it is in view.
+
+        Rows past the fetched pages are picked up by fetchMore later.
+        """
+        if self._fetched == len(self._transactions) - 1:
+            self.beginInsertRows(QModelIndex(), self._fetched, self._fetched)
+            self._fetched += 1
+            self.endInsertRows()
+
+
+class LoaderSignals(QObject):
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+
+
+class LedgerLoader(QRunnable):
+    """Opens a DataStore on a QThreadPool worker and hands it to the UI thread."""
+
+    def __init__(self, filename: str):
+        super().__init__()
+        self.filename = filename
+        self.signals = LoaderSignals()
+
+    def run(self) -> None:
+        try:
+            store = DataStore(self.filename, write_behind=True)
+        except (OSError, ValueError) as exc:
+            self.signals.failed.emit(str(exc))
+            return
+        self.signals.loaded.emit(store)
@@ -1,12 +1,24 @@
-from PyQt5.QtWidgets import QApplication, QMainWindow, QVBoxLayout, QWidget
+from datetime import date
+import os
+import sys
+
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication, QMainWindow, QTableView, QVBoxLayout, QWidget
 from allowance.ui.components.balance_view import BalanceView
 from allowance.ui.components.transaction_form import TransactionForm
+from allowance.ui.components.transaction_table import LedgerLoader, TransactionTableModel
+
+DEFAULT_DATA_FILE = os.path.join(os.path.expanduser("~"), ".allowance-ui.json")
+
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    """Main window; the ledger is opened on a worker thread so it shows at once."""
+
+    def __init__(self, filename=DEFAULT_DATA_FILE, thread_pool=None):
         super().__init__()
         self.setWindowTitle("Allowance CLI")
         self.setGeometry(100, 100, 800, 600)
+        self.store = None
 
         self.central_widget = QWidget()
         self.setCentralWidget(self.central_widget)
@@ -16,13 +28,55 @@ class MainWindow(QMainWindow):
 
         self.balance_view = BalanceView()
         self.transaction_form = TransactionForm()
+        self.transaction_form.setEnabled(False)
+        self.transaction_form.submitted.connect(self.record_transaction)
+        self.transaction_model = TransactionTableModel()
+        self.transaction_table = QTableView()
+        self.transaction_table.setModel(self.transaction_model)
 
         self.layout.addWidget(self.balance_view)
         self.layout.addWidget(self.transaction_form)
+        self.layout.addWidget(self.transaction_table)
 
-if __name__ == "__main__":
-    import sys
-    app = QApplication(sys.argv)
-    window = MainWindow()
+        self.statusBar().showMessage("Loading transactions...")
+        self.loader = LedgerLoader(filename)
+        self.loader.signals.loaded.connect(self.ledger_loaded)
+        self.loader.signals.failed.connect(self.ledger_failed)
+        (thread_pool or QThreadPool.globalInstance()).start(self.loader)
+
+    def ledger_loaded(self, store):
+        self.store = store
+        self.balance_view.update_balance(store.get_balance())
+        self.transaction_model.set_transactions(store.get_transactions())
+        self.transaction_form.setEnabled(True)
+        self.statusBar().showMessage(f"{len(store.get_transactions())} transactions", 3000)
+
+    def ledger_failed(self, message):
+        self.statusBar().showMessage(f"Could not load transactions: {message}")
+
+    def record_transaction(self, transaction):
+        transaction = {"date": date.today().isoformat(), **transaction}
+        self.store.add_transaction(transaction)
+        self.store.update_balance(transaction["amount"])
+        self.transaction_model.transaction_added()
+        self.balance_view.add_amount(transaction["amount"])
+
+    def closeEvent(self, event):
+        if self.store is not None:
+            self.store.close()
+        super().closeEvent(event)
+
+    def run(self):
+        self.show()
+        return QApplication.instance().exec_()
+
+
+def run_app(filename=DEFAULT_DATA_FILE):
+    app = QApplication.instance() or QApplication(sys.argv)
+    window = MainWindow(filename)
     window.show()
-    sys.exit(app.exec_())
\ No newline at end of file
+    return app.exec_()
+
+
+if __name__ == "__main__":
+    sys.exit(run_app())
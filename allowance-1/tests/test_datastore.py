@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from allowance.services.datastore import DataStore
+
+
+class TestDataStore(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "data.json")
+
+    def read(self):
+        with open(self.filename) as file:
+            return json.load(file)
+
+    def test_immediate_mode_saves_every_change(self):
+        store = DataStore(self.filename)
+        store.update_balance(5.0)
+        self.assertEqual(self.read(), {"balance": 5.0})
+
+    def test_write_behind_coalesces_changes(self):
+        with mock.patch.object(DataStore, "save_data", autospec=True,
+                               side_effect=DataStore.save_data) as save:
+            with DataStore(self.filename, write_behind=True, flush_interval=60) as store:
+                for amount in range(12):
+                    store.add_transaction({"amount": amount})
+                    store.update_balance(amount)
+                self.assertTrue(store.dirty)
+                self.assertFalse(os.path.exists(self.filename))
+            self.assertEqual(save.call_count, 1)
+        data = self.read()
+        self.assertEqual(len(data["transactions"]), 12)
+        self.assertEqual(data["balance"], 66)
+
+    def test_background_flush_after_interval(self):
+        store = DataStore(self.filename, write_behind=True, flush_interval=0.01)
+        store.update_balance(3.0)
+        deadline = time.monotonic() + 5
+        while store.dirty and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(self.read(), {"balance": 3.0})
+        self.assertFalse(store.flush())
+
+    def test_transactions_view_is_read_only(self):
+        store = DataStore(self.filename, write_behind=True)
+        transaction = {"amount": 1}
+        store.add_transaction(transaction)
+        transaction["amount"] = 2
+        view = store.get_transactions()
+        self.assertEqual(list(view), [{"amount": 1}])
+        view[0]["amount"] = 3
+        self.assertEqual(store.get_transactions()[0], {"amount": 1})
+        self.assertFalse(hasattr(view, "append"))
+        store.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+import unittest
+from datetime import date
+from decimal import Decimal
+from types import SimpleNamespace
+
+from allowance.services.finance import FinanceService
+from allowance.services.schedule import AllowanceRule, RecurringSchedule
+
+
+class TestFinanceService(unittest.TestCase):
+
+    def test_balance_is_exact(self):
+        service = FinanceService()
+        service.add_transactions([0.1] * 1000)
+        service.subtract_transaction(Decimal("0.05"))
+        service.apply_allowance(Decimal("2.50"), 4)
+        self.assertEqual(service.get_balance(), Decimal("109.95"))
+        self.assertEqual(service.calculate_allowance("2.5", 3), Decimal("7.50"))
+
+
+class TestRecurringSchedule(unittest.TestCase):
+
+    def test_weekly_rule_counts_in_closed_form(self):
+        rule = AllowanceRule.create("5.00", "week", date(2024, 1, 1), split={"save": 1, "spend": 2})
+        self.assertEqual(rule.split_cents, {"save": 167, "spend": 333})
+        self.assertEqual(rule.count_until(date(2023, 12, 31)), 0)
+        self.assertEqual(rule.count_until(date(2024, 1, 1)), 1)
+        self.assertEqual(rule.count_until(date(2024, 1, 14)), 2)
+        self.assertEqual(rule.count_between(date(2024, 1, 1), date(2024, 1, 15)), 2)
+
+    def test_monthly_rule_clamps_to_month_end(self):
+        rule = AllowanceRule.create(10, "month", date(2024, 1, 31), end=date(2024, 6, 30))
+        upcoming = [when for when, _ in rule.iter_deposits()]
+        self.assertEqual(upcoming[:3], [date(2024, 1, 31), date(2024, 2, 29), date(2024, 3, 31)])
+        self.assertEqual(len(upcoming), 6)
+        self.assertEqual(rule.count_until(date(2024, 2, 28)), 1)
+        self.assertEqual(rule.count_until(date(2030, 1, 1)), 6)
+
+    def test_service_projects_far_ahead_without_storing_deposits(self):
+        plan = SimpleNamespace(income=20.0, allocation={"save": 5.0, "spend": 10.0})
+        service = FinanceService()
+        service.add_schedule(AllowanceRule.from_plan(plan, "week", date(2024, 1, 1)))
+
+        self.assertEqual(service.apply_schedule(date(2024, 1, 31)), Decimal("100.00"))
+        self.assertEqual(service.allocations_cents, {"save": 2500, "spend": 5000, "unallocated": 2500})
+
+        # 2024-01-01 plus 260 weeks is 2028-12-25: 261 deposits in total.
+        self.assertEqual(service.balance_at(date(2028, 12, 31)), Decimal("5220.00"))
+        self.assertEqual(service.projected_allocations(date(2028, 12, 31))["save"], Decimal("1305.00"))
+        self.assertEqual(service.get_balance(), Decimal("100.00"))
+
+    def test_schedule_merges_rules_lazily(self):
+        schedule = RecurringSchedule([
+            AllowanceRule.create(1, "week", date(2024, 1, 1)),
+            AllowanceRule.create(3, "month", date(2024, 1, 10)),
+        ])
+        deposits = list(schedule.iter_deposits(until=date(2024, 1, 15)))
+        self.assertEqual([when for when, _ in deposits],
+                         [date(2024, 1, 1), date(2024, 1, 8), date(2024, 1, 10), date(2024, 1, 15)])
+        self.assertEqual(deposits[2][1], {"unallocated": Decimal("3.00")})
+
+
+if __name__ == '__main__':
+    unittest.main()
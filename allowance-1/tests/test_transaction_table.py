@@ -0,0 +1,71 @@
+import json
+import os
+import tempfile
+import unittest
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+from PyQt5.QtCore import QThreadPool
+from PyQt5.QtWidgets import QApplication
+
+from allowance.ui.components.transaction_table import TransactionTableModel
+from allowance.ui.main_window import MainWindow
+
+app = QApplication.instance() or QApplication([])
+
+
+class TestTransactionTableModel(unittest.TestCase):
+
+    def test_rows_are_fetched_a_page_at_a_time(self):
+        rows = [{"date": "2024-01-01", "description": f"row {i}", "amount": i} for i in range(1_000_000)]
+        model = TransactionTableModel(rows, page_size=100)
+        self.assertEqual(model.rowCount(), 100)
+        self.assertTrue(model.canFetchMore())
+        model.fetchMore()
+        self.assertEqual(model.rowCount(), 200)
+        self.assertEqual(model.data(model.index(150, 2)), "150.00")
+        self.assertIsNone(model.data(model.index(250, 2)))
+
+    def test_appended_row_is_shown_once_everything_is_fetched(self):
+        rows = [{"amount": 1}]
+        model = TransactionTableModel(rows)
+        rows.append({"amount": 2})
+        model.transaction_added()
+        self.assertEqual(model.rowCount(), 2)
+        self.assertFalse(model.canFetchMore())
+
+
+class TestMainWindow(unittest.TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.filename = os.path.join(directory.name, "data.json")
+        with open(self.filename, "w") as file:
+            json.dump({"balance": 10.0, "transactions": [{"amount": 10.0, "description": "Start"}]}, file)
+
+    def test_loads_in_background_and_updates_totals_incrementally(self):
+        pool = QThreadPool()
+        window = MainWindow(self.filename, thread_pool=pool)
+        self.assertIsNone(window.store)
+        pool.waitForDone()
+        app.processEvents()
+
+        self.assertEqual(window.transaction_model.rowCount(), 1)
+        self.assertEqual(window.balance_view.balance_cents, 1000)
+
+        window.transaction_form.amount_entry.setText("2.35")
+        window.transaction_form.description_entry.setText("Snacks")
+        self.assertTrue(window.transaction_form.submit_transaction())
+        self.assertEqual(window.balance_view.balance_cents, 1235)
+        self.assertEqual(window.transaction_model.rowCount(), 2)
+
+        window.close()
+        with open(self.filename) as file:
+            data = json.load(file)
+        self.assertEqual(len(data["transactions"]), 2)
+        self.assertAlmostEqual(data["balance"], 12.35)
+
+
+if __name__ == '__main__':
+    unittest.main()
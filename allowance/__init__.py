@@ -1,5 +1,5 @@
 """Allowance planning toolkit."""
 
-from .planner import AllowancePlan, AllowanceLedger, load_ledger
+from .planner import AllowancePlan, AllowanceLedger, load_ledger, load_summary
 
-__all__ = ["AllowancePlan", "AllowanceLedger", "load_ledger"]
+__all__ = ["AllowancePlan", "AllowanceLedger", "load_ledger", "load_summary"]
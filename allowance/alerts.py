@@ -0,0 +1,152 @@
+"""Budget alerts raised as a category's spending crosses its plan.
+
+A :class:`BudgetAlerts` registry holds the thresholds, as percentages of
+:meth:`AllowancePlan.category_cents`, and the callbacks to notify.  The ledger
+checks it whenever a transaction is added, comparing the category's running
+total before and after the transaction, so the check costs the same however
+large the ledger is and an alert fires once per crossing rather than on every
+transaction above the line.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+import os
+import subprocess
+from typing import Callable, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .models import AllowancePlan, Transaction
+from .money import from_cents
+
+#: Percentages of a category's plan that raise an alert unless configured.
+DEFAULT_THRESHOLDS = (80.0, 100.0)
+
+
+@dataclass(frozen=True)
+class BudgetAlert:
+    """A category's spending reaching *threshold* percent of its plan."""
+
+    category: str
+    threshold: float
+    spent_cents: int
+    planned_cents: int
+    transaction: Transaction
+
+    @property
+    def spent(self) -> float:
+        return from_cents(self.spent_cents)
+
+    @property
+    def planned(self) -> float:
+        return from_cents(self.planned_cents)
+
+    def message(self) -> str:
+        return (
+            f"{self.category.title()} has reached {self.threshold:g}% of its plan "
+            f"({self.spent:.2f} of {self.planned:.2f})."
+        )
+
+
+AlertCallback = Callable[[BudgetAlert], None]
+
+
+class BudgetAlerts:
+    """Thresholds per category and the callbacks notified when one is crossed.
+
+    Thresholds are percentages; categories without their own use
+    *thresholds*.  Categories with nothing planned never alert.
+    """
+
+    def __init__(self, thresholds: Iterable[float] = DEFAULT_THRESHOLDS) -> None:
+        self._default = _sorted_thresholds(thresholds)
+        self._thresholds: Dict[str, Tuple[float, ...]] = {}
+        self._callbacks: List[AlertCallback] = []
+
+    def __bool__(self) -> bool:
+        return bool(self._callbacks)
+
+    def subscribe(self, callback: AlertCallback) -> AlertCallback:
+        """Call *callback* with every :class:`BudgetAlert`; returns it unchanged."""
+
+        self._callbacks.append(callback)
+        return callback
+
+    def unsubscribe(self, callback: AlertCallback) -> None:
+        self._callbacks.remove(callback)
+
+    def set_thresholds(
+        self, thresholds: Iterable[float], category: Optional[str] = None
+    ) -> None:
+        """Replace the thresholds of *category*, or the default ones."""
+
+        ordered = _sorted_thresholds(thresholds)
+        if category is None:
+            self._default = ordered
+        else:
+            self._thresholds[category] = ordered
+
+    def configure(self, thresholds: Mapping[Optional[str], Iterable[float]]) -> None:
+        """Apply :meth:`set_thresholds` for each category (``None`` for the default)."""
+
+        for category, values in thresholds.items():
+            self.set_thresholds(values, category)
+
+    def thresholds_for(self, category: str) -> Tuple[float, ...]:
+        return self._thresholds.get(category, self._default)
+
+    def check(
+        self, plan: AllowancePlan, transaction: Transaction, spent_cents: int
+    ) -> List[BudgetAlert]:
+        """Return the alerts raised by *transaction*.
+
+        *spent_cents* is the category's total including *transaction*; a
+        threshold is crossed when the total before it was below the line.
+        """
+
+        planned = plan.category_cents(transaction.category)
+        if planned <= 0 or not transaction.cents:
+            return []
+        # Compare in hundredths of a cent so whole percentages stay exact.
+        after = spent_cents * 100
+        before = after - transaction.cents * 100
+        return [
+            BudgetAlert(transaction.category, threshold, spent_cents, planned, transaction)
+            for threshold in self.thresholds_for(transaction.category)
+            if before < planned * threshold <= after
+        ]
+
+    def notify(self, alerts: Iterable[BudgetAlert]) -> None:
+        for alert in alerts:
+            for callback in list(self._callbacks):
+                callback(alert)
+
+
+def _sorted_thresholds(thresholds: Iterable[float]) -> Tuple[float, ...]:
+    ordered = tuple(sorted({float(threshold) for threshold in thresholds}))
+    if any(threshold <= 0 for threshold in ordered):
+        raise ValueError("Alert thresholds must be positive percentages.")
+    return ordered
+
+
+def shell_hook(command: str, wait: bool = True) -> AlertCallback:
+    """Return a callback running the shell *command* for each alert.
+
+    The alert is passed in the ``ALLOWANCE_CATEGORY``, ``ALLOWANCE_THRESHOLD``,
+    ``ALLOWANCE_SPENT``, ``ALLOWANCE_PLANNED`` and ``ALLOWANCE_MESSAGE``
+    environment variables.  The command's exit status is ignored; without
+    *wait* it runs in the background.
+    """
+
+    def run(alert: BudgetAlert) -> None:
+        env = {
+            **os.environ,
+            "ALLOWANCE_CATEGORY": alert.category,
+            "ALLOWANCE_THRESHOLD": f"{alert.threshold:g}",
+            "ALLOWANCE_SPENT": f"{alert.spent:.2f}",
+            "ALLOWANCE_PLANNED": f"{alert.planned:.2f}",
+            "ALLOWANCE_MESSAGE": alert.message(),
+        }
+        process = subprocess.Popen(command, shell=True, env=env)
+        if wait:
+            process.wait()
+
+    return run
@@ -0,0 +1,286 @@
+"""Period rollups, rolling averages and run-out forecasts for a ledger.
+
+Everything here works on the columns of a ledger (category codes, cents and
+epoch timestamps) in a single pass: period keys are computed for all rows at
+once and summed with ``numpy.bincount`` when NumPy is installed, or with one
+loop over the rows otherwise.  Both paths return the same integer cents.
+"""
+from __future__ import annotations
+
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from itertools import accumulate
+import math
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from . import tracing
+from .models import AllowancePlan, EPOCH, Transaction, from_epoch, order_categories, to_epoch
+
+try:  # pragma: no cover - depends on the environment
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+PERIODS = ("week", "month")
+DEFAULT_WINDOW = 3
+
+_DAY = 86400.0
+_WEEK = 7 * _DAY
+# 1970-01-01 was a Thursday; weeks start on the Monday before it.
+_WEEK_ORIGIN = -3 * _DAY
+
+Columns = Tuple["array[int]", "array[int]", "array[float]", Sequence[str]]
+
+
+def ledger_columns(transactions: Sequence[Transaction]) -> Columns:
+    """Return ``(codes, cents, timestamps, categories)`` for *transactions*.
+
+    A :class:`~allowance.table.TransactionTable` hands out its buffers
+    without copying; other sequences are encoded in one pass.
+    """
+
+    timestamps = getattr(transactions, "timestamps", None)
+    if timestamps is not None:
+        return transactions.codes, transactions.cents, timestamps, transactions.categories
+    if hasattr(transactions, "timestamps"):
+        raise ValueError("This ledger was loaded without timestamps.")
+    names: Dict[str, int] = {}
+    codes, cents, stamps = array("B"), array("q"), array("d")
+    for txn in transactions:
+        codes.append(names.setdefault(txn.category, len(names)))
+        cents.append(txn.cents)
+        stamps.append(to_epoch(txn.timestamp))
+    return codes, cents, stamps, tuple(names)
+
+
+def _period_keys(timestamps: "array[float]", period: str) -> Sequence[int]:
+    """Return weeks or months since the epoch for every timestamp."""
+
+    if numpy is not None:
+        seconds = numpy.frombuffer(timestamps, dtype=numpy.float64)
+        if period == "week":
+            return numpy.floor((seconds - _WEEK_ORIGIN) / _WEEK).astype(numpy.int64)
+        whole = numpy.floor(seconds).astype(numpy.int64).astype("datetime64[s]")
+        return whole.astype("datetime64[M]").astype(numpy.int64)
+    if period == "week":
+        return [math.floor((seconds - _WEEK_ORIGIN) / _WEEK) for seconds in timestamps]
+    keys = []
+    for seconds in timestamps:
+        moment = from_epoch(seconds)
+        keys.append((moment.year - EPOCH.year) * 12 + moment.month - 1)
+    return keys
+
+
+def period_start(period: str, key: int) -> datetime:
+    """Return the first moment of period number *key* since the epoch."""
+
+    if period == "week":
+        return from_epoch(_WEEK_ORIGIN + key * _WEEK)
+    year, month = divmod(key, 12)
+    return datetime(EPOCH.year + year, month + 1, 1)
+
+
+def period_label(period: str, key: int) -> str:
+    start = period_start(period, key)
+    return f"{start:%Y-%m-%d}" if period == "week" else f"{start:%Y-%m}"
+
+
+def rolling_average(values: Sequence[int], window: int = DEFAULT_WINDOW) -> List[float]:
+    """Return the mean of each value and the ``window - 1`` values before it.
+
+    The first entries average over the values available so far.  Sums come
+    from one cumulative pass, so the cost does not depend on *window*.
+    """
+
+    if window < 1:
+        raise ValueError("The rolling window must be at least 1.")
+    if numpy is not None:
+        totals = numpy.concatenate(([0], numpy.cumsum(numpy.asarray(values, dtype=numpy.int64))))
+    else:
+        totals = [0, *accumulate(values)]
+    averages = []
+    for index in range(len(values)):
+        start = max(0, index + 1 - window)
+        averages.append(int(totals[index + 1] - totals[start]) / (index + 1 - start))
+    return averages
+
+
+@dataclass
+class Rollup:
+    """Spending per category for every period between the first and last row.
+
+    Periods without transactions are included with zero spend, so the lists
+    in :attr:`cents` line up with :meth:`keys`.
+    """
+
+    period: str
+    first: int
+    cents: Dict[str, List[int]]
+
+    def __len__(self) -> int:
+        return len(next(iter(self.cents.values()), []))
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        return tuple(self.cents)
+
+    def keys(self) -> range:
+        return range(self.first, self.first + len(self))
+
+    def labels(self) -> List[str]:
+        return [period_label(self.period, key) for key in self.keys()]
+
+    def totals(self) -> List[int]:
+        return [sum(row) for row in zip(*self.cents.values())] if self.cents else []
+
+    def rolling_average(
+        self, category: Optional[str] = None, window: int = DEFAULT_WINDOW
+    ) -> List[float]:
+        """Rolling average spend in cents for *category*, or for all categories."""
+
+        if category is None:
+            return rolling_average(self.totals(), window)
+        return rolling_average(self.cents.get(category, [0] * len(self)), window)
+
+
+@tracing.traced("analytics.rollup")
+def rollup(transactions: Sequence[Transaction], period: str = "month") -> Rollup:
+    """Sum the spending of *transactions* per category and *period*."""
+
+    if period not in PERIODS:
+        raise ValueError(f"Unknown period: {period}")
+    codes, cents, timestamps, categories = ledger_columns(transactions)
+    if not codes:
+        return Rollup(period=period, first=0, cents={})
+    keys = _period_keys(timestamps, period)
+    if numpy is not None:
+        first, last = int(keys.min()), int(keys.max())
+    else:
+        first, last = min(keys), max(keys)
+    count = last - first + 1
+    width = len(categories)
+    if numpy is not None:
+        slots = (keys - first) * width + numpy.frombuffer(codes, dtype=numpy.uint8)
+        # ``bincount`` sums in float64, which is exact while every bucket
+        # stays below 2**53 cents.
+        sums = numpy.bincount(
+            slots, weights=numpy.frombuffer(cents, dtype=numpy.int64), minlength=count * width
+        )
+        grid = numpy.rint(sums).astype(numpy.int64).reshape(count, width)
+        columns = {name: grid[:, code].tolist() for code, name in enumerate(categories)}
+    else:
+        columns = {name: [0] * count for name in categories}
+        rows = [columns[name] for name in categories]
+        for key, code, amount in zip(keys, codes, cents):
+            rows[code][key - first] += amount
+    used = {name: column for name, column in columns.items() if any(column)}
+    ordered = order_categories(used) if used else ()
+    return Rollup(period=period, first=first, cents={name: used[name] for name in ordered})
+
+
+@dataclass
+class Forecast:
+    """When a category's allocation runs out at its recent rate of spending."""
+
+    category: str
+    planned_cents: int
+    spent_cents: int
+    daily_cents: float
+    #: The projected date, or the date the allocation was used up when
+    #: :attr:`exhausted`; ``None`` when nothing was spent recently.
+    run_out: Optional[datetime]
+
+    @property
+    def remaining_cents(self) -> int:
+        return self.planned_cents - self.spent_cents
+
+    @property
+    def exhausted(self) -> bool:
+        return self.remaining_cents <= 0
+
+
+def _exhausted_on(
+    codes: "array[int]",
+    cents: "array[int]",
+    timestamps: "array[float]",
+    code: int,
+    planned: int,
+) -> Optional[datetime]:
+    """Return when the running total for *code* first reached *planned*."""
+
+    if numpy is not None:
+        code_view = numpy.frombuffer(codes, dtype=numpy.uint8)
+        mask = code_view == code
+        stamps = numpy.frombuffer(timestamps, dtype=numpy.float64)[mask]
+        order = numpy.argsort(stamps, kind="stable")
+        running = numpy.cumsum(numpy.frombuffer(cents, dtype=numpy.int64)[mask][order])
+        index = int(numpy.searchsorted(running, planned, side="left"))
+        return from_epoch(float(stamps[order][index])) if index < len(running) else None
+    running = 0
+    for stamp, amount in sorted(
+        (stamp, amount) for row, stamp, amount in zip(codes, timestamps, cents) if row == code
+    ):
+        running += amount
+        if running >= planned:
+            return from_epoch(stamp)
+    return None
+
+
+@tracing.traced("analytics.forecast")
+def forecast(
+    plan: AllowancePlan,
+    transactions: Sequence[Transaction],
+    period: str = "month",
+    window: int = DEFAULT_WINDOW,
+    as_of: Optional[datetime] = None,
+    periods: Optional[Rollup] = None,
+) -> List[Forecast]:
+    """Project when each category's allocation will be used up.
+
+    The daily rate is the category's spending over the last *window* periods
+    up to *as_of* (the latest transaction by default); transactions after
+    *as_of* are left out entirely.  Categories that are already over their
+    allocation report the date the total first reached it.  Pass *periods*
+    to reuse a rollup of *transactions* for *period*.
+    """
+
+    codes, cents, timestamps, categories = ledger_columns(transactions)
+    if as_of is not None:
+        cutoff = to_epoch(as_of)
+        if any(stamp > cutoff for stamp in timestamps):
+            transactions = [txn for txn in transactions if txn.timestamp <= as_of]
+            codes, cents, timestamps, categories = ledger_columns(transactions)
+            periods = None
+    periods = periods or rollup(transactions, period)
+    if as_of is None:
+        if not timestamps:
+            as_of = datetime.utcnow()
+        elif numpy is not None:
+            as_of = from_epoch(float(numpy.frombuffer(timestamps, dtype=numpy.float64).max()))
+        else:
+            as_of = from_epoch(max(timestamps))
+    start = period_start(period, periods.first + max(0, len(periods) - window))
+    days = max(1.0, (as_of - start).total_seconds() / _DAY)
+    spent = {name: sum(column) for name, column in periods.cents.items()}
+    recent = {
+        name: sum(column[max(0, len(column) - window):])
+        for name, column in periods.cents.items()
+    }
+
+    results = []
+    for category in order_categories([*plan.allocation, *spent]):
+        planned = plan.category_cents(category)
+        used = spent.get(category, 0)
+        daily = recent.get(category, 0) / days
+        if used >= planned:
+            run_out = None
+            if category in categories:
+                code = list(categories).index(category)
+                run_out = _exhausted_on(codes, cents, timestamps, code, planned)
+        elif daily > 0:
+            run_out = as_of + timedelta(days=(planned - used) / daily)
+        else:
+            run_out = None
+        results.append(Forecast(category, planned, used, daily, run_out))
+    return results
@@ -0,0 +1,253 @@
+"""Compressed archive segments for closed accounting periods.
+
+``close-period`` moves the transactions dated before a cutoff out of the
+ledger into an immutable segment in ``<storage>.archive/``, so the file that
+``record`` and ``summary`` touch every day only holds the open period.
+
+A segment is a gzip or xz compressed JSON-lines file.  Its first line is a
+header with the segment's totals, and the remaining lines are its
+transactions in timestamp order.  The file name records the first and last
+timestamps, so the segments a date range needs are picked from a directory
+listing and the others are never opened.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+import gzip
+import heapq
+from itertools import chain, islice
+import json
+import lzma
+from pathlib import Path
+import re
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .models import Transaction
+from .planner import AllowanceLedger, BackendSpec, resolve_storage
+from .storage import _deserialize_transaction, _serialize_transaction, atomic_write
+
+ARCHIVE_SUFFIX = ".archive"
+SEGMENT_VERSION = 1
+COMPRESSIONS: Dict[str, Tuple[str, Callable[..., IO[Any]], Callable[[bytes], bytes]]] = {
+    "gzip": (".jsonl.gz", gzip.open, gzip.compress),
+    "xz": (".jsonl.xz", lzma.open, lzma.compress),
+}
+
+_STAMP = "%Y%m%dT%H%M%S%f"
+_SEGMENT_NAME = re.compile(r"^(\d{8}T\d{12})-(\d{8}T\d{12})(\.jsonl\.(?:gz|xz))$")
+
+
+def archive_dir(path: Path) -> Path:
+    """Return the directory holding the archive segments of the ledger *path*."""
+
+    return path.with_name(path.name + ARCHIVE_SUFFIX)
+
+
+@dataclass(frozen=True)
+class Segment:
+    """One archive segment, described by its file name alone."""
+
+    path: Path
+    first: datetime
+    last: datetime
+
+    @classmethod
+    def from_path(cls, path: Path) -> Optional["Segment"]:
+        match = _SEGMENT_NAME.match(path.name)
+        if match is None:
+            return None
+        first, last = (datetime.strptime(stamp, _STAMP) for stamp in match.group(1, 2))
+        return cls(path=path, first=first, last=last)
+
+    def overlaps(self, since: Optional[datetime], until: Optional[datetime]) -> bool:
+        """Whether any time in ``[since, until)`` falls within the segment."""
+
+        return (since is None or self.last >= since) and (until is None or self.first < until)
+
+    def covered_by(self, since: Optional[datetime], until: Optional[datetime]) -> bool:
+        """Whether every transaction in the segment falls within ``[since, until)``."""
+
+        return (since is None or self.first >= since) and (until is None or self.last < until)
+
+    def _open(self) -> IO[str]:
+        opener = gzip.open if self.path.name.endswith(".gz") else lzma.open
+        return opener(self.path, "rt", encoding="utf-8")
+
+    def header(self) -> Dict[str, Any]:
+        """Return the summary header, decompressing only the first line."""
+
+        with self._open() as handle:
+            return json.loads(handle.readline())
+
+    def query(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> Iterator[Transaction]:
+        """Yield the segment's transactions in ``[since, until)``, oldest first."""
+
+        with self._open() as handle:
+            handle.readline()
+            for line in handle:
+                txn = _deserialize_transaction(json.loads(line))
+                if until is not None and txn.timestamp >= until:
+                    return
+                if since is not None and txn.timestamp < since:
+                    continue
+                if category is None or txn.category == category:
+                    yield txn
+
+    def count(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> int:
+        """Return how many transactions :meth:`query` would yield."""
+
+        if self.covered_by(since, until):
+            header = self.header()
+            if category is None:
+                return header["transaction_count"]
+            return header["counts"].get(category, 0)
+        return sum(1 for _ in self.query(since, until, category))
+
+
+def list_segments(path: Path) -> List[Segment]:
+    """Return the archive segments of the ledger *path*, oldest first."""
+
+    directory = archive_dir(path)
+    if not directory.is_dir():
+        return []
+    segments = (Segment.from_path(entry) for entry in directory.iterdir())
+    return sorted(
+        (segment for segment in segments if segment is not None),
+        key=lambda segment: (segment.first, segment.last),
+    )
+
+
+def write_segment(
+    path: Path, transactions: Sequence[Transaction], compression: str = "gzip"
+) -> Segment:
+    """Write *transactions* to a new segment of the ledger *path*.
+
+    The name only depends on the first and last timestamps, so repeating an
+    interrupted ``close-period`` rewrites the same segment instead of adding
+    a duplicate.
+    """
+
+    try:
+        suffix, _, compress = COMPRESSIONS[compression]
+    except KeyError:
+        raise ValueError(f"Unknown compression: {compression}") from None
+    if not transactions:
+        raise ValueError("An archive segment needs at least one transaction.")
+    rows = sorted(transactions, key=lambda txn: txn.timestamp)
+    first, last = rows[0].timestamp, rows[-1].timestamp
+    spent: Dict[str, int] = {}
+    counts: Dict[str, int] = {}
+    for txn in rows:
+        spent[txn.category] = spent.get(txn.category, 0) + txn.cents
+        counts[txn.category] = counts.get(txn.category, 0) + 1
+    header = {
+        "version": SEGMENT_VERSION,
+        "first": first.isoformat(),
+        "last": last.isoformat(),
+        "transaction_count": len(rows),
+        "spent_cents": spent,
+        "counts": counts,
+    }
+    lines = [json.dumps(header), *(json.dumps(_serialize_transaction(txn)) for txn in rows)]
+    directory = archive_dir(path)
+    directory.mkdir(exist_ok=True)
+    segment_path = directory / f"{first.strftime(_STAMP)}-{last.strftime(_STAMP)}{suffix}"
+    atomic_write(segment_path, compress("\n".join(lines).encode("utf-8") + b"\n"))
+    return Segment(path=segment_path, first=first, last=last)
+
+
+def close_period(
+    ledger: AllowanceLedger, cutoff: datetime, compression: str = "gzip"
+) -> Optional[Segment]:
+    """Archive the transactions of *ledger* dated before *cutoff*.
+
+    The segment is written before the transactions are removed from the
+    ledger, so a crash in between leaves them in both places rather than in
+    neither.  Returns ``None`` when nothing is old enough to archive.  Call it
+    on a ledger loaded with :meth:`AllowanceLedger.locked`.
+    """
+
+    old = [txn for txn in ledger.state.transactions if txn.timestamp < cutoff]
+    if not old:
+        return None
+    segment = write_segment(ledger.storage_path, old, compression)
+    ledger.take_before(cutoff)
+    return segment
+
+
+def count_history(
+    ledger: AllowanceLedger,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    category: Optional[str] = None,
+) -> int:
+    """Count the ledger's and archive's transactions in ``[since, until)``."""
+
+    archived = sum(
+        segment.count(since, until, category)
+        for segment in list_segments(ledger.storage_path)
+        if segment.overlaps(since, until)
+    )
+    return archived + ledger.count(since, until, category)
+
+
+def query_history(
+    ledger: AllowanceLedger,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    category: Optional[str] = None,
+    offset: int = 0,
+    limit: Optional[int] = None,
+) -> Iterator[Transaction]:
+    """Yield transactions from the ledger and its archive in timestamp order.
+
+    Only the segments overlapping ``[since, until)`` are opened, and they are
+    read lazily, so a page near the start of a range stops early.
+    """
+
+    sources = [
+        segment.query(since, until, category)
+        for segment in list_segments(ledger.storage_path)
+        if segment.overlaps(since, until)
+    ]
+    sources.append(ledger.query(since, until, category))
+    merged = heapq.merge(*sources, key=lambda txn: txn.timestamp)
+    stop = offset + limit if limit is not None else None
+    return islice(merged, offset, stop)
+
+
+def stream_history(
+    path: Optional[Path] = None,
+    backend: BackendSpec = None,
+    journal: bool = False,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+) -> Iterator[Transaction]:
+    """Yield the archive's transactions in ``[since, until)``, then the ledger's.
+
+    Like :meth:`AllowanceLedger.stream`, nothing is loaded up front: the
+    overlapping segments are read one after the other, oldest first, and the
+    ledger's own transactions follow in the order they were recorded.
+    """
+
+    storage_path, resolved = resolve_storage(path, backend, journal)
+    archived = (
+        segment.query(since, until)
+        for segment in list_segments(storage_path)
+        if segment.overlaps(since, until)
+    )
+    return chain(
+        chain.from_iterable(archived),
+        AllowanceLedger.stream(storage_path, resolved, since=since, until=until),
+    )
@@ -0,0 +1,506 @@
+"""Pluggable persistence backends for the allowance planner."""
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from contextlib import closing
+from datetime import datetime
+from pathlib import Path
+import sqlite3
+from typing import Dict, Iterable, Iterator, MutableSequence, Optional, Sequence, Union
+
+from . import tracing
+from .binary import encode as encode_binary, is_binary
+from .models import AllowancePlan, AllowanceState, LedgerSummary, Transaction
+from .money import from_cents
+from .storage import (
+    DEFAULT_STORAGE_FILE,
+    append_transaction,
+    append_transactions,
+    atomic_write,
+    iter_transactions,
+    journal_length,
+    journal_path,
+    ledger_lock,
+    load_state,
+    read_summary,
+    save_state,
+)
+from .table import TransactionTable
+
+DEFAULT_SQLITE_FILE = Path.home() / ".allowance.db"
+DEFAULT_BINARY_FILE = Path.home() / ".allowance.bin"
+SQLITE_SUFFIXES = (".db", ".sqlite", ".sqlite3")
+BINARY_SUFFIXES = (".bin",)
+
+
+class StorageBackend(ABC):
+    """Interface shared by the ledger storage formats.
+
+    Only :meth:`load` and :meth:`save` are required.  The remaining hooks let a
+    backend persist a single change without rewriting everything, and answer
+    summaries without materialising every :class:`Transaction`.
+    """
+
+    name = ""
+    default_path = DEFAULT_STORAGE_FILE
+    #: Whether :meth:`append` and :meth:`append_many` need the full state,
+    #: i.e. whether appending rewrites everything.
+    append_needs_state = True
+
+    @abstractmethod
+    def load(
+        self,
+        path: Path,
+        columnar: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> AllowanceState:
+        """Load the state in *path*.
+
+        *columnar* keeps the transactions in a :class:`TransactionTable`;
+        *fields* loads only the listed transaction fields into a projected,
+        read-only table.
+        """
+
+    @abstractmethod
+    def save(self, state: AllowanceState, path: Path) -> None:
+        """Write the whole of *state* to *path*."""
+
+    def save_plan(self, state: AllowanceState, path: Path) -> None:
+        """Persist a plan change; *state* already holds the new plan."""
+
+        self.save(state, path)
+
+    def append(self, state: AllowanceState, txn: Transaction, path: Path) -> None:
+        """Persist *txn*, which has already been appended to *state*."""
+
+        self.save(state, path)
+
+    def append_many(
+        self, state: AllowanceState, txns: Sequence[Transaction], path: Path
+    ) -> None:
+        """Persist a batch of transactions already appended to *state*."""
+
+        self.save(state, path)
+
+    def clear(self, state: AllowanceState, path: Path) -> None:
+        """Persist the removal of every transaction from *state*."""
+
+        self.save(state, path)
+
+    def compact(self, state: AllowanceState, path: Path) -> int:
+        """Fold pending incremental writes into the main file.
+
+        Returns the number of records that were folded in.
+        """
+
+        return 0
+
+    def load_summary(self, path: Path, repair: bool = False) -> LedgerSummary:
+        """Return the per-category totals of *path*.
+
+        With *repair*, a backend whose summary fell back to a scan may rewrite
+        the file so the next summary is cheap again.
+        """
+
+        return self.load(path).summary()
+
+    def iter_transactions(self, path: Path) -> Iterator[Transaction]:
+        """Yield the stored transactions one at a time, in insertion order."""
+
+        return iter(self.load(path).transactions)
+
+    def with_journal(self) -> "StorageBackend":
+        """Return this format with new transactions appended to a journal."""
+
+        raise ValueError(f"The {self.name} backend has no journal mode.")
+
+
+class JsonBackend(StorageBackend):
+    """The JSON snapshot format, optionally with an append-only journal."""
+
+    def __init__(self, journal: bool = False) -> None:
+        self.journal = journal
+
+    @property
+    def name(self) -> str:  # type: ignore[override]
+        return "journal" if self.journal else "json"
+
+    @property
+    def append_needs_state(self) -> bool:  # type: ignore[override]
+        return not self.journal
+
+    def with_journal(self) -> "JsonBackend":
+        return self if self.journal else JsonBackend(journal=True)
+
+    def load(
+        self,
+        path: Path,
+        columnar: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> AllowanceState:
+        return load_state(path, columnar, fields)
+
+    def save(self, state: AllowanceState, path: Path) -> None:
+        save_state(state, path)
+
+    def append(self, state: AllowanceState, txn: Transaction, path: Path) -> None:
+        if self.journal:
+            append_transaction(txn, path)
+        else:
+            save_state(state, path)
+
+    def append_many(
+        self, state: AllowanceState, txns: Sequence[Transaction], path: Path
+    ) -> None:
+        if self.journal:
+            append_transactions(txns, path)
+        else:
+            save_state(state, path)
+
+    def compact(self, state: AllowanceState, path: Path) -> int:
+        pending = journal_length(path)
+        if pending:
+            save_state(state, path)
+        return pending
+
+    def iter_transactions(self, path: Path) -> Iterator[Transaction]:
+        return iter_transactions(path)
+
+    def load_summary(self, path: Path, repair: bool = False) -> LedgerSummary:
+        """Answer from the file's aggregate header when it is current.
+
+        Otherwise fall back to a streaming scan of the amounts, which leaves
+        the file as it is.  With *repair* the fallback is a full load that
+        rewrites the file under its lock instead, so only the first summary
+        of a stale or legacy file pays for it.
+        """
+
+        summary = read_summary(path)
+        if summary is not None:
+            return summary
+        if repair and path.exists():
+            with ledger_lock(path):
+                state = load_state(path)
+                save_state(state, path)
+            return state.summary()
+        return load_state(path, fields=("category", "amount")).summary()
+
+
+class BinaryBackend(StorageBackend):
+    """The memory-mapped binary format of :mod:`allowance.binary`.
+
+    New transactions go to the same append-only journal as the JSON journal
+    mode, and are folded into the binary file by :meth:`compact` or the next
+    full save.
+    """
+
+    name = "binary"
+    default_path = DEFAULT_BINARY_FILE
+    append_needs_state = False
+
+    def with_journal(self) -> "BinaryBackend":
+        # New transactions are always journaled.
+        return self
+
+    def load(
+        self,
+        path: Path,
+        columnar: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> AllowanceState:
+        return load_state(path, columnar, fields)
+
+    @tracing.traced("binary.save")
+    def save(self, state: AllowanceState, path: Path) -> None:
+        atomic_write(path, encode_binary(state))
+        journal_path(path).unlink(missing_ok=True)
+
+    def append(self, state: AllowanceState, txn: Transaction, path: Path) -> None:
+        append_transaction(txn, path)
+
+    def append_many(
+        self, state: AllowanceState, txns: Sequence[Transaction], path: Path
+    ) -> None:
+        append_transactions(txns, path)
+
+    def compact(self, state: AllowanceState, path: Path) -> int:
+        pending = journal_length(path)
+        if pending:
+            self.save(state, path)
+        return pending
+
+    def iter_transactions(self, path: Path) -> Iterator[Transaction]:
+        return iter_transactions(path)
+
+    def load_summary(self, path: Path, repair: bool = False) -> LedgerSummary:
+        summary = read_summary(path)
+        return summary if summary is not None else load_state(path).summary()
+
+
+# Amounts are stored as integer cents, like everywhere else in the planner.
+_SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plan (
+    id INTEGER PRIMARY KEY CHECK (id = 1),
+    income_cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS allocations (
+    category TEXT PRIMARY KEY,
+    amount_cents INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    id INTEGER PRIMARY KEY,
+    category TEXT NOT NULL,
+    amount_cents INTEGER NOT NULL,
+    description TEXT NOT NULL DEFAULT '',
+    timestamp TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_transactions_category_timestamp
+    ON transactions (category, timestamp);
+"""
+_SQLITE_VERSION = 1
+
+# Databases written before amounts were stored as cents kept them as REAL.
+_SQLITE_MIGRATE_REAL = """
+DROP INDEX IF EXISTS idx_transactions_category_timestamp;
+ALTER TABLE plan RENAME TO plan_real;
+ALTER TABLE allocations RENAME TO allocations_real;
+ALTER TABLE transactions RENAME TO transactions_real;
+{schema};
+INSERT INTO plan (id, income_cents)
+    SELECT id, CAST(ROUND(income * 100) AS INTEGER) FROM plan_real;
+INSERT INTO allocations (category, amount_cents)
+    SELECT category, CAST(ROUND(amount * 100) AS INTEGER) FROM allocations_real ORDER BY rowid;
+INSERT INTO transactions (id, category, amount_cents, description, timestamp)
+    SELECT id, category, CAST(ROUND(amount * 100) AS INTEGER), description, timestamp
+    FROM transactions_real;
+DROP TABLE plan_real;
+DROP TABLE allocations_real;
+DROP TABLE transactions_real
+""".format(schema=_SQLITE_SCHEMA.strip().rstrip(";"))
+
+
+class SqliteBackend(StorageBackend):
+    """Stores the ledger in an SQLite database using only the stdlib driver.
+
+    Each operation touches only the rows it changes, and summaries are
+    answered with a ``GROUP BY`` query instead of loading every transaction.
+    Amounts are stored as integer cents; a database that still holds them as
+    ``REAL`` is converted the first time it is opened.
+    """
+
+    name = "sqlite"
+    default_path = DEFAULT_SQLITE_FILE
+    append_needs_state = False
+
+    def _connect(self, path: Path) -> sqlite3.Connection:
+        connection = sqlite3.connect(path)
+        if connection.execute("PRAGMA user_version").fetchone()[0] < _SQLITE_VERSION:
+            self._upgrade(connection)
+        return connection
+
+    def _upgrade(self, connection: sqlite3.Connection) -> None:
+        # Take the write lock before looking, so concurrent processes opening
+        # the same old database convert it once.
+        connection.isolation_level = None
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            if connection.execute("PRAGMA user_version").fetchone()[0] < _SQLITE_VERSION:
+                columns = {
+                    row[1] for row in connection.execute("PRAGMA table_info(transactions)")
+                }
+                script = _SQLITE_MIGRATE_REAL if "amount" in columns else _SQLITE_SCHEMA
+                for statement in script.split(";"):
+                    if statement.strip():
+                        connection.execute(statement)
+                connection.execute(f"PRAGMA user_version = {_SQLITE_VERSION}")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        connection.execute("COMMIT")
+        connection.isolation_level = ""
+
+    def _load_plan(self, connection: sqlite3.Connection) -> AllowancePlan:
+        row = connection.execute("SELECT income_cents FROM plan WHERE id = 1").fetchone()
+        allocation = {
+            category: from_cents(cents)
+            for category, cents in connection.execute(
+                "SELECT category, amount_cents FROM allocations ORDER BY rowid"
+            )
+        }
+        return AllowancePlan(income=from_cents(row[0]) if row else 0.0, allocation=allocation)
+
+    def _write_plan(self, connection: sqlite3.Connection, plan: AllowancePlan) -> None:
+        connection.execute(
+            "INSERT OR REPLACE INTO plan (id, income_cents) VALUES (1, ?)", (plan.income_cents,)
+        )
+        connection.execute("DELETE FROM allocations")
+        connection.executemany(
+            "INSERT INTO allocations (category, amount_cents) VALUES (?, ?)",
+            plan.allocation_cents.items(),
+        )
+
+    def _insert(self, connection: sqlite3.Connection, *txns: Transaction) -> None:
+        connection.executemany(
+            "INSERT INTO transactions (category, amount_cents, description, timestamp)"
+            " VALUES (?, ?, ?, ?)",
+            (
+                (txn.category, txn.cents, txn.description, txn.timestamp.isoformat())
+                for txn in txns
+            ),
+        )
+
+    @tracing.traced("sqlite.load")
+    def load(
+        self,
+        path: Path,
+        columnar: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> AllowanceState:
+        if fields is not None:
+            table = TransactionTable(fields=fields)
+            columns = ", ".join(
+                "amount_cents" if name == "amount" else name for name in table.fields
+            )
+            with closing(self._connect(path)) as connection:
+                plan = self._load_plan(connection)
+                for row in connection.execute(
+                    f"SELECT {columns} FROM transactions ORDER BY id"
+                ):
+                    values = dict(zip(table.fields, row))
+                    timestamp = values.get("timestamp")
+                    table.append_values(
+                        values["category"],
+                        from_cents(values["amount"]),
+                        values.get("description", ""),
+                        datetime.fromisoformat(timestamp) if timestamp else None,
+                    )
+            return AllowanceState(plan=plan, transactions=table)
+
+        transactions: MutableSequence[Transaction] = (
+            TransactionTable() if columnar else []
+        )
+        with closing(self._connect(path)) as connection:
+            plan = self._load_plan(connection)
+            rows = connection.execute(
+                "SELECT category, amount_cents, description, timestamp"
+                " FROM transactions ORDER BY id"
+            )
+            transactions.extend(
+                Transaction(
+                    category=category,
+                    amount=from_cents(cents),
+                    description=description,
+                    timestamp=datetime.fromisoformat(timestamp),
+                )
+                for category, cents, description, timestamp in rows
+            )
+        return AllowanceState(plan=plan, transactions=transactions)
+
+    @tracing.traced("sqlite.save")
+    def save(self, state: AllowanceState, path: Path) -> None:
+        if state.is_partial:
+            raise ValueError("Cannot save a state that was loaded with a field projection.")
+        with closing(self._connect(path)) as connection, connection:
+            self._write_plan(connection, state.plan)
+            connection.execute("DELETE FROM transactions")
+            self._insert(connection, *state.transactions)
+
+    def save_plan(self, state: AllowanceState, path: Path) -> None:
+        with closing(self._connect(path)) as connection, connection:
+            self._write_plan(connection, state.plan)
+
+    def append(self, state: AllowanceState, txn: Transaction, path: Path) -> None:
+        with closing(self._connect(path)) as connection, connection:
+            self._insert(connection, txn)
+
+    def append_many(
+        self, state: AllowanceState, txns: Sequence[Transaction], path: Path
+    ) -> None:
+        with closing(self._connect(path)) as connection, connection:
+            self._insert(connection, *txns)
+
+    def clear(self, state: AllowanceState, path: Path) -> None:
+        with closing(self._connect(path)) as connection, connection:
+            connection.execute("DELETE FROM transactions")
+
+    def iter_transactions(self, path: Path) -> Iterator[Transaction]:
+        with closing(self._connect(path)) as connection:
+            rows = connection.execute(
+                "SELECT category, amount_cents, description, timestamp"
+                " FROM transactions ORDER BY id"
+            )
+            for category, cents, description, timestamp in rows:
+                yield Transaction(
+                    category=category,
+                    amount=from_cents(cents),
+                    description=description,
+                    timestamp=datetime.fromisoformat(timestamp),
+                )
+
+    def load_summary(self, path: Path, repair: bool = False) -> LedgerSummary:
+        with closing(self._connect(path)) as connection:
+            plan = self._load_plan(connection)
+            spent: Dict[str, int] = {}
+            count = 0
+            for category, total, rows in connection.execute(
+                "SELECT category, SUM(amount_cents), COUNT(*) FROM transactions GROUP BY category"
+            ):
+                spent[category] = total
+                count += rows
+        return LedgerSummary(plan=plan, spent_cents=spent, transaction_count=count)
+
+
+BACKENDS = {
+    "json": JsonBackend,
+    "journal": lambda: JsonBackend(journal=True),
+    "sqlite": SqliteBackend,
+    "binary": BinaryBackend,
+}
+
+
+def get_backend(
+    path: Optional[Path] = None, backend: Union[str, StorageBackend, None] = None
+) -> StorageBackend:
+    """Return the backend named *backend*, or guess one from *path*.
+
+    The guess goes by the suffix, except that an existing binary ledger is
+    recognised by its contents whatever it is called.
+    """
+
+    if isinstance(backend, StorageBackend):
+        return backend
+    if backend is None:
+        suffix = path.suffix.lower() if path is not None else ""
+        if suffix in SQLITE_SUFFIXES:
+            backend = "sqlite"
+        elif suffix in BINARY_SUFFIXES or (path is not None and is_binary(path)):
+            backend = "binary"
+        else:
+            backend = "json"
+    try:
+        factory = BACKENDS[backend]
+    except KeyError:
+        raise ValueError(f"Unknown storage backend: {backend}") from None
+    return factory()
+
+
+def convert_ledger(
+    source: Path,
+    destination: Path,
+    backend: Union[str, StorageBackend, None] = None,
+    source_backend: Union[str, StorageBackend, None] = None,
+) -> AllowanceState:
+    """Copy the ledger in *source* to *destination* in another format.
+
+    The destination format is *backend*, or guessed from *destination*'s
+    suffix.  Pending journal records in *source* are included.  Returns the
+    state that was written.
+    """
+
+    if source.resolve() == destination.resolve():
+        raise ValueError("The source and destination must be different files.")
+    state = get_backend(source, source_backend).load(source)
+    target = get_backend(destination, backend)
+    with ledger_lock(destination):
+        target.save(state, destination)
+    return state
@@ -0,0 +1,266 @@
+"""Synthetic ledgers and benchmarks for the storage and reporting hot paths."""
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from importlib import metadata
+import math
+from pathlib import Path
+import platform
+import random
+import tempfile
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .backends import BINARY_SUFFIXES, SQLITE_SUFFIXES, get_backend
+from .models import AllowancePlan, AllowanceState
+from .planner import AllowanceLedger
+from .table import TransactionTable
+
+try:  # pragma: no cover - not available on Windows
+    import resource
+except ImportError:  # pragma: no cover
+    resource = None  # type: ignore[assignment]
+
+DEFAULT_SIZES = (1_000, 10_000, 100_000)
+DEFAULT_REPEAT = 5
+DEFAULT_SAMPLES = 20
+BENCH_OPERATIONS = (
+    "load_state",
+    "save_state",
+    "cmd_summary",
+    "iter_categories",
+    "add_transaction",
+)
+SYNTHETIC_START = datetime(2020, 1, 1)
+
+# Share of transactions per category, roughly what a household ledger shows.
+CATEGORY_WEIGHTS = {"spend": 0.55, "need": 0.25, "save": 0.15, "share": 0.05}
+# Descriptions are drawn with Zipf-like weights so a few dominate, as in real
+# ledgers; about a third of the rows have no description at all.
+DESCRIPTIONS = (
+    "Snacks", "Lunch", "Bus fare", "Groceries", "Coffee", "Movie tickets",
+    "Piggy bank", "Birthday gift", "Books", "Phone credit", "Game", "Donation",
+    "School supplies", "Swimming", "Ice cream", "Clothes", "Music", "Toys",
+    "Charity run", "Savings jar", "Haircut", "Bike repair", "Stickers", "Pizza",
+)
+_DESCRIPTION_WEIGHTS = [1 / rank for rank in range(1, len(DESCRIPTIONS) + 1)]
+_EMPTY_DESCRIPTION_RATE = 0.35
+# Mean gap between synthetic transactions; 10**7 rows span about 190 years.
+_MEAN_GAP_SECONDS = 600.0
+
+
+def parse_size(text: str) -> int:
+    """Parse a ledger size such as ``5000``, ``1e6``, ``10k`` or ``2M``."""
+
+    scale = {"k": 10**3, "m": 10**6}.get(text[-1:].lower(), 1)
+    digits = text[:-1] if scale != 1 else text
+    try:
+        size = int(float(digits) * scale)
+    except ValueError:
+        raise ValueError(f"Invalid ledger size: {text!r}") from None
+    if size < 1:
+        raise ValueError(f"Ledger size must be positive: {text!r}")
+    return size
+
+
+def iter_synthetic_rows(
+    count: int, seed: int = 0, start: datetime = SYNTHETIC_START
+) -> Iterator[Tuple[str, float, str, datetime]]:
+    """Yield ``(category, amount, description, timestamp)`` for *count* rows.
+
+    The rows are reproducible for a given *seed*: categories and descriptions
+    follow skewed distributions, amounts are log-normal (a median of a few
+    units with a long tail) and timestamps increase with random gaps.
+    """
+
+    rng = random.Random(seed)
+    categories = list(CATEGORY_WEIGHTS)
+    category_weights = list(CATEGORY_WEIGHTS.values())
+    timestamp = start
+    for _ in range(count):
+        category = rng.choices(categories, category_weights)[0]
+        amount = max(0.01, round(rng.lognormvariate(1.6, 0.9), 2))
+        if rng.random() < _EMPTY_DESCRIPTION_RATE:
+            description = ""
+        else:
+            description = rng.choices(DESCRIPTIONS, _DESCRIPTION_WEIGHTS)[0]
+        timestamp += timedelta(seconds=round(rng.expovariate(1 / _MEAN_GAP_SECONDS)))
+        yield category, amount, description, timestamp
+
+
+def synthetic_state(count: int, seed: int = 0) -> AllowanceState:
+    """Build a state holding *count* synthetic transactions in a columnar table."""
+
+    table = TransactionTable()
+    for row in iter_synthetic_rows(count, seed):
+        table.append_values(*row)
+    state = AllowanceState(plan=AllowancePlan(income=0.0, allocation={}), transactions=table)
+    # Allocate a little more than was spent so every category has headroom.
+    allocation = {
+        category: round(state.spent_for(category) * 1.1, 2)
+        for category in CATEGORY_WEIGHTS
+    }
+    state.plan = AllowancePlan(income=round(sum(allocation.values()), 2), allocation=allocation)
+    return state
+
+
+def write_synthetic_ledger(
+    path: Path, count: int, seed: int = 0, backend: Optional[str] = None
+) -> Path:
+    """Write a synthetic ledger of *count* transactions to *path*."""
+
+    get_backend(path, backend).save(synthetic_state(count, seed), path)
+    return path
+
+
+@dataclass
+class Timing:
+    """Latencies of one benchmarked operation, in seconds per call."""
+
+    samples: List[float] = field(default_factory=list)
+    #: Rows processed per call, used to express throughput in rows/s.
+    rows: int = 1
+
+    @staticmethod
+    def _percentile(ordered: Sequence[float], percent: float) -> float:
+        rank = max(1, math.ceil(percent / 100 * len(ordered)))
+        return ordered[rank - 1]
+
+    def to_dict(self) -> Dict[str, Any]:
+        ordered = sorted(self.samples)
+        mean = sum(ordered) / len(ordered)
+        return {
+            "samples": len(ordered),
+            "mean": mean,
+            "min": ordered[0],
+            "p50": self._percentile(ordered, 50),
+            "p99": self._percentile(ordered, 99),
+            "throughput": self.rows / mean if mean else None,
+            "unit": "rows/s" if self.rows > 1 else "ops/s",
+        }
+
+
+def _time(operation: Callable[[], Any], repeat: int, number: int = 1) -> List[float]:
+    """Return the mean duration of *number* calls, measured *repeat* times."""
+
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(number):
+            operation()
+        samples.append((time.perf_counter() - started) / number)
+    return samples
+
+
+def peak_rss() -> Optional[int]:
+    """Return this process's peak resident set size in bytes, if known."""
+
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ``ru_maxrss`` is reported in kilobytes on Linux but in bytes on macOS.
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+def bench_size(
+    size: int,
+    workdir: Path,
+    backend: Optional[str] = None,
+    repeat: int = DEFAULT_REPEAT,
+    samples: int = DEFAULT_SAMPLES,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """Benchmark every operation in :data:`BENCH_OPERATIONS` on one ledger size."""
+
+    # Imported here because the command line module imports this one.
+    from .cli import build_parser, cmd_summary
+
+    resolved = get_backend(None, backend)
+    suffix = {"sqlite": SQLITE_SUFFIXES[0], "binary": BINARY_SUFFIXES[0]}.get(
+        resolved.name, ".json"
+    )
+    path = workdir / f"ledger-{size}{suffix}"
+    started = time.perf_counter()
+    write_synthetic_ledger(path, size, seed, resolved.name)
+    generated = time.perf_counter() - started
+
+    timings: Dict[str, Timing] = {}
+    timings["load_state"] = Timing(_time(lambda: resolved.load(path), repeat), size)
+    state = resolved.load(path)
+    timings["save_state"] = Timing(_time(lambda: resolved.save(state, path), repeat), size)
+    del state
+
+    summary_args = build_parser().parse_args(
+        ["--storage", str(path), "--backend", resolved.name, "summary"]
+    )
+    timings["cmd_summary"] = Timing(_time(lambda: cmd_summary(summary_args), repeat))
+
+    ledger = AllowanceLedger.load(path, backend=resolved)
+    timings["iter_categories"] = Timing(
+        _time(lambda: list(ledger.iter_categories()), repeat, number=1000)
+    )
+    # Appends go through the ledger's backend exactly as ``record`` would, so
+    # the cost of persisting a single transaction is part of the latency.
+    rows = iter_synthetic_rows(samples, seed + 1)
+    timings["add_transaction"] = Timing(
+        _time(lambda: ledger.add_transaction(*next(rows)[:3]), samples)
+    )
+
+    return {
+        "size": size,
+        "backend": resolved.name,
+        "file_bytes": path.stat().st_size,
+        "generate_seconds": generated,
+        "peak_rss_bytes": peak_rss(),
+        "operations": {name: timing.to_dict() for name, timing in timings.items()},
+    }
+
+
+def _package_version() -> str:
+    try:
+        return metadata.version("allowance")
+    except metadata.PackageNotFoundError:
+        return "unknown"
+
+
+def run_benchmarks(
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    backend: Optional[str] = None,
+    repeat: int = DEFAULT_REPEAT,
+    samples: int = DEFAULT_SAMPLES,
+    seed: int = 0,
+    workdir: Optional[Path] = None,
+    isolate: bool = True,
+) -> Dict[str, Any]:
+    """Benchmark ledgers of each of *sizes* and return a JSON-ready report.
+
+    With *isolate*, every size runs in a fresh worker process so the reported
+    peak RSS belongs to that size alone.  Ledgers are written to *workdir*, or
+    to a temporary directory that is removed afterwards.
+    """
+
+    report: Dict[str, Any] = {
+        "allowance_version": _package_version(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": datetime.now().isoformat(timespec="seconds"),
+        "backend": get_backend(None, backend).name,
+        "repeat": repeat,
+        "samples": samples,
+        "seed": seed,
+        "results": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="allowance-bench-") as scratch:
+        directory = workdir or Path(scratch)
+        directory.mkdir(parents=True, exist_ok=True)
+        for size in sizes:
+            arguments = (size, directory, backend, repeat, samples, seed)
+            if isolate:
+                with ProcessPoolExecutor(max_workers=1) as executor:
+                    result = executor.submit(bench_size, *arguments).result()
+            else:
+                result = bench_size(*arguments)
+            report["results"].append(result)
+    return report
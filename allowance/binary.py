@@ -0,0 +1,297 @@
+"""Compact binary ledger format read through ``mmap``.
+
+A binary ledger is laid out as::
+
+    header    magic, format version, record count and region offsets
+    metadata  JSON: the plan, the category names and the aggregate totals
+    records   one fixed-width record per transaction, 8-byte aligned
+    heap      every distinct description once, as a length-prefixed string
+
+Each record packs the category code, the offset of its description in the
+heap, the amount in integer cents and the epoch timestamp (see
+:data:`RECORD`).  Readers map the file and walk the record region with
+:func:`struct.iter_unpack` (or a NumPy structured view) over a
+``memoryview``, so loading a ledger costs a page fault per page rather than a
+JSON decode per row, and a summary only reads the metadata.
+"""
+from __future__ import annotations
+
+from array import array
+import json
+import mmap
+from pathlib import Path
+import struct
+from typing import Any, Dict, Iterable, Iterator, MutableSequence, Optional, Tuple
+
+from . import tracing
+from .models import (
+    TRANSACTION_FIELDS,
+    AllowancePlan,
+    AllowanceState,
+    LedgerSummary,
+    Transaction,
+    from_epoch,
+    validate_transaction,
+)
+from .money import from_cents
+from .table import TransactionTable
+
+try:  # pragma: no cover - depends on the environment
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None  # type: ignore[assignment]
+
+MAGIC = b"ALWB"
+FORMAT_VERSION = 1
+
+#: magic, version, flags, metadata length, record count, records offset,
+#: heap offset, heap length.
+HEADER = struct.Struct("<4sHHIQQQQ")
+#: category code, padding, description offset, cents, epoch seconds.
+RECORD = struct.Struct("<B3xIqd")
+_LENGTH = struct.Struct("<I")
+_ALIGNMENT = 8
+
+_RECORD_DTYPE = (
+    numpy.dtype(
+        {
+            "names": ["code", "description", "cents", "timestamp"],
+            "formats": ["u1", "<u4", "<i8", "<f8"],
+            "offsets": [0, 4, 8, 16],
+            "itemsize": RECORD.size,
+        }
+    )
+    if numpy is not None
+    else None
+)
+
+
+def is_binary(path: Path) -> bool:
+    """Return whether *path* exists and starts with the binary ledger magic."""
+
+    try:
+        with path.open("rb") as handle:
+            return handle.read(len(MAGIC)) == MAGIC
+    except (FileNotFoundError, IsADirectoryError):
+        return False
+
+
+def _full_table(transactions: Iterable[Transaction]) -> TransactionTable:
+    if isinstance(transactions, TransactionTable) and transactions.fields == TRANSACTION_FIELDS:
+        return transactions
+    return TransactionTable(transactions)
+
+
+@tracing.traced("binary.encode")
+def encode(state: AllowanceState) -> bytes:
+    """Return *state* in the binary ledger format."""
+
+    if state.is_partial:
+        raise ValueError("Cannot save a state that was loaded with a field projection.")
+    table = _full_table(state.transactions)
+    summary = state.summary()
+
+    heap = bytearray()
+    offsets = []
+    for description in table.descriptions:
+        offsets.append(len(heap))
+        encoded = description.encode("utf-8")
+        heap += _LENGTH.pack(len(encoded)) + encoded
+
+    count = len(table)
+    if numpy is not None:
+        records = numpy.zeros(count, dtype=_RECORD_DTYPE)
+        records["code"] = numpy.frombuffer(table.codes, dtype=numpy.uint8)
+        ids = numpy.frombuffer(table.description_ids, dtype=numpy.uint32)
+        records["description"] = numpy.asarray(offsets, dtype=numpy.uint32)[ids]
+        records["cents"] = numpy.frombuffer(table.cents, dtype=numpy.int64)
+        records["timestamp"] = numpy.frombuffer(table.timestamps, dtype=numpy.float64)
+        body = records.tobytes()
+    else:
+        pack = RECORD.pack
+        body = b"".join(
+            pack(code, offsets[ident], cents, timestamp)
+            for code, ident, cents, timestamp in zip(
+                table.codes, table.description_ids, table.cents, table.timestamps
+            )
+        )
+
+    metadata = json.dumps(
+        {
+            "plan": {"income": state.plan.income, "allocation": state.plan.allocation},
+            "categories": list(table.categories),
+            "spent_cents": summary.spent_cents,
+            "transaction_count": summary.transaction_count,
+        }
+    ).encode("utf-8")
+    records_offset = HEADER.size + len(metadata)
+    padding = -records_offset % _ALIGNMENT
+    records_offset += padding
+    heap_offset = records_offset + len(body)
+    header = HEADER.pack(
+        MAGIC, FORMAT_VERSION, 0, len(metadata), count, records_offset, heap_offset, len(heap)
+    )
+    return b"".join((header, metadata, bytes(padding), body, heap))
+
+
+class BinaryLedger:
+    """A binary ledger file mapped into memory.
+
+    Records are decoded on demand straight from the mapping; nothing is
+    copied until a caller asks for columns or transactions.  Use it as a
+    context manager so the mapping is released.
+    """
+
+    def __init__(self, path: Path) -> None:
+        with path.open("rb") as handle:
+            self._map = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            self._parse()
+        except Exception:
+            self._map.close()
+            raise
+
+    def _parse(self) -> None:
+        if len(self._map) < HEADER.size:
+            raise ValueError("Not a binary ledger: the file is too short.")
+        (
+            magic, version, _flags, metadata_length, count,
+            records_offset, heap_offset, heap_length,
+        ) = HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            raise ValueError("Not a binary ledger.")
+        if version != FORMAT_VERSION:
+            raise ValueError(f"Unsupported binary ledger version: {version}")
+        if (
+            records_offset < HEADER.size + metadata_length
+            or heap_offset != records_offset + count * RECORD.size
+            or len(self._map) != heap_offset + heap_length
+        ):
+            raise ValueError("The binary ledger is truncated or corrupt.")
+        self.metadata: Dict[str, Any] = json.loads(
+            self._map[HEADER.size:HEADER.size + metadata_length]
+        )
+        self.count = count
+        self.categories: Tuple[str, ...] = tuple(self.metadata["categories"])
+        self._view = memoryview(self._map)
+        self.records = self._view[records_offset:heap_offset]
+        self.heap = self._view[heap_offset:]
+
+    def close(self) -> None:
+        for view in (self.records, self.heap, self._view):
+            view.release()
+        self._map.close()
+
+    def __enter__(self) -> "BinaryLedger":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def plan(self) -> AllowancePlan:
+        plan = self.metadata.get("plan", {})
+        return AllowancePlan(
+            income=float(plan.get("income", 0.0)),
+            allocation={k: float(v) for k, v in plan.get("allocation", {}).items()},
+        )
+
+    def summary(self) -> LedgerSummary:
+        return LedgerSummary(
+            plan=self.plan,
+            spent_cents={k: int(v) for k, v in self.metadata["spent_cents"].items()},
+            transaction_count=int(self.metadata["transaction_count"]),
+        )
+
+    def description(self, offset: int) -> str:
+        (length,) = _LENGTH.unpack_from(self.heap, offset)
+        start = offset + _LENGTH.size
+        return str(self.heap[start:start + length], "utf-8")
+
+    def iter_records(self) -> Iterator[Tuple[int, int, int, float]]:
+        """Yield ``(code, description_offset, cents, timestamp)`` per record."""
+
+        return RECORD.iter_unpack(self.records)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        categories = self.categories
+        descriptions: Dict[int, str] = {}
+        for code, offset, cents, timestamp in self.iter_records():
+            description = descriptions.get(offset)
+            if description is None:
+                description = descriptions[offset] = self.description(offset)
+            yield Transaction(
+                category=categories[code],
+                amount=from_cents(cents),
+                description=description,
+                timestamp=from_epoch(timestamp),
+            )
+
+    def _validate(self, codes: "array[int]", cents: "array[int]") -> None:
+        """Check the rows in bulk instead of building a Transaction for each."""
+
+        used = set(codes.tobytes())
+        if used and max(used) >= len(self.categories):
+            raise ValueError("The binary ledger refers to an unknown category.")
+        for code in used:
+            validate_transaction(self.categories[code], 0.0)
+        if cents and min(cents) < 0:
+            raise ValueError("Transaction amount must be non-negative.")
+
+    def table(self, fields: Optional[Iterable[str]] = None) -> TransactionTable:
+        """Copy the records into a :class:`TransactionTable`, column by column."""
+
+        table = TransactionTable(fields=fields)
+        if numpy is not None:
+            records = numpy.frombuffer(self.records, dtype=_RECORD_DTYPE, count=self.count)
+            codes = array("B", records["code"].tobytes())
+            cents = array("q", records["cents"].tobytes())
+            timestamps = array("d", records["timestamp"].tobytes())
+            offsets, inverse = numpy.unique(records["description"], return_inverse=True)
+            ids = array("I", inverse.astype(numpy.uint32).tobytes())
+            offsets = offsets.tolist()
+        else:
+            columns = list(zip(*self.iter_records())) or [(), (), (), ()]
+            codes = array("B", columns[0])
+            cents = array("q", columns[2])
+            timestamps = array("d", columns[3])
+            seen: Dict[int, int] = {}
+            ids = array("I", [seen.setdefault(offset, len(seen)) for offset in columns[1]])
+            offsets = list(seen)
+        self._validate(codes, cents)
+        table.load_columns(
+            self.categories,
+            [self.description(offset) for offset in offsets],
+            codes,
+            cents,
+            timestamps,
+            ids,
+        )
+        return table
+
+
+@tracing.traced("binary.load")
+def read_binary(
+    path: Path,
+    columnar: bool = False,
+    fields: Optional[Iterable[str]] = None,
+) -> Tuple[AllowancePlan, MutableSequence[Transaction]]:
+    """Return the plan and transactions stored in the binary ledger *path*."""
+
+    with BinaryLedger(path) as ledger:
+        plan = ledger.plan
+        if fields is not None:
+            return plan, ledger.table(fields)
+        table = ledger.table()
+    return plan, table if columnar else list(table)
+
+
+def read_binary_summary(path: Path) -> LedgerSummary:
+    """Return the totals recorded in the metadata of *path* without the records."""
+
+    with BinaryLedger(path) as ledger:
+        return ledger.summary()
+
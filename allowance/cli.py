@@ -2,11 +2,36 @@
 from __future__ import annotations
 
 import argparse
+import asyncio
+import cProfile
+from datetime import datetime, timedelta
+import json
 from pathlib import Path
-from typing import Dict
+import sys
+from typing import ContextManager, Dict, List, Optional, Tuple
 
-from .models import ALLOWED_CATEGORIES
-from .planner import AllowanceLedger
+from . import tracing
+from .alerts import BudgetAlert, BudgetAlerts, shell_hook
+from .analytics import DEFAULT_WINDOW, PERIODS, forecast, rollup
+from .archive import COMPRESSIONS, close_period, count_history, query_history, stream_history
+from .bench import DEFAULT_REPEAT, DEFAULT_SAMPLES, DEFAULT_SIZES, parse_size, run_benchmarks
+from .groupcommit import group_commit
+from .models import (
+    ALLOWED_CATEGORIES,
+    AllowancePlan,
+    AllowanceState,
+    Transaction,
+    to_naive_utc,
+)
+from .money import from_cents
+from .backends import BACKENDS, StorageBackend, convert_ledger, get_backend
+from .exporter import BUFFER_SIZE, EXPORT_FORMATS, export_transactions
+from .importer import IMPORT_FORMATS, import_transactions
+from .planner import AllowanceLedger, load_summary, report_ledgers, resolve_storage
+from .server import DEFAULT_FLUSH_INTERVAL, LedgerClient, LedgerServer, parse_address
+from .storage import ledger_lock
+from .store import DEFAULT_MAX_BYTES, DEFAULT_MAX_LEDGERS, DEFAULT_STORE_ROOT, LedgerStore
+from .webapi import DEFAULT_WEB_PORT, WebServer
 
 
 def build_parser() -> argparse.ArgumentParser:
@@ -15,7 +40,56 @@ def build_parser() -> argparse.ArgumentParser:
         "--storage",
         type=Path,
         default=None,
-        help="Path to the JSON file where allowance data will be stored.",
+        help="Path to the file where allowance data will be stored.",
+    )
+    parser.add_argument(
+        "--ledger",
+        default=None,
+        metavar="NAME",
+        help="Use the named ledger in the --store directory instead of --storage.",
+    )
+    parser.add_argument(
+        "--store",
+        type=Path,
+        default=DEFAULT_STORE_ROOT,
+        metavar="DIR",
+        help=f"Directory holding the named ledgers (default: {DEFAULT_STORE_ROOT}).",
+    )
+    parser.add_argument(
+        "--backend",
+        choices=sorted(BACKENDS),
+        default=None,
+        help="Storage format to use (default: guessed from the file extension).",
+    )
+    parser.add_argument(
+        "--server",
+        default=None,
+        metavar="ADDRESS",
+        help="Send plan/record/summary/reset to a running 'allowance serve' "
+        "(unix:PATH or HOST:PORT) instead of touching the file.",
+    )
+    parser.add_argument(
+        "--journal",
+        action="store_true",
+        help="Append new transactions to a journal instead of rewriting the file.",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print a breakdown of where the command spent its time to stderr.",
+    )
+    parser.add_argument(
+        "--profile-memory",
+        action="store_true",
+        help="Also track allocations per span (implies --profile; slower).",
+    )
+    parser.add_argument(
+        "--profile-output",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Write a Chrome trace (.json) or cProfile stats (any other suffix) "
+        "to FILE (implies --profile).",
     )
 
     subparsers = parser.add_subparsers(dest="command", required=True)
@@ -38,8 +112,21 @@ def build_parser() -> argparse.ArgumentParser:
     record_parser.add_argument("category", choices=ALLOWED_CATEGORIES)
     record_parser.add_argument("amount", type=float)
     record_parser.add_argument("description", nargs="*", help="Optional description.")
+    record_parser.add_argument(
+        "--group-commit",
+        action="store_true",
+        help="Share the write with other records made at the same moment.",
+    )
+    _add_alert_arguments(record_parser)
 
-    subparsers.add_parser("summary", help="Show the current plan and progress.")
+    summary_parser = subparsers.add_parser(
+        "summary", help="Show the current plan and progress."
+    )
+    summary_parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Verify the cached category totals against a full rescan.",
+    )
 
     reset_parser = subparsers.add_parser(
         "reset", help="Remove recorded transactions (optionally the plan too)."
@@ -50,9 +137,320 @@ def build_parser() -> argparse.ArgumentParser:
         help="Remove the saved plan in addition to transactions.",
     )
 
+    serve_parser = subparsers.add_parser(
+        "serve", help="Keep ledgers in memory and serve requests over a socket."
+    )
+    serve_parser.add_argument("address", help="unix:PATH or HOST:PORT to listen on.")
+    serve_parser.add_argument(
+        "--flush-interval",
+        type=float,
+        default=DEFAULT_FLUSH_INTERVAL,
+        help="Seconds between background writes of pending changes.",
+    )
+    serve_parser.add_argument(
+        "--max-ledgers",
+        type=int,
+        default=DEFAULT_MAX_LEDGERS,
+        help="Ledgers kept in memory before the least recently used are written out.",
+    )
+    serve_parser.add_argument(
+        "--max-memory",
+        type=int,
+        default=DEFAULT_MAX_BYTES // 2**20,
+        metavar="MB",
+        help="Approximate memory, in MiB, the ledgers kept in memory may use.",
+    )
+    _add_alert_arguments(serve_parser)
+
+    web_parser = subparsers.add_parser(
+        "web", help="Serve the web UI and an HTTP API for the ledger."
+    )
+    web_parser.add_argument(
+        "--host", default="127.0.0.1", help="Interface to listen on."
+    )
+    web_parser.add_argument(
+        "--port", type=int, default=DEFAULT_WEB_PORT, help="Port to listen on."
+    )
+
+    history_parser = subparsers.add_parser(
+        "history", help="List transactions in a date range, oldest first."
+    )
+    history_parser.add_argument(
+        "--since",
+        type=_parse_when,
+        default=None,
+        help="Only include transactions on or after this date (YYYY-MM-DD[THH:MM]).",
+    )
+    history_parser.add_argument(
+        "--until",
+        type=_parse_until,
+        default=None,
+        help="Only include transactions up to this date; a bare date is inclusive.",
+    )
+    history_parser.add_argument("--category", choices=ALLOWED_CATEGORIES, default=None)
+    history_parser.add_argument(
+        "--limit", type=int, default=50, help="Number of transactions per page."
+    )
+    history_parser.add_argument(
+        "--offset", type=int, default=0, help="Number of matching transactions to skip."
+    )
+
+    close_parser = subparsers.add_parser(
+        "close-period",
+        help="Move transactions before a date into a compressed archive segment.",
+    )
+    close_parser.add_argument(
+        "--before",
+        type=_parse_when,
+        required=True,
+        help="Archive the transactions dated before this date (YYYY-MM-DD[THH:MM]).",
+    )
+    close_parser.add_argument(
+        "--compression",
+        choices=sorted(COMPRESSIONS),
+        default="gzip",
+        help="How to compress the segment.",
+    )
+
+    trends_parser = subparsers.add_parser(
+        "trends", help="Show spending per week or month and when allocations run out."
+    )
+    trends_parser.add_argument("--period", choices=PERIODS, default="month")
+    trends_parser.add_argument(
+        "--window",
+        type=int,
+        default=DEFAULT_WINDOW,
+        help="Number of periods in the rolling average and the forecast rate.",
+    )
+    trends_parser.add_argument(
+        "--last", type=int, default=12, help="Number of most recent periods to show."
+    )
+
+    report_parser = subparsers.add_parser(
+        "report", help="Summarize many ledger files and merge their totals."
+    )
+    report_parser.add_argument(
+        "sources", nargs="+", help="Ledger files, directories or glob patterns."
+    )
+    report_parser.add_argument(
+        "--workers",
+        type=_positive_int,
+        default=None,
+        help="Number of worker processes (default: one per CPU core).",
+    )
+    report_parser.add_argument(
+        "--chunksize",
+        type=int,
+        default=16,
+        help="Number of ledgers handed to a worker at a time.",
+    )
+
+    import_parser = subparsers.add_parser(
+        "import", help="Import transactions in bulk from a CSV or JSONL file."
+    )
+    import_parser.add_argument("file", type=Path, help="File with one transaction per row.")
+    import_parser.add_argument(
+        "--format",
+        choices=IMPORT_FORMATS,
+        default=None,
+        help="Input format (default: guessed from the file extension).",
+    )
+    import_parser.add_argument(
+        "--commit-every",
+        type=int,
+        default=None,
+        metavar="N",
+        help="Persist after every N imported rows instead of once at the end.",
+    )
+    _add_alert_arguments(import_parser)
+
+    subparsers.add_parser(
+        "compact", help="Fold the transaction journal back into the storage file."
+    )
+
+    export_parser = subparsers.add_parser(
+        "export", help="Stream transactions out as CSV or JSONL, oldest recorded first."
+    )
+    export_parser.add_argument(
+        "--format",
+        choices=EXPORT_FORMATS,
+        default=None,
+        help="Output format (default: guessed from --output, otherwise csv).",
+    )
+    export_parser.add_argument(
+        "--since",
+        type=_parse_when,
+        default=None,
+        help="Only export transactions on or after this date (YYYY-MM-DD[THH:MM]).",
+    )
+    export_parser.add_argument(
+        "--until",
+        type=_parse_until,
+        default=None,
+        help="Only export transactions up to this date; a bare date is inclusive.",
+    )
+    export_parser.add_argument(
+        "--output", type=Path, default=None, help="Write to this file instead of stdout."
+    )
+
+    convert_parser = subparsers.add_parser(
+        "convert", help="Copy a ledger into another storage format."
+    )
+    convert_parser.add_argument("source", type=Path, help="Ledger to read.")
+    convert_parser.add_argument("destination", type=Path, help="File to write.")
+    convert_parser.add_argument(
+        "--to",
+        choices=("binary", "json", "sqlite"),
+        default=None,
+        help="Format to write (default: guessed from the destination's extension).",
+    )
+
+    bench_parser = subparsers.add_parser(
+        "bench", help="Benchmark synthetic ledgers and print the results as JSON."
+    )
+    bench_parser.add_argument(
+        "--sizes",
+        nargs="+",
+        type=_parse_size,
+        default=list(DEFAULT_SIZES),
+        metavar="N",
+        help="Ledger sizes to generate, e.g. 1000 1e5 10k 2M.",
+    )
+    bench_parser.add_argument(
+        "--repeat",
+        type=_positive_int,
+        default=DEFAULT_REPEAT,
+        help="Number of timed runs of each operation.",
+    )
+    bench_parser.add_argument(
+        "--samples",
+        type=_positive_int,
+        default=DEFAULT_SAMPLES,
+        help="Number of transactions recorded when timing add_transaction.",
+    )
+    bench_parser.add_argument(
+        "--seed", type=int, default=0, help="Seed for the synthetic ledgers."
+    )
+    bench_parser.add_argument(
+        "--output", type=Path, default=None, help="Also write the JSON results here."
+    )
+    bench_parser.add_argument(
+        "--workdir",
+        type=Path,
+        default=None,
+        help="Keep the generated ledgers in this directory.",
+    )
+
     return parser
 
 
+def _add_alert_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument(
+        "--alert-at",
+        type=_parse_alert_at,
+        action="append",
+        default=None,
+        metavar="[CATEGORY=]PERCENT",
+        help="Alert when spending crosses this percentage of a category's plan "
+        "(repeatable; default: 80 and 100).",
+    )
+    parser.add_argument(
+        "--alert-command",
+        default=None,
+        metavar="CMD",
+        help="Shell command to run for each alert, with the details in "
+        "ALLOWANCE_* environment variables.",
+    )
+
+
+def _positive_int(text: str) -> int:
+    try:
+        value = int(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid integer: {text!r}") from None
+    if value < 1:
+        raise argparse.ArgumentTypeError("the value must be at least 1")
+    return value
+
+
+def _parse_size(text: str) -> int:
+    try:
+        return parse_size(text)
+    except ValueError as exc:
+        raise argparse.ArgumentTypeError(str(exc)) from None
+
+
+def _parse_when(text: str) -> datetime:
+    try:
+        when = datetime.fromisoformat(text)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date: {text!r}") from None
+    # Stored timestamps are naive UTC, so compare against the same.
+    return to_naive_utc(when)
+
+
+def _parse_until(text: str) -> datetime:
+    until = _parse_when(text)
+    if len(text) == len("YYYY-MM-DD"):
+        # A bare date includes the whole day.
+        until += timedelta(days=1)
+    return until
+
+
+def _parse_alert_at(text: str) -> Tuple[Optional[str], float]:
+    category, _, percent = text.rpartition("=")
+    if category and category not in ALLOWED_CATEGORIES:
+        raise argparse.ArgumentTypeError(f"unknown category: {category!r}")
+    try:
+        value = float(percent.rstrip("%"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid percentage: {percent!r}") from None
+    if value <= 0:
+        raise argparse.ArgumentTypeError("the percentage must be positive")
+    return category or None, value
+
+
+def _alert_thresholds(args: argparse.Namespace) -> Dict[Optional[str], List[float]]:
+    thresholds: Dict[Optional[str], List[float]] = {}
+    for category, percent in args.alert_at or ():
+        thresholds.setdefault(category, []).append(percent)
+    return thresholds
+
+
+def _watch_alerts(ledger: AllowanceLedger, args: argparse.Namespace) -> List[BudgetAlert]:
+    """Collect the alerts *ledger* raises while the command runs."""
+
+    raised: List[BudgetAlert] = []
+    ledger.alerts.configure(_alert_thresholds(args))
+    ledger.alerts.subscribe(raised.append)
+    return raised
+
+
+def _committed_alerts(
+    path: Path, backend: StorageBackend, txn: Transaction, args: argparse.Namespace
+) -> List[BudgetAlert]:
+    """Check the thresholds *txn* crossed, from the summary after it was written.
+
+    With group commit, records committed together with *txn* count towards
+    the total it is compared against, so a crossing they share is reported
+    by each of them.
+    """
+
+    alerts = BudgetAlerts()
+    alerts.configure(_alert_thresholds(args))
+    summary = backend.load_summary(path)
+    return alerts.check(summary.plan, txn, summary.spent_cents.get(txn.category, 0))
+
+
+def _report_alerts(raised: List[BudgetAlert], args: argparse.Namespace) -> List[str]:
+    # The hook runs once the ledger lock is released, so it may use the ledger.
+    if args.alert_command:
+        hook = shell_hook(args.alert_command)
+        for alert in raised:
+            hook(alert)
+    return [f"Alert: {alert.message()}" for alert in raised]
+
+
 def _collect_allocations(args: argparse.Namespace) -> Dict[str, float]:
     allocations: Dict[str, float] = {}
     for category in ALLOWED_CATEGORIES:
@@ -63,18 +461,33 @@ def _collect_allocations(args: argparse.Namespace) -> Dict[str, float]:
 
 
 def _ledger_from_args(args: argparse.Namespace) -> AllowanceLedger:
-    return AllowanceLedger.load(args.storage)
+    return AllowanceLedger.load(args.storage, backend=args.backend, journal=args.journal)
+
+
+def _locked_ledger(args: argparse.Namespace) -> ContextManager[AllowanceLedger]:
+    return AllowanceLedger.locked(args.storage, backend=args.backend, journal=args.journal)
+
+
+def _client_from_args(args: argparse.Namespace) -> LedgerClient:
+    return LedgerClient(
+        parse_address(args.server), args.storage, args.backend, args.journal
+    )
 
 
 def cmd_plan(args: argparse.Namespace) -> str:
     allocations = _collect_allocations(args)
-    ledger = _ledger_from_args(args)
-    plan = ledger.set_plan(args.income, allocations)
+    if args.server:
+        with _client_from_args(args) as client:
+            plan, categories = client.set_plan(args.income, allocations)
+    else:
+        with _locked_ledger(args) as ledger:
+            plan = ledger.set_plan(args.income, allocations)
+            categories = list(ledger.iter_categories())
     lines = [
         "Allowance plan saved:",
         f"  Income: {plan.income:.2f}",
     ]
-    for category in ledger.iter_categories():
+    for category in categories:
         lines.append(
             f"  {category.title():<8}: {plan.category_amount(category):.2f}"
         )
@@ -85,47 +498,346 @@ def cmd_plan(args: argparse.Namespace) -> str:
 
 def cmd_record(args: argparse.Namespace) -> str:
     description = " ".join(args.description) if args.description else ""
-    ledger = _ledger_from_args(args)
-    txn = ledger.add_transaction(args.category, args.amount, description)
-    return (
+    raised: List[BudgetAlert] = []
+    if args.server:
+        with _client_from_args(args) as client:
+            txn = client.add_transaction(args.category, args.amount, description)
+    elif args.group_commit:
+        txn = Transaction(category=args.category, amount=args.amount, description=description)
+        storage_path, backend = resolve_storage(args.storage, args.backend, args.journal)
+        group_commit(storage_path, [txn], backend)
+        if args.alert_at or args.alert_command:
+            raised = _committed_alerts(storage_path, backend, txn, args)
+    else:
+        storage_path, backend = resolve_storage(args.storage, args.backend, args.journal)
+        if backend.append_needs_state:
+            with _locked_ledger(args) as ledger:
+                raised = _watch_alerts(ledger, args)
+                txn = ledger.add_transaction(args.category, args.amount, description)
+        else:
+            # A journaled record is appended without loading the ledger, so
+            # recording costs the same however long the history is.
+            txn = Transaction(category=args.category, amount=args.amount, description=description)
+            state = AllowanceState(plan=AllowancePlan(income=0.0, allocation={}), transactions=[])
+            state.add_transaction(txn)
+            with ledger_lock(storage_path):
+                backend.append(state, txn, storage_path)
+                raised = _committed_alerts(storage_path, backend, txn, args)
+    lines = [
         f"Recorded {txn.amount:.2f} to {txn.category}."
         + (f" Note: {txn.description}" if txn.description else "")
-    )
+    ]
+    lines.extend(_report_alerts(raised, args))
+    return "\n".join(lines)
 
 
 def cmd_summary(args: argparse.Namespace) -> str:
-    ledger = _ledger_from_args(args)
-    plan = ledger.state.plan
+    mismatches = None
+    if args.server:
+        with _client_from_args(args) as client:
+            summary, mismatches = client.summary(check=args.check)
+    elif args.check:
+        ledger = _ledger_from_args(args)
+        mismatches = ledger.state.verify_totals()
+        summary = ledger.summary()
+    else:
+        summary = load_summary(
+            args.storage, backend=args.backend, journal=args.journal, repair=True
+        )
+    plan = summary.plan
     lines = ["Current allowance summary:"]
     lines.append(f"  Income: {plan.income:.2f}")
-    for category in ledger.iter_categories():
-        planned = ledger.planned_amount(category)
-        spent = ledger.spent_amount(category)
-        remaining = planned - spent
+    for category in summary.iter_categories():
+        planned = plan.category_amount(category)
+        spent = summary.spent_for(category)
+        remaining = summary.remaining_for(category)
         lines.append(
             f"  {category.title():<8} Planned: {planned:6.2f} | Spent: {spent:6.2f} | Remaining: {remaining:6.2f}"
         )
     if plan.unallocated > 0:
         lines.append(f"  Unallocated funds: {plan.unallocated:.2f}")
-    if not ledger.state.transactions:
+    if not summary.transaction_count:
         lines.append("  No transactions recorded yet.")
+    if mismatches is not None:
+        for category, (cached, actual) in sorted(mismatches.items()):
+            lines.append(
+                f"  Inconsistent total for {category}: cached {cached:.2f}, rescanned {actual:.2f}"
+            )
+        if not mismatches:
+            lines.append(
+                f"  Cached totals verified against {summary.transaction_count} transaction(s)."
+            )
     return "\n".join(lines)
 
 
 def cmd_reset(args: argparse.Namespace) -> str:
-    ledger = _ledger_from_args(args)
-    ledger.clear_transactions()
-    message = "All recorded transactions have been removed."
+    if args.server:
+        with _client_from_args(args) as client:
+            client.reset(everything=args.everything)
+    else:
+        with _locked_ledger(args) as ledger:
+            ledger.clear_transactions()
+            if args.everything:
+                ledger.set_plan(0.0, {})
     if args.everything:
-        ledger.set_plan(0.0, {})
-        message = "All transactions and the allowance plan have been removed."
-    return message
+        return "All transactions and the allowance plan have been removed."
+    return "All recorded transactions have been removed."
+
+
+def cmd_serve(args: argparse.Namespace) -> str:
+    address = parse_address(args.address)
+    server = LedgerServer(
+        flush_interval=args.flush_interval,
+        alert_command=args.alert_command,
+        alert_thresholds=_alert_thresholds(args),
+        max_ledgers=args.max_ledgers,
+        max_bytes=args.max_memory * 2**20,
+    )
+    try:
+        asyncio.run(server.serve(address))
+    except KeyboardInterrupt:
+        pass
+    return "Ledger server stopped."
+
+
+def cmd_web(args: argparse.Namespace) -> str:
+    server = WebServer((args.host, args.port), _ledger_from_args(args))
+    host, port = server.server_address[:2]
+    print(f"Serving the web UI on http://{host}:{port}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return "Web server stopped."
+
+
+def cmd_history(args: argparse.Namespace) -> str:
+    ledger = _ledger_from_args(args)
+    total = count_history(ledger, args.since, args.until, args.category)
+    rows = query_history(
+        ledger, args.since, args.until, args.category, args.offset, args.limit
+    )
+    lines = []
+    for txn in rows:
+        lines.append(
+            f"  {txn.timestamp:%Y-%m-%d %H:%M}  {txn.category.title():<8} {txn.amount:8.2f}"
+            + (f"  {txn.description}" if txn.description else "")
+        )
+    if not lines:
+        return f"No transactions found ({total} match)."
+    first = args.offset + 1
+    last = args.offset + len(lines)
+    return "\n".join([f"Transactions {first}-{last} of {total}:", *lines])
+
+
+def cmd_close_period(args: argparse.Namespace) -> str:
+    with _locked_ledger(args) as ledger:
+        segment = close_period(ledger, args.before, args.compression)
+    if segment is None:
+        return f"No transactions before {args.before:%Y-%m-%d %H:%M}; nothing to archive."
+    count = segment.header()["transaction_count"]
+    return f"Archived {count} transaction(s) to {segment.path}."
+
+
+def cmd_trends(args: argparse.Namespace) -> str:
+    if args.window < 1:
+        raise SystemExit("--window must be at least 1.")
+    ledger = AllowanceLedger.load(
+        args.storage, backend=args.backend, journal=args.journal, fields=("timestamp",)
+    )
+    transactions = ledger.state.transactions
+    periods = rollup(transactions, args.period)
+    if not len(periods):
+        return "No transactions recorded yet."
+    categories = periods.categories
+    rolling = periods.rolling_average(window=args.window)
+    labels = periods.labels()
+    totals = periods.totals()
+    shown = range(max(0, len(periods) - args.last), len(periods))
+    title = "Weekly" if args.period == "week" else "Monthly"
+    header = "".join(f"{category.title():>10}" for category in categories)
+    lines = [
+        f"{title} spending, {labels[0]} to {labels[-1]} ({len(periods)} period(s), "
+        f"{args.window}-period rolling average):",
+        f"  {'Period':<10}{header}{'Total':>10}{'Rolling':>10}",
+    ]
+    for index in shown:
+        cells = "".join(
+            f"{from_cents(periods.cents[category][index]):10.2f}" for category in categories
+        )
+        lines.append(
+            f"  {labels[index]:<10}{cells}{from_cents(totals[index]):10.2f}"
+            f"{from_cents(rolling[index]):10.2f}"
+        )
+
+    lines.append("Projected run-out at the recent spending rate:")
+    for outlook in forecast(
+        ledger.state.plan, transactions, args.period, args.window, periods=periods
+    ):
+        name = f"  {outlook.category.title():<8}"
+        if outlook.exhausted:
+            when = f" on {outlook.run_out:%Y-%m-%d}" if outlook.run_out else ""
+            lines.append(f"{name} Allocation used up{when}")
+        elif outlook.run_out is None:
+            lines.append(
+                f"{name} Remaining {from_cents(outlook.remaining_cents):.2f}, nothing spent recently"
+            )
+        else:
+            lines.append(
+                f"{name} Remaining {from_cents(outlook.remaining_cents):.2f} at "
+                f"{from_cents(outlook.daily_cents):.2f}/day -> {outlook.run_out:%Y-%m-%d}"
+            )
+    return "\n".join(lines)
+
+
+def cmd_report(args: argparse.Namespace) -> str:
+    report = report_ledgers(args.sources, args.backend, args.workers, args.chunksize)
+    if not report.rows and not report.errors:
+        return "No ledger files found."
+    categories = report.iter_categories()
+    width = max([len("All ledgers"), *(len(path.name) for path, _ in report.rows)])
+    header = "".join(f"{category.title():>10}" for category in categories)
+    lines = [
+        f"Report for {len(report.rows)} ledger(s), {report.transaction_count} transaction(s):",
+        f"  {'Ledger':<{width}}{header}{'Total':>10}",
+    ]
+    for path, summary in report.rows:
+        cells = "".join(f"{summary.spent_for(c):10.2f}" for c in categories)
+        total = from_cents(sum(summary.spent_cents.values()))
+        lines.append(f"  {path.name:<{width}}{cells}{total:10.2f}")
+    cells = "".join(f"{report.spent.get(c, 0.0):10.2f}" for c in categories)
+    total = from_cents(sum(report.spent_cents.values()))
+    lines.append(f"  {'All ledgers':<{width}}{cells}{total:10.2f}")
+    cells = "".join(f"{report.planned.get(c, 0.0):10.2f}" for c in categories)
+    total = from_cents(sum(report.planned_cents.values()))
+    lines.append(f"  {'Planned':<{width}}{cells}{total:10.2f}")
+    for path, error in report.errors:
+        lines.append(f"  Could not read {path}: {error}")
+    return "\n".join(lines)
+
+
+MAX_REPORTED_ERRORS = 20
+
+
+def cmd_import(args: argparse.Namespace) -> str:
+    try:
+        with _locked_ledger(args) as ledger:
+            raised = _watch_alerts(ledger, args)
+            report = import_transactions(ledger, args.file, args.format, args.commit_every)
+    except ValueError as exc:
+        raise SystemExit(str(exc)) from None
+    lines = [f"Imported {report.imported} transaction(s) from {args.file}."]
+    lines.extend(_report_alerts(raised, args))
+    if report.errors:
+        lines.append(f"Skipped {len(report.errors)} invalid row(s):")
+        for error in report.errors[:MAX_REPORTED_ERRORS]:
+            lines.append(f"  line {error.line}: {error.message}")
+        hidden = len(report.errors) - MAX_REPORTED_ERRORS
+        if hidden > 0:
+            lines.append(f"  ... and {hidden} more.")
+    return "\n".join(lines)
+
+
+def cmd_compact(args: argparse.Namespace) -> str:
+    with _locked_ledger(args) as ledger:
+        folded = ledger.compact()
+    if not folded:
+        return "Journal is empty; nothing to compact."
+    return f"Compacted {folded} journaled transaction(s) into {ledger.storage_path}."
+
+
+def cmd_export(args: argparse.Namespace) -> str:
+    fmt = args.format
+    if fmt is None:
+        suffix = args.output.suffix.lower() if args.output else ""
+        fmt = "jsonl" if suffix in (".jsonl", ".ndjson") else "csv"
+    rows = stream_history(args.storage, args.backend, args.journal, args.since, args.until)
+    if args.output is None:
+        count = export_transactions(rows, sys.stdout, fmt)
+        # Keep stdout for the data so it can be piped.
+        print(f"Exported {count} transaction(s).", file=sys.stderr)
+        return ""
+    with args.output.open("w", encoding="utf-8", newline="", buffering=BUFFER_SIZE) as handle:
+        count = export_transactions(rows, handle, fmt)
+    return f"Exported {count} transaction(s) to {args.output}."
+
+
+def cmd_convert(args: argparse.Namespace) -> str:
+    state = convert_ledger(args.source, args.destination, args.to, args.backend)
+    written = get_backend(args.destination, args.to).name
+    return (
+        f"Converted {len(state.transactions)} transaction(s) from {args.source} "
+        f"to {args.destination} ({written})."
+    )
+
+
+def cmd_bench(args: argparse.Namespace) -> str:
+    report = run_benchmarks(
+        args.sizes, args.backend, args.repeat, args.samples, args.seed, args.workdir
+    )
+    output = json.dumps(report, indent=2)
+    if args.output is not None:
+        args.output.write_text(output + "\n", encoding="utf-8")
+    return output
+
+
+SERVER_COMMANDS = ("plan", "record", "summary", "reset")
 
 
 def main(argv: list[str] | None = None) -> str:
     parser = build_parser()
     args = parser.parse_args(argv)
+    if args.server and args.command not in SERVER_COMMANDS:
+        parser.error(f"the {args.command} command cannot be used with --server")
+    if args.journal:
+        try:
+            resolve_storage(args.storage, args.backend, journal=True)
+        except ValueError as exc:
+            parser.error(str(exc))
+    if args.ledger is not None:
+        if args.storage is not None:
+            parser.error("--ledger cannot be used with --storage")
+        store = LedgerStore(args.store, backend=args.backend, journal=args.journal)
+        try:
+            args.storage = store.path(args.ledger, create=True)
+        except ValueError as exc:
+            parser.error(str(exc))
+
+    if not (args.profile or args.profile_memory or args.profile_output):
+        output = run_command(parser, args)
+        if output:
+            print(output)
+        return output
 
+    profiler = None
+    if args.profile_output is not None and args.profile_output.suffix != ".json":
+        profiler = cProfile.Profile()
+    with tracing.collect(memory=args.profile_memory) as collector:
+        if profiler is not None:
+            profiler.enable()
+        try:
+            output = run_command(parser, args)
+        finally:
+            if profiler is not None:
+                profiler.disable()
+    if output:
+        print(output)
+    print(collector.report(), file=sys.stderr)
+    if profiler is not None:
+        profiler.dump_stats(str(args.profile_output))
+    elif args.profile_output is not None:
+        collector.write_chrome_trace(args.profile_output)
+    return output
+
+
+def run_command(parser: argparse.ArgumentParser, args: argparse.Namespace) -> str:
+    with tracing.span(f"cli.{args.command}"):
+        return _dispatch(parser, args)
+
+
+def _dispatch(parser: argparse.ArgumentParser, args: argparse.Namespace) -> str:
     if args.command == "plan":
         output = cmd_plan(args)
     elif args.command == "record":
@@ -134,11 +846,31 @@ def main(argv: list[str] | None = None) -> str:
         output = cmd_summary(args)
     elif args.command == "reset":
         output = cmd_reset(args)
+    elif args.command == "serve":
+        output = cmd_serve(args)
+    elif args.command == "web":
+        output = cmd_web(args)
+    elif args.command == "history":
+        output = cmd_history(args)
+    elif args.command == "close-period":
+        output = cmd_close_period(args)
+    elif args.command == "trends":
+        output = cmd_trends(args)
+    elif args.command == "report":
+        output = cmd_report(args)
+    elif args.command == "import":
+        output = cmd_import(args)
+    elif args.command == "compact":
+        output = cmd_compact(args)
+    elif args.command == "export":
+        output = cmd_export(args)
+    elif args.command == "convert":
+        output = cmd_convert(args)
+    elif args.command == "bench":
+        output = cmd_bench(args)
     else:
         parser.error("Unknown command")
         raise SystemExit(2)
-
-    print(output)
     return output
 
 
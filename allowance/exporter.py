@@ -0,0 +1,46 @@
+"""Streaming export of transactions to CSV or JSONL.
+
+Rows are written one at a time through a buffered handle as they are read
+from the ledger, in the same columns :mod:`allowance.importer` reads back.
+"""
+from __future__ import annotations
+
+import csv
+import json
+from typing import Iterable, TextIO
+
+from .models import Transaction
+from .storage import _serialize_transaction
+
+EXPORT_FORMATS = ("csv", "jsonl")
+EXPORT_FIELDS = ("category", "amount", "description", "timestamp")
+#: Write buffer for export files, large enough to keep writes sequential.
+BUFFER_SIZE = 1 << 20
+
+
+def export_transactions(
+    transactions: Iterable[Transaction], handle: TextIO, fmt: str = "csv"
+) -> int:
+    """Write *transactions* to *handle* in *fmt*; returns the number written.
+
+    *handle* should be opened with ``newline=""`` for CSV.
+    """
+
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    written = 0
+    if fmt == "csv":
+        writer = csv.writer(handle)
+        writer.writerow(EXPORT_FIELDS)
+        for txn in transactions:
+            writer.writerow(
+                (txn.category, f"{txn.amount:.2f}", txn.description, txn.timestamp.isoformat())
+            )
+            written += 1
+    else:
+        dumps = json.dumps
+        for txn in transactions:
+            handle.write(dumps(_serialize_transaction(txn)) + "\n")
+            written += 1
+    handle.flush()
+    return written
@@ -0,0 +1,141 @@
+"""Group commit for ledgers written by many processes at once."""
+from __future__ import annotations
+
+from collections import Counter
+from datetime import datetime
+import json
+import os
+from pathlib import Path
+import time
+from typing import List, Sequence, Tuple
+import uuid
+
+from .backends import StorageBackend
+from .models import AllowancePlan, AllowanceState, Transaction
+from .storage import _deserialize_transaction, _serialize_transaction, atomic_write, ledger_lock
+
+SPOOL_SUFFIX = ".spool"
+INTENT_FILE = "committing.json"
+DEFAULT_COMMIT_WINDOW = 0.01
+_POLL_INTERVAL = 0.002
+
+
+def spool_path(path: Path) -> Path:
+    """Return the directory where group-commit writers queue records for *path*."""
+
+    return path.with_name(path.name + SPOOL_SUFFIX)
+
+
+def _read_tickets(tickets: Sequence[Path]) -> List[Transaction]:
+    transactions: List[Transaction] = []
+    for ticket in tickets:
+        try:
+            text = ticket.read_text(encoding="utf-8")
+        except FileNotFoundError:
+            # Removed by a leader that crashed after committing it.
+            continue
+        for line in text.splitlines():
+            if line:
+                transactions.append(_deserialize_transaction(json.loads(line)))
+    return transactions
+
+
+def _uncommitted(
+    path: Path, backend: StorageBackend, transactions: List[Transaction]
+) -> List[Transaction]:
+    """Return the *transactions* that are not already stored in *path*.
+
+    Only used after a leader crashed mid-commit, so the full scan is rare.
+    Records are matched on every field; their timestamps make them unique.
+    """
+
+    missing = Counter(_key(txn) for txn in transactions)
+    for stored in backend.iter_transactions(path):
+        key = _key(stored)
+        if missing[key]:
+            missing[key] -= 1
+    remaining = []
+    for txn in transactions:
+        key = _key(txn)
+        if missing[key]:
+            missing[key] -= 1
+            remaining.append(txn)
+    return remaining
+
+
+def _key(txn: Transaction) -> Tuple[str, int, str, datetime]:
+    return txn.category, txn.cents, txn.description, txn.timestamp
+
+
+def _commit_spool(path: Path, backend: StorageBackend) -> None:
+    """Persist every queued record in one write; the caller holds the lock.
+
+    The tickets being committed are listed in an intent file before the
+    write and only removed after it.  A leader that finds the intent file
+    left behind by a crash appends just the records that did not make it, so
+    a batch is never stored twice.
+    """
+
+    spool = spool_path(path)
+    intent = spool / INTENT_FILE
+    if intent.exists():
+        tickets = [spool / name for name in json.loads(intent.read_text(encoding="utf-8"))]
+        transactions = _uncommitted(path, backend, _read_tickets(tickets))
+    else:
+        tickets = sorted(spool.glob("*.jsonl"))
+        if not tickets:
+            return
+        transactions = _read_tickets(tickets)
+        atomic_write(intent, json.dumps([ticket.name for ticket in tickets]).encode("utf-8"))
+    if transactions:
+        if backend.append_needs_state:
+            state = backend.load(path)
+        else:
+            state = AllowanceState(
+                plan=AllowancePlan(income=0.0, allocation={}), transactions=[]
+            )
+        for transaction in transactions:
+            state.add_transaction(transaction)
+        backend.append_many(state, transactions, path)
+    _finish(tickets, intent)
+
+
+def _finish(tickets: Sequence[Path], intent: Path) -> None:
+    for ticket in tickets:
+        ticket.unlink(missing_ok=True)
+    intent.unlink()
+
+
+def group_commit(
+    path: Path,
+    transactions: Sequence[Transaction],
+    backend: StorageBackend,
+    window: float = DEFAULT_COMMIT_WINDOW,
+) -> None:
+    """Durably append *transactions*, sharing the write with concurrent writers.
+
+    Each writer queues its records in the spool directory next to *path*.
+    Whoever obtains the ledger lock waits *window* seconds for other writers
+    to join, then persists every queued record with a single write before
+    releasing the lock.  The call returns once this
+    writer's records have been committed, by itself or by another leader.
+    """
+
+    spool = spool_path(path)
+    spool.mkdir(exist_ok=True)
+    name = f"{time.time_ns():020d}-{os.getpid()}-{uuid.uuid4().hex}"
+    pending = spool / f"{name}.tmp"
+    pending.write_text(
+        "".join(json.dumps(_serialize_transaction(txn)) + "\n" for txn in transactions),
+        encoding="utf-8",
+    )
+    ticket = pending.with_suffix(".jsonl")
+    os.replace(pending, ticket)
+
+    while ticket.exists():
+        with ledger_lock(path, blocking=False) as acquired:
+            if acquired and ticket.exists():
+                time.sleep(window)
+                _commit_spool(path, backend)
+                continue
+        time.sleep(_POLL_INTERVAL)
@@ -0,0 +1,106 @@
+"""Timestamp index for range queries over a ledger's transactions."""
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from .models import Transaction, to_epoch
+
+
+class TimeIndex:
+    """Positions of a transaction sequence sorted by timestamp, per category.
+
+    The index only stores epoch keys and row positions, so range queries cost
+    ``O(log n + k)`` without copying or re-sorting the transactions.  It is
+    brought up to date with :meth:`sync`, which indexes rows appended since
+    the last call and rebuilds from scratch if the sequence shrank.
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self) -> None:
+        self._size = 0
+        self._keys: Dict[Optional[str], List[float]] = {}
+        self._positions: Dict[Optional[str], List[int]] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    def _index_keys(
+        self, transactions: Sequence[Transaction], start: int
+    ) -> Iterable[Tuple[str, float]]:
+        index_keys = getattr(transactions, "iter_index_keys", None)
+        if index_keys is not None:
+            return index_keys(start)
+        return ((txn.category, to_epoch(txn.timestamp)) for txn in transactions[start:])
+
+    def _build(self, transactions: Sequence[Transaction]) -> None:
+        rows: Dict[Optional[str], List[Tuple[float, int]]] = {None: []}
+        everything = rows[None]
+        for position, (category, key) in enumerate(self._index_keys(transactions, 0)):
+            everything.append((key, position))
+            rows.setdefault(category, []).append((key, position))
+        for category, entries in rows.items():
+            entries.sort()
+            self._keys[category] = [key for key, _ in entries]
+            self._positions[category] = [position for _, position in entries]
+
+    def _insert(self, category: Optional[str], key: float, position: int) -> None:
+        keys = self._keys.setdefault(category, [])
+        positions = self._positions.setdefault(category, [])
+        if not keys or key >= keys[-1]:
+            keys.append(key)
+            positions.append(position)
+            return
+        at = bisect_right(keys, key)
+        keys.insert(at, key)
+        positions.insert(at, position)
+
+    def sync(self, transactions: Sequence[Transaction]) -> None:
+        """Index any rows of *transactions* that are not indexed yet."""
+
+        if len(transactions) < self._size:
+            self.reset()
+        if self._size == 0:
+            self._build(transactions)
+        else:
+            for position, (category, key) in enumerate(
+                self._index_keys(transactions, self._size), start=self._size
+            ):
+                self._insert(None, key, position)
+                self._insert(category, key, position)
+        self._size = len(transactions)
+
+    def span(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> Tuple[int, int]:
+        """Return the slice of the sorted index covering ``[since, until)``."""
+
+        keys = self._keys.get(category, [])
+        low = bisect_left(keys, to_epoch(since)) if since is not None else 0
+        high = bisect_left(keys, to_epoch(until)) if until is not None else len(keys)
+        return low, max(low, high)
+
+    def query(
+        self,
+        transactions: Sequence[Transaction],
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Transaction]:
+        """Yield matching transactions in timestamp order, one page at a time."""
+
+        low, high = self.span(since, until, category)
+        low += offset
+        if limit is not None:
+            high = min(high, low + limit)
+        positions = self._positions.get(category, [])
+        for index in range(low, high):
+            yield transactions[positions[index]]
@@ -0,0 +1,125 @@
+"""Bulk import of transactions from CSV or JSONL files."""
+from __future__ import annotations
+
+import csv
+from dataclasses import dataclass, field
+from datetime import datetime
+import json
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .models import Transaction, to_naive_utc
+from .planner import AllowanceLedger
+
+IMPORT_FORMATS = ("csv", "jsonl")
+
+
+@dataclass
+class RowError:
+    """A row that could not be imported."""
+
+    line: int
+    message: str
+
+
+@dataclass
+class ImportReport:
+    """Outcome of :func:`import_transactions`."""
+
+    imported: int = 0
+    errors: List[RowError] = field(default_factory=list)
+
+
+def guess_format(path: Path) -> str:
+    """Return the import format implied by *path*'s extension."""
+
+    suffix = path.suffix.lower()
+    if suffix == ".csv":
+        return "csv"
+    if suffix in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Cannot guess the import format of {path}; use csv or jsonl.")
+
+
+def iter_rows(path: Path, fmt: Optional[str] = None) -> Iterator[Tuple[int, Any]]:
+    """Stream ``(line_number, row)`` pairs from *path* one row at a time.
+
+    CSV files need a header naming the ``category`` and ``amount`` columns
+    (``description`` and ``timestamp`` are optional).  JSONL rows that are not
+    valid JSON are yielded as :class:`ValueError` instances so the caller can
+    report them alongside other row errors.
+    """
+
+    fmt = fmt or guess_format(path)
+    if fmt not in IMPORT_FORMATS:
+        raise ValueError(f"Unknown import format: {fmt}")
+    with path.open("r", encoding="utf-8", newline="") as handle:
+        if fmt == "csv":
+            reader = csv.DictReader(handle)
+            for row in reader:
+                yield reader.line_num, row
+            return
+        for line_number, line in enumerate(handle, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_number, json.loads(line)
+            except json.JSONDecodeError as exc:
+                yield line_number, ValueError(f"Invalid JSON: {exc.msg}")
+
+
+def parse_row(row: Dict[str, Any]) -> Transaction:
+    """Build a validated :class:`Transaction` from an imported row."""
+
+    if not isinstance(row, dict):
+        raise ValueError("Row must be an object.")
+    try:
+        category = row["category"]
+        amount = float(row["amount"])
+    except KeyError as exc:
+        raise ValueError(f"Missing field: {exc.args[0]}") from None
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid amount: {row.get('amount')!r}") from None
+    description = row.get("description") or ""
+    timestamp = row.get("timestamp")
+    if timestamp:
+        try:
+            when = datetime.fromisoformat(timestamp)
+        except (TypeError, ValueError):
+            raise ValueError(f"Invalid timestamp: {timestamp!r}") from None
+        return Transaction(
+            category=category,
+            amount=amount,
+            description=description,
+            timestamp=to_naive_utc(when),
+        )
+    return Transaction(category=category, amount=amount, description=description)
+
+
+def import_transactions(
+    ledger: AllowanceLedger,
+    path: Path,
+    fmt: Optional[str] = None,
+    commit_every: Optional[int] = None,
+) -> ImportReport:
+    """Stream the rows in *path* into *ledger*.
+
+    Invalid rows are skipped and recorded in the returned report; the valid
+    ones are persisted once at the end, or every *commit_every* rows.
+    """
+
+    report = ImportReport()
+
+    def valid_transactions() -> Iterator[Transaction]:
+        for line_number, row in iter_rows(path, fmt):
+            try:
+                if isinstance(row, ValueError):
+                    raise row
+                transaction = parse_row(row)
+            except ValueError as exc:
+                report.errors.append(RowError(line=line_number, message=str(exc)))
+                continue
+            yield transaction
+
+    report.imported = ledger.add_transactions(valid_transactions(), commit_every)
+    return report
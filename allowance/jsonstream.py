@@ -0,0 +1,143 @@
+"""Incremental reader for large JSON documents."""
+from __future__ import annotations
+
+import json
+import re
+from typing import Any, Iterator, TextIO
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_ARRAY_SEPARATOR = re.compile(r"[ \t\n\r]*([,\]])[ \t\n\r]*")
+# What may follow a number or literal; until one is read it may go on.
+_SCALAR_END = re.compile(r"[,\]} \t\n\r]")
+
+
+class JsonStreamReader:
+    """Walk a JSON document read from *handle* a chunk at a time.
+
+    Only the part of the document that is currently being decoded is kept in
+    memory, so arrays with millions of elements can be consumed one element at
+    a time with :meth:`iter_array`.  Keys of an object are produced by
+    :meth:`iter_object`; after each key the caller must consume its value with
+    :meth:`read_value`, :meth:`iter_array` or :meth:`skip_value`.
+    """
+
+    def __init__(self, handle: TextIO, chunk_size: int = DEFAULT_CHUNK_SIZE) -> None:
+        self._handle = handle
+        self._chunk_size = chunk_size
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._eof = False
+
+    def _error(self, message: str) -> json.JSONDecodeError:
+        return json.JSONDecodeError(message, self._buffer, self._pos)
+
+    def _fill(self) -> bool:
+        if self._eof:
+            return False
+        chunk = self._handle.read(self._chunk_size)
+        if not chunk:
+            self._eof = True
+            return False
+        self._buffer = self._buffer[self._pos:] + chunk
+        self._pos = 0
+        return True
+
+    def _peek(self) -> str:
+        """Skip whitespace and return the next character ('' at the end)."""
+
+        while True:
+            self._pos = _WHITESPACE.match(self._buffer, self._pos).end()
+            if self._pos < len(self._buffer):
+                return self._buffer[self._pos]
+            if not self._fill():
+                return ""
+
+    def _expect(self, char: str) -> None:
+        if self._peek() != char:
+            raise self._error(f"Expecting {char!r}")
+        self._pos += 1
+
+    def read_value(self) -> Any:
+        """Decode and return the next complete JSON value."""
+
+        if self._peek() not in ('"', "{", "["):
+            # A number or literal split by a chunk boundary could otherwise be
+            # decoded from its first part alone ("-2500." as -2500).
+            while not _SCALAR_END.search(self._buffer, self._pos) and self._fill():
+                pass
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            self._pos = end
+            return value
+
+    def skip_value(self) -> None:
+        if self._peek() == "[":
+            for _ in self.iter_array():
+                pass
+        else:
+            self.read_value()
+
+    def iter_array(self) -> Iterator[Any]:
+        """Yield the elements of the array starting at the current position."""
+
+        self._expect("[")
+        if self._peek() == "]":
+            self._pos += 1
+            return
+        scan = self._decoder.scan_once
+        match_separator = _ARRAY_SEPARATOR.match
+        while True:
+            buffer = self._buffer
+            size = len(buffer)
+            pos = self._pos
+            while True:
+                try:
+                    value, end = scan(buffer, pos)
+                    separator = match_separator(buffer, end)
+                except (StopIteration, json.JSONDecodeError):
+                    separator = None
+                # The element, or whatever follows it, may continue in the next
+                # chunk; it is decoded again once more text is available.
+                if separator is None or separator.end() == size:
+                    break
+                pos = separator.end()
+                yield value
+                if separator.group(1) == "]":
+                    self._pos = pos
+                    return
+            self._pos = pos
+            if self._fill():
+                continue
+            if separator is None or separator.group(1) != "]":
+                raise self._error("Expecting array element followed by ',' or ']'")
+            self._pos = separator.end()
+            yield value
+            return
+
+    def iter_object(self) -> Iterator[str]:
+        """Yield the keys of the object starting at the current position."""
+
+        self._expect("{")
+        if self._peek() == "}":
+            self._pos += 1
+            return
+        while True:
+            if self._peek() != '"':
+                raise self._error("Expecting property name")
+            key = self.read_value()
+            self._expect(":")
+            yield key
+            separator = self._peek()
+            self._pos += 1
+            if separator == "}":
+                return
+            if separator != ",":
+                raise self._error("Expecting ',' or '}'")
@@ -2,77 +2,306 @@
 from __future__ import annotations
 
 from dataclasses import dataclass, field
-from datetime import datetime
-from typing import Dict, Iterable, List
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterable, MutableSequence, Tuple, Union
+
+from . import tracing
+from .money import from_cents, to_cents
 
 
 ALLOWED_CATEGORIES = ("save", "spend", "share", "need")
+TRANSACTION_FIELDS = ("category", "amount", "description", "timestamp")
+EPOCH = datetime(1970, 1, 1)
+
+
+def to_epoch(timestamp: datetime) -> float:
+    """Return *timestamp* as POSIX seconds; naive values are taken as UTC."""
+
+    if timestamp.tzinfo is not None:
+        return timestamp.timestamp()
+    return (timestamp - EPOCH).total_seconds()
+
+
+def from_epoch(seconds: float) -> datetime:
+    """Inverse of :func:`to_epoch`, returning a naive UTC datetime."""
+
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def to_naive_utc(timestamp: datetime) -> datetime:
+    """Return *timestamp* as the naive UTC datetime every ledger stores.
+
+    Naive values are taken as UTC already, as in :func:`to_epoch`.
+    """
+
+    if timestamp.tzinfo is None:
+        return timestamp
+    return timestamp.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def validate_transaction(category: str, amount: float) -> None:
+    """Raise :class:`ValueError` unless *category* and *amount* are acceptable."""
+
+    if category not in ALLOWED_CATEGORIES:
+        raise ValueError(f"Unknown category: {category}")
+    if amount < 0:
+        raise ValueError("Transaction amount must be non-negative.")
+
+
+tracing.instrument(globals(), "validate_transaction", "models.validate")
+
+
+def order_categories(categories: Iterable[str]) -> Tuple[str, ...]:
+    """Order *categories* for reports.
+
+    The predefined :data:`ALLOWED_CATEGORIES` come first so the command line
+    reports stay familiar; any additional categories are appended
+    alphabetically.  An empty input yields every allowed category.
+    """
+
+    used_categories = set(categories)
+    if not used_categories:
+        return tuple(ALLOWED_CATEGORIES)
+
+    ordered = [c for c in ALLOWED_CATEGORIES if c in used_categories]
+    custom = sorted(used_categories.difference(ALLOWED_CATEGORIES))
+    return tuple(ordered + custom)
 
 
 @dataclass
 class AllowancePlan:
-    """Represents the way an allowance is divided between categories."""
+    """Represents the way an allowance is divided between categories.
+
+    Amounts are kept as integer cents in :attr:`income_cents` and
+    :attr:`allocation_cents`; :attr:`income` and :attr:`allocation` are
+    normalised to the same whole-cent values.
+    """
 
     income: float
     allocation: Dict[str, float]
+    income_cents: int = field(init=False, repr=False, compare=False)
+    allocation_cents: Dict[str, int] = field(init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
+        self.income_cents = to_cents(self.income)
+        self.allocation_cents = {
+            category: to_cents(amount) for category, amount in self.allocation.items()
+        }
+        self.income = from_cents(self.income_cents)
+        self.allocation = {
+            category: from_cents(cents)
+            for category, cents in self.allocation_cents.items()
+        }
         self._validate()
 
     def _validate(self) -> None:
-        if self.income < 0:
+        if self.income_cents < 0:
             raise ValueError("Income must be non-negative.")
-        for category, amount in self.allocation.items():
+        for category, cents in self.allocation_cents.items():
             if category not in ALLOWED_CATEGORIES:
                 raise ValueError(f"Unknown category: {category}")
-            if amount < 0:
+            if cents < 0:
                 raise ValueError("Allocated amounts must be non-negative.")
-        total = sum(self.allocation.values())
-        if total > self.income + 1e-9:
+        if sum(self.allocation_cents.values()) > self.income_cents:
             raise ValueError(
                 "Allocated amounts cannot exceed the total allowance income."
             )
 
+    @property
+    def unallocated_cents(self) -> int:
+        return self.income_cents - sum(self.allocation_cents.values())
+
     @property
     def unallocated(self) -> float:
         """Return the amount of income that has not yet been allocated."""
 
-        return self.income - sum(self.allocation.values())
+        return from_cents(self.unallocated_cents)
+
+    def category_cents(self, category: str) -> int:
+        return self.allocation_cents.get(category, 0)
 
     def category_amount(self, category: str) -> float:
         """Return the planned amount for *category* or 0 if missing."""
 
-        return self.allocation.get(category, 0.0)
+        return from_cents(self.category_cents(category))
 
 
 @dataclass
 class Transaction:
-    """Represents a planned or actual allowance transaction."""
+    """Represents a planned or actual allowance transaction.
+
+    The amount is held as integer :attr:`cents`; :attr:`amount` is rounded to
+    the same whole number of cents.
+    """
 
     category: str
     amount: float
     description: str = ""
     timestamp: datetime = field(default_factory=datetime.utcnow)
+    cents: int = field(init=False, repr=False, compare=False)
 
     def __post_init__(self) -> None:
-        if self.category not in ALLOWED_CATEGORIES:
-            raise ValueError(f"Unknown category: {self.category}")
-        if self.amount < 0:
-            raise ValueError("Transaction amount must be non-negative.")
+        self.cents = to_cents(self.amount)
+        self.amount = from_cents(self.cents)
+        validate_transaction(self.category, self.amount)
+
+    @classmethod
+    def trusted(
+        cls, category: str, cents: int, description: str, timestamp: Union[datetime, str]
+    ) -> "Transaction":
+        """Build a transaction from values already known to be valid.
+
+        Validation and amount normalisation are skipped.  A *timestamp* given
+        as an ISO 8601 string is only parsed when it is first read.
+        """
+
+        txn = cls.__new__(cls)
+        txn.category = category
+        txn.cents = cents
+        txn.amount = from_cents(cents)
+        txn.description = description
+        if isinstance(timestamp, str):
+            txn._raw_timestamp = timestamp
+        else:
+            txn.timestamp = timestamp
+        return txn
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for missing attributes: the timestamp of a transaction
+        # built by :meth:`trusted` until it is first parsed.
+        if name == "timestamp" and "_raw_timestamp" in self.__dict__:
+            self.timestamp = datetime.fromisoformat(self.__dict__.pop("_raw_timestamp"))
+            return self.timestamp
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
 
 
 @dataclass
 class AllowanceState:
-    """Serializable structure describing an allowance plan and its usage."""
+    """Serializable structure describing an allowance plan and its usage.
+
+    Per-category totals (in integer cents) and counts are kept up to date as transactions are
+    added through :meth:`add_transaction` or removed with
+    :meth:`clear_transactions`, so the reporting helpers never rescan the
+    transaction list.  Code that mutates :attr:`transactions` directly must
+    call :meth:`refresh_totals` afterwards.
+
+    *transactions* is usually a list, but a columnar
+    :class:`~allowance.table.TransactionTable` can be used for large ledgers.
+    """
 
     plan: AllowancePlan
-    transactions: List[Transaction]
+    transactions: MutableSequence[Transaction]
+    _spent: Dict[str, int] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+    _counts: Dict[str, int] = field(
+        init=False, repr=False, compare=False, default_factory=dict
+    )
+
+    def __post_init__(self) -> None:
+        self.refresh_totals()
+
+    def _count(self, txn: Transaction) -> None:
+        self._spent[txn.category] = self._spent.get(txn.category, 0) + txn.cents
+        self._counts[txn.category] = self._counts.get(txn.category, 0) + 1
+
+    @tracing.traced("state.refresh_totals")
+    def refresh_totals(self) -> None:
+        """Recompute the cached totals from a full scan of the transactions."""
+
+        category_totals = getattr(self.transactions, "category_totals", None)
+        if category_totals is not None:
+            self._spent, self._counts = category_totals()
+            return
+        self._spent = {}
+        self._counts = {}
+        for txn in self.transactions:
+            self._count(txn)
+
+    def add_transaction(self, txn: Transaction) -> None:
+        self.transactions.append(txn)
+        self._count(txn)
+
+    def clear_transactions(self) -> None:
+        self.transactions.clear()
+        self._spent.clear()
+        self._counts.clear()
+
+    def verify_totals(self) -> Dict[str, Tuple[float, float]]:
+        """Compare the cached totals with a full rescan of the transactions.
+
+        Returns ``{category: (cached, actual)}`` for every category whose
+        cached total or count disagrees; an empty dict means they match.
+        """
+
+        rescanned = AllowanceState(plan=self.plan, transactions=self.transactions)
+        mismatches: Dict[str, Tuple[float, float]] = {}
+        for category in set(self._counts) | set(rescanned._counts):
+            cached = self.spent_cents_for(category)
+            actual = rescanned.spent_cents_for(category)
+            if cached != actual or self.count_for(category) != rescanned.count_for(
+                category
+            ):
+                mismatches[category] = (from_cents(cached), from_cents(actual))
+        return mismatches
+
+    @property
+    def is_partial(self) -> bool:
+        """Whether the transactions were loaded without some of their fields."""
+
+        fields = getattr(self.transactions, "fields", TRANSACTION_FIELDS)
+        return set(fields) != set(TRANSACTION_FIELDS)
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        """Categories that have at least one transaction."""
+
+        return tuple(self._counts)
 
     def by_category(self, category: str) -> Iterable[Transaction]:
         return (txn for txn in self.transactions if txn.category == category)
 
+    def count_for(self, category: str) -> int:
+        return self._counts.get(category, 0)
+
+    def spent_cents_for(self, category: str) -> int:
+        return self._spent.get(category, 0)
+
     def spent_for(self, category: str) -> float:
-        return sum(txn.amount for txn in self.by_category(category))
+        return from_cents(self.spent_cents_for(category))
 
     def remaining_for(self, category: str) -> float:
-        return self.plan.category_amount(category) - self.spent_for(category)
+        return from_cents(
+            self.plan.category_cents(category) - self.spent_cents_for(category)
+        )
+
+    def summary(self) -> "LedgerSummary":
+        return LedgerSummary(
+            plan=self.plan,
+            spent_cents=dict(self._spent),
+            transaction_count=len(self.transactions),
+        )
+
+
+@dataclass
+class LedgerSummary:
+    """Per-category totals of a ledger without the individual transactions."""
+
+    plan: AllowancePlan
+    spent_cents: Dict[str, int]
+    transaction_count: int = 0
+
+    @property
+    def spent(self) -> Dict[str, float]:
+        return {category: from_cents(cents) for category, cents in self.spent_cents.items()}
+
+    def spent_for(self, category: str) -> float:
+        return from_cents(self.spent_cents.get(category, 0))
+
+    def remaining_for(self, category: str) -> float:
+        return from_cents(
+            self.plan.category_cents(category) - self.spent_cents.get(category, 0)
+        )
+
+    def iter_categories(self) -> Tuple[str, ...]:
+        return order_categories([*self.plan.allocation, *self.spent_cents])
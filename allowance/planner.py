@@ -1,49 +1,343 @@
 """High level interface for managing an allowance plan."""
 from __future__ import annotations
 
-from dataclasses import dataclass
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime
+import glob
 from pathlib import Path
-from typing import Dict, Iterable, Optional
+import sqlite3
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
 
-from .models import ALLOWED_CATEGORIES, AllowancePlan, AllowanceState, Transaction
-from .storage import DEFAULT_STORAGE_FILE, load_state, save_state
+from . import tracing
+from .alerts import BudgetAlert, BudgetAlerts
+from .backends import BINARY_SUFFIXES, SQLITE_SUFFIXES, JsonBackend, StorageBackend, get_backend
+from .history import TimeIndex
+from .groupcommit import DEFAULT_COMMIT_WINDOW, group_commit
+from .models import (
+    AllowancePlan,
+    AllowanceState,
+    LedgerSummary,
+    Transaction,
+    order_categories,
+)
+from .money import from_cents
+from .storage import DEFAULT_STORAGE_FILE, StorageStamp, ledger_lock, storage_stamp
+from .table import TransactionTable
+
+BackendSpec = Union[str, StorageBackend, None]
+
+
+def resolve_storage(
+    path: Optional[Path], backend: BackendSpec = None, journal: bool = False
+) -> tuple[Path, StorageBackend]:
+    """Return the storage path and backend that :meth:`AllowanceLedger.load` would use.
+
+    The format comes from *backend* or the file's extension; *journal* then
+    switches it to journal mode, which raises :class:`ValueError` for
+    formats that have none.
+    """
+
+    resolved = get_backend(path, backend)
+    if journal:
+        resolved = resolved.with_journal()
+    return path or resolved.default_path, resolved
 
 
 @dataclass
 class AllowanceLedger:
-    """Wraps :class:`AllowanceState` with helper operations."""
+    """Wraps :class:`AllowanceState` with helper operations.
+
+    Persistence is delegated to a :class:`~allowance.backends.StorageBackend`,
+    chosen from the storage file's extension unless one is given explicitly.
+
+    With *autosave* disabled, changes are only recorded in memory and written
+    by the next :meth:`flush`, which lets long-running processes batch many
+    operations into one write.
+
+    Callbacks subscribed to :attr:`alerts` are told when a transaction takes
+    a category past one of its budget thresholds.
+
+    A ledger kept in memory goes stale when another process writes the same
+    file; :meth:`refresh` reloads it, and :meth:`flush` refreshes before
+    writing so those changes are never overwritten.
+    """
 
     state: AllowanceState
     storage_path: Path = DEFAULT_STORAGE_FILE
+    backend: StorageBackend = field(default_factory=JsonBackend)
+    autosave: bool = True
+    alerts: BudgetAlerts = field(default_factory=BudgetAlerts, repr=False, compare=False)
+    _time_index: TimeIndex = field(
+        default_factory=TimeIndex, init=False, repr=False, compare=False
+    )
+    _pending: List[Transaction] = field(
+        default_factory=list, init=False, repr=False, compare=False
+    )
+    _plan_changed: bool = field(default=False, init=False, repr=False, compare=False)
+    _cleared: bool = field(default=False, init=False, repr=False, compare=False)
+    _stamp: StorageStamp = field(default=(), init=False, repr=False, compare=False)
 
     @classmethod
-    def load(cls, path: Optional[Path] = None) -> "AllowanceLedger":
-        storage_path = path or DEFAULT_STORAGE_FILE
-        state = load_state(storage_path)
-        return cls(state=state, storage_path=storage_path)
+    @tracing.traced("ledger.load")
+    def load(
+        cls,
+        path: Optional[Path] = None,
+        backend: BackendSpec = None,
+        journal: bool = False,
+        columnar: bool = False,
+        fields: Optional[Iterable[str]] = None,
+    ) -> "AllowanceLedger":
+        """Load the ledger stored in *path*.
+
+        Pass *columnar* to keep the transactions in a compact
+        :class:`~allowance.table.TransactionTable` rather than a list, or
+        *fields* to load a read-only projection of the transaction fields a
+        caller actually needs.
+        """
+
+        storage_path, resolved = resolve_storage(path, backend, journal)
+        stamp = storage_stamp(storage_path)
+        state = resolved.load(storage_path, columnar=columnar, fields=fields)
+        ledger = cls(state=state, storage_path=storage_path, backend=resolved)
+        ledger._stamp = stamp
+        return ledger
+
+    @classmethod
+    def stream(
+        cls,
+        path: Optional[Path] = None,
+        backend: BackendSpec = None,
+        journal: bool = False,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> Iterator[Transaction]:
+        """Yield the transactions stored in *path* without loading the ledger.
+
+        Records are read and handed out one at a time in the order they were
+        recorded, so memory use does not grow with the size of the ledger.
+        *since* and *until* keep only ``since <= timestamp < until``.
+        """
+
+        storage_path, resolved = resolve_storage(path, backend, journal)
+        return _between(resolved.iter_transactions(storage_path), since, until)
+
+    @classmethod
+    @contextmanager
+    def locked(
+        cls,
+        path: Optional[Path] = None,
+        backend: BackendSpec = None,
+        journal: bool = False,
+        columnar: bool = False,
+    ) -> Iterator["AllowanceLedger"]:
+        """Load the ledger while holding its advisory lock.
+
+        The lock is held until the block exits, so a load-modify-save cycle
+        inside it cannot interleave with other processes doing the same.
+        """
+
+        storage_path, resolved = resolve_storage(path, backend, journal)
+        with ledger_lock(storage_path):
+            yield cls.load(storage_path, backend=resolved, columnar=columnar)
 
     def save(self) -> None:
-        save_state(self.state, self.storage_path)
+        self.backend.save(self.state, self.storage_path)
+        self._discard_pending()
+        self._synced()
+
+    def _synced(self) -> None:
+        """Note that the storage files now hold what this ledger wrote."""
+
+        self._stamp = storage_stamp(self.storage_path)
+
+    def refresh(self) -> bool:
+        """Reload the ledger if another process changed its files since.
+
+        Changes not yet flushed are replayed on top of what was reloaded; after
+        :meth:`clear_transactions` or :meth:`take_before` this ledger's state
+        is kept as it is.  Call it while holding the ledger's lock before a
+        change that has to build on the latest data.  Returns ``True`` if the
+        ledger was reloaded.
+        """
+
+        stamp = storage_stamp(self.storage_path)
+        if stamp == self._stamp or self._cleared:
+            return False
+        state = self.backend.load(
+            self.storage_path, columnar=isinstance(self.state.transactions, TransactionTable)
+        )
+        if self._plan_changed:
+            state.plan = self.state.plan
+        for transaction in self._pending:
+            state.add_transaction(transaction)
+        self.state = state
+        self._time_index.reset()
+        self._stamp = stamp
+        return True
+
+    @property
+    def dirty(self) -> bool:
+        """Whether there are changes that :meth:`flush` has yet to write."""
+
+        return bool(self._pending or self._plan_changed or self._cleared)
+
+    def _discard_pending(self) -> None:
+        self._pending = []
+        self._plan_changed = False
+        self._cleared = False
+
+    @tracing.traced("ledger.flush")
+    def flush(self) -> bool:
+        """Write the changes held back while *autosave* was disabled.
+
+        Returns ``True`` if anything was written.
+        """
+
+        if not self.dirty:
+            return False
+        self.refresh()
+        if self._cleared or (self._pending and self.backend.append_needs_state):
+            self.backend.save(self.state, self.storage_path)
+        else:
+            if self._plan_changed:
+                self.backend.save_plan(self.state, self.storage_path)
+            if self._pending:
+                self.backend.append_many(self.state, self._pending, self.storage_path)
+        self._discard_pending()
+        self._synced()
+        return True
+
+    def compact(self) -> int:
+        """Fold any incrementally written records back into the storage file."""
+
+        folded = self.backend.compact(self.state, self.storage_path)
+        self._synced()
+        return folded
 
     # Plan operations -------------------------------------------------
     def set_plan(self, income: float, allocations: Dict[str, float]) -> AllowancePlan:
         plan = AllowancePlan(income=income, allocation=allocations)
         self.state.plan = plan
-        self.save()
+        if self.autosave:
+            self.backend.save_plan(self.state, self.storage_path)
+            self._synced()
+        else:
+            self._plan_changed = True
         return plan
 
     # Transaction operations -----------------------------------------
+    @tracing.traced("ledger.add_transaction")
     def add_transaction(
         self, category: str, amount: float, description: str = ""
     ) -> Transaction:
         transaction = Transaction(category=category, amount=amount, description=description)
-        self.state.transactions.append(transaction)
-        self.save()
+        raised = self._add(transaction)
+        if self.autosave:
+            self.backend.append(self.state, transaction, self.storage_path)
+            self._synced()
+        else:
+            self._pending.append(transaction)
+        if raised:
+            self.alerts.notify(raised)
         return transaction
 
+    def _add(self, transaction: Transaction) -> List[BudgetAlert]:
+        """Add *transaction* to the state and return the alerts it raises."""
+
+        self.state.add_transaction(transaction)
+        if not self.alerts:
+            return []
+        return self.alerts.check(
+            self.state.plan, transaction, self.state.spent_cents_for(transaction.category)
+        )
+
+    def add_transactions(
+        self, transactions: Iterable[Transaction], commit_every: Optional[int] = None
+    ) -> int:
+        """Append many transactions, persisting them in as few writes as possible.
+
+        The batch is written once at the end, or every *commit_every*
+        transactions when given; without *autosave* it waits for
+        :meth:`flush`.  Returns the number of transactions added.  Budget
+        alerts are sent once the batch has been written.
+        """
+
+        raised: List[BudgetAlert] = []
+        if not self.autosave:
+            before = len(self._pending)
+            for transaction in transactions:
+                raised += self._add(transaction)
+                self._pending.append(transaction)
+            self.alerts.notify(raised)
+            return len(self._pending) - before
+
+        pending: List[Transaction] = []
+        added = 0
+        for transaction in transactions:
+            raised += self._add(transaction)
+            pending.append(transaction)
+            added += 1
+            if commit_every and len(pending) >= commit_every:
+                self.backend.append_many(self.state, pending, self.storage_path)
+                pending = []
+        if pending:
+            self.backend.append_many(self.state, pending, self.storage_path)
+        self._synced()
+        self.alerts.notify(raised)
+        return added
+
+    def commit_transactions(
+        self, transactions: Sequence[Transaction], window: float = DEFAULT_COMMIT_WINDOW
+    ) -> None:
+        """Persist *transactions* through a group commit shared with other writers.
+
+        Records queued by concurrent processes within *window* seconds are
+        written together, so a burst of writers costs a single write and
+        fsync.  The in-memory state is updated once the records are durable.
+        """
+
+        group_commit(self.storage_path, transactions, self.backend, window)
+        raised: List[BudgetAlert] = []
+        for transaction in transactions:
+            raised += self._add(transaction)
+        self.alerts.notify(raised)
+
     def clear_transactions(self) -> None:
+        self.state.clear_transactions()
+        self._time_index.reset()
+        if self.autosave:
+            self.backend.clear(self.state, self.storage_path)
+            self._synced()
+        else:
+            self._pending = []
+            self._cleared = True
+
+    def take_before(self, cutoff: datetime) -> List[Transaction]:
+        """Remove the transactions dated before *cutoff* and return them.
+
+        The removal is persisted with a full save (or by the next
+        :meth:`flush` without *autosave*).
+        """
+
+        taken: List[Transaction] = []
+        kept: List[Transaction] = []
+        for txn in self.state.transactions:
+            (taken if txn.timestamp < cutoff else kept).append(txn)
+        if not taken:
+            return taken
         self.state.transactions.clear()
-        self.save()
+        self.state.transactions.extend(kept)
+        self.state.refresh_totals()
+        self._time_index.reset()
+        if self.autosave:
+            self.backend.save(self.state, self.storage_path)
+            self._synced()
+        else:
+            self._pending = []
+            self._cleared = True
+        return taken
 
     # Reporting -------------------------------------------------------
     def planned_amount(self, category: str) -> float:
@@ -63,17 +357,198 @@ class AllowanceLedger:
         appended alphabetically.
         """
 
-        used_categories = set(self.state.plan.allocation.keys())
-        used_categories.update(txn.category for txn in self.state.transactions)
-        if not used_categories:
-            return tuple(ALLOWED_CATEGORIES)
+        return order_categories([*self.state.plan.allocation, *self.state.categories])
+
+    def summary(self) -> LedgerSummary:
+        return self.state.summary()
+
+    def iter_transactions(
+        self, since: Optional[datetime] = None, until: Optional[datetime] = None
+    ) -> Iterator[Transaction]:
+        """Yield the loaded transactions in the order they were recorded.
 
-        ordered = [c for c in ALLOWED_CATEGORIES if c in used_categories]
-        custom = sorted(used_categories.difference(ALLOWED_CATEGORIES))
-        return tuple(ordered + custom)
+        Use :meth:`query` for timestamp order, or :meth:`stream` to read a
+        ledger too large to load.
+        """
+
+        return _between(self.state.transactions, since, until)
 
+    # History ---------------------------------------------------------
+    def query(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+        offset: int = 0,
+        limit: Optional[int] = None,
+    ) -> Iterator[Transaction]:
+        """Yield transactions with ``since <= timestamp < until`` in time order.
 
-def load_ledger(path: Optional[Path] = None) -> AllowanceLedger:
+        Results come from a per-category timestamp index, so a page costs
+        ``O(log n + limit)`` regardless of the size of the ledger.
+        """
+
+        self._time_index.sync(self.state.transactions)
+        return self._time_index.query(
+            self.state.transactions, since, until, category, offset, limit
+        )
+
+    def count(
+        self,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        category: Optional[str] = None,
+    ) -> int:
+        """Return how many transactions :meth:`query` would yield in total."""
+
+        self._time_index.sync(self.state.transactions)
+        low, high = self._time_index.span(since, until, category)
+        return high - low
+
+
+def _between(
+    transactions: Iterable[Transaction],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> Iterator[Transaction]:
+    for txn in transactions:
+        if (since is None or txn.timestamp >= since) and (
+            until is None or txn.timestamp < until
+        ):
+            yield txn
+
+
+def load_ledger(
+    path: Optional[Path] = None,
+    backend: BackendSpec = None,
+    journal: bool = False,
+    columnar: bool = False,
+    fields: Optional[Iterable[str]] = None,
+) -> AllowanceLedger:
     """Convenience helper mirroring :meth:`AllowanceLedger.load`."""
 
-    return AllowanceLedger.load(path)
+    return AllowanceLedger.load(
+        path, backend=backend, journal=journal, columnar=columnar, fields=fields
+    )
+
+
+@tracing.traced("ledger.load_summary")
+def load_summary(
+    path: Optional[Path] = None,
+    backend: BackendSpec = None,
+    journal: bool = False,
+    repair: bool = False,
+) -> LedgerSummary:
+    """Return per-category totals without loading the ledger when possible.
+
+    The file is only written with *repair*, which lets a backend rewrite a
+    file whose summary needed a full scan so the next one does not.
+    """
+
+    storage_path, resolved = resolve_storage(path, backend, journal)
+    return resolved.load_summary(storage_path, repair)
+
+
+LEDGER_SUFFIXES = (".json", *SQLITE_SUFFIXES, *BINARY_SUFFIXES)
+
+
+@dataclass
+class LedgerReport:
+    """Per-ledger summaries merged into one set of category totals."""
+
+    rows: List[Tuple[Path, LedgerSummary]] = field(default_factory=list)
+    errors: List[Tuple[Path, str]] = field(default_factory=list)
+    spent_cents: Dict[str, int] = field(default_factory=dict)
+    planned_cents: Dict[str, int] = field(default_factory=dict)
+    transaction_count: int = 0
+
+    def add(self, path: Path, summary: LedgerSummary) -> None:
+        self.rows.append((path, summary))
+        for category, cents in summary.spent_cents.items():
+            self.spent_cents[category] = self.spent_cents.get(category, 0) + cents
+        for category, cents in summary.plan.allocation_cents.items():
+            self.planned_cents[category] = self.planned_cents.get(category, 0) + cents
+        self.transaction_count += summary.transaction_count
+
+    @property
+    def spent(self) -> Dict[str, float]:
+        return {category: from_cents(cents) for category, cents in self.spent_cents.items()}
+
+    @property
+    def planned(self) -> Dict[str, float]:
+        return {category: from_cents(cents) for category, cents in self.planned_cents.items()}
+
+    def iter_categories(self) -> Tuple[str, ...]:
+        return order_categories([*self.planned_cents, *self.spent_cents])
+
+
+def expand_ledger_paths(sources: Iterable[Union[str, Path]]) -> List[Path]:
+    """Resolve directories and glob patterns in *sources* to ledger files.
+
+    Directories contribute every file with a known ledger extension; journal
+    files are never treated as ledgers of their own.
+    """
+
+    paths: List[Path] = []
+    for source in sources:
+        source_path = Path(source)
+        if source_path.is_dir():
+            candidates = sorted(source_path.iterdir())
+            paths.extend(p for p in candidates if p.suffix.lower() in LEDGER_SUFFIXES)
+        elif source_path.exists():
+            paths.append(source_path)
+        else:
+            paths.extend(Path(match) for match in sorted(glob.glob(str(source))))
+    return [path for path in dict.fromkeys(paths) if path.is_file()]
+
+
+def _summarize_ledger(
+    job: Tuple[Path, Optional[str]]
+) -> Tuple[Path, Optional[LedgerSummary], Optional[str]]:
+    path, backend = job
+    try:
+        return path, load_summary(path, backend=backend), None
+    except (OSError, ValueError, sqlite3.DatabaseError) as exc:
+        return path, None, str(exc)
+    except (KeyError, TypeError) as exc:
+        # A record missing a field, or holding the wrong type of value.
+        return path, None, f"malformed record ({type(exc).__name__}: {exc})"
+
+
+def report_ledgers(
+    sources: Iterable[Union[str, Path]],
+    backend: Optional[str] = None,
+    workers: Optional[int] = None,
+    chunksize: int = 16,
+) -> LedgerReport:
+    """Summarize many ledgers in parallel and merge their totals.
+
+    *sources* may name files, directories or glob patterns.  Summaries are
+    computed across a process pool of *workers* processes (one per core by
+    default), handing each worker *chunksize* ledgers at a time; pass
+    ``workers=1`` to stay in the current process.  Ledgers that cannot be read
+    are listed in :attr:`LedgerReport.errors` instead of aborting the report.
+    """
+
+    jobs = [(path, backend) for path in expand_ledger_paths(sources)]
+    report = LedgerReport()
+    if workers == 1 or len(jobs) <= 1:
+        _merge_results(report, map(_summarize_ledger, jobs))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            _merge_results(
+                report,
+                executor.map(_summarize_ledger, jobs, chunksize=max(1, chunksize)),
+            )
+    return report
+
+
+def _merge_results(
+    report: LedgerReport,
+    results: Iterable[Tuple[Path, Optional[LedgerSummary], Optional[str]]],
+) -> None:
+    for path, summary, error in results:
+        if summary is None:
+            report.errors.append((path, error or "unknown error"))
+        else:
+            report.add(path, summary)
@@ -0,0 +1,302 @@
+"""Long-running ledger server and the client used by ``--server``.
+
+The server keeps ledgers in memory and speaks a line-oriented JSON protocol
+over a Unix socket or TCP: each request is one JSON object naming an ``op``
+(``plan``, ``record``, ``summary``, ``reset``, ``flush`` or ``ping``) plus the
+``storage``/``backend``/``journal`` selecting the ledger, and each response is
+one JSON object with ``ok`` set and either the result fields or an ``error``.
+Changes are written to disk in batches by a background task.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import socket
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+from .alerts import shell_hook
+from .models import AllowancePlan, LedgerSummary, Transaction
+from .planner import AllowanceLedger, resolve_storage
+from .storage import (
+    _deserialize_plan,
+    _deserialize_transaction,
+    _serialize_plan,
+    _serialize_transaction,
+)
+from .store import DEFAULT_MAX_BYTES, DEFAULT_MAX_LEDGERS, LedgerCache
+
+DEFAULT_FLUSH_INTERVAL = 0.5
+
+_log = logging.getLogger(__name__)
+
+Address = Union[str, Tuple[str, int]]
+
+
+def parse_address(address: str) -> Address:
+    """Parse ``unix:PATH``, a filesystem path, or ``HOST:PORT``."""
+
+    if address.startswith("unix:"):
+        return address[len("unix:"):]
+    host, sep, port = address.rpartition(":")
+    if sep and port.isdigit() and "/" not in address:
+        return host or "127.0.0.1", int(port)
+    return address
+
+
+class LedgerServer:
+    """Serve requests against ledgers kept in memory.
+
+    Ledgers are loaded on first use with *autosave* disabled into a
+    :class:`~allowance.store.LedgerCache` of at most *max_ledgers* ledgers
+    and about *max_bytes* bytes; dirty ledgers are flushed every
+    *flush_interval* seconds, when they are evicted and when the server stops.
+    Requests and periodic flushes run one at a time on worker threads, so a
+    slow disk does not hold up the event loop.
+
+    With *alert_command*, every ledger runs that shell command in the
+    background when a record crosses one of its *alert_thresholds* (see
+    :meth:`BudgetAlerts.configure <allowance.alerts.BudgetAlerts.configure>`).
+    """
+
+    def __init__(
+        self,
+        flush_interval: float = DEFAULT_FLUSH_INTERVAL,
+        alert_command: Optional[str] = None,
+        alert_thresholds: Optional[Mapping[Optional[str], Iterable[float]]] = None,
+        max_ledgers: int = DEFAULT_MAX_LEDGERS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+    ) -> None:
+        self.flush_interval = flush_interval
+        self.alert_command = alert_command
+        self.alert_thresholds = alert_thresholds or {}
+        self._ledgers = LedgerCache(max_ledgers, max_bytes)
+        # Requests and flushes run on worker threads so disk I/O never stalls
+        # the event loop; the cache itself is not thread-safe.
+        self._lock = threading.RLock()
+
+    # Ledger management -----------------------------------------------
+    def ledger(self, request: Dict[str, Any]) -> AllowanceLedger:
+        storage = request.get("storage")
+        storage_path, backend = resolve_storage(
+            Path(storage) if storage else None,
+            request.get("backend"),
+            bool(request.get("journal")),
+        )
+        key = (storage_path.resolve(), backend.name)
+
+        def load() -> AllowanceLedger:
+            ledger = AllowanceLedger.load(storage_path, backend=backend)
+            if self.alert_command:
+                ledger.alerts.configure(self.alert_thresholds)
+                ledger.alerts.subscribe(shell_hook(self.alert_command, wait=False))
+            return ledger
+
+        ledger = self._ledgers.get(key, load)
+        # Pick up records written to the file by other processes meanwhile.
+        ledger.refresh()
+        return ledger
+
+    def flush(self) -> int:
+        """Write every dirty ledger; returns how many were written."""
+
+        with self._lock:
+            return self._ledgers.flush()
+
+    # Request handling ------------------------------------------------
+    def handle(self, request: Any) -> Dict[str, Any]:
+        """Execute one decoded request and return the response object."""
+
+        if not isinstance(request, dict):
+            return {"ok": False, "error": "Invalid request: expected a JSON object"}
+        with self._lock:
+            return self._handle(request)
+
+    def _handle(self, request: Dict[str, Any]) -> Dict[str, Any]:
+        op = request.get("op")
+        try:
+            if op == "ping":
+                return {"ok": True}
+            if op == "flush":
+                return {"ok": True, "flushed": self.flush()}
+            ledger = self.ledger(request)
+            if op == "plan":
+                plan = ledger.set_plan(
+                    float(request["income"]),
+                    {k: float(v) for k, v in request.get("allocation", {}).items()},
+                )
+                return {
+                    "ok": True,
+                    "plan": _serialize_plan(plan),
+                    "categories": list(ledger.iter_categories()),
+                }
+            if op == "record":
+                txn = ledger.add_transaction(
+                    request["category"],
+                    float(request["amount"]),
+                    request.get("description", ""),
+                )
+                return {"ok": True, "transaction": _serialize_transaction(txn)}
+            if op == "summary":
+                summary = ledger.summary()
+                response: Dict[str, Any] = {
+                    "ok": True,
+                    "plan": _serialize_plan(summary.plan),
+                    "spent_cents": summary.spent_cents,
+                    "transaction_count": summary.transaction_count,
+                }
+                if request.get("check"):
+                    response["mismatches"] = ledger.state.verify_totals()
+                return response
+            if op == "reset":
+                ledger.clear_transactions()
+                if request.get("everything"):
+                    ledger.set_plan(0.0, {})
+                return {"ok": True}
+        except (KeyError, TypeError, ValueError) as exc:
+            return {"ok": False, "error": str(exc)}
+        except (OSError, sqlite3.Error) as exc:
+            # Storage failures are the server's, not the request's; report
+            # them and keep serving.  Unwritten changes stay pending.
+            return {"ok": False, "error": f"Storage error: {exc}"}
+        return {"ok": False, "error": f"Unknown operation: {op!r}"}
+
+    async def _serve_client(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                try:
+                    request = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    response = {"ok": False, "error": f"Invalid request: {exc.msg}"}
+                else:
+                    response = await asyncio.to_thread(self.handle, request)
+                writer.write(json.dumps(response).encode("utf-8") + b"\n")
+                await writer.drain()
+        finally:
+            writer.close()
+            with contextlib.suppress(ConnectionError):
+                await writer.wait_closed()
+
+    async def _flush_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await asyncio.to_thread(self.flush)
+            except (OSError, ValueError, sqlite3.Error):
+                # A ledger that fails to write stays dirty and is retried on
+                # the next round.
+                _log.exception("Flushing ledgers failed; retrying in %gs", self.flush_interval)
+
+    async def serve(
+        self, address: Address, ready: Optional[asyncio.Event] = None
+    ) -> None:
+        """Serve on *address* until cancelled, then flush pending changes."""
+
+        if isinstance(address, tuple):
+            server = await asyncio.start_server(self._serve_client, *address)
+        else:
+            Path(address).unlink(missing_ok=True)
+            server = await asyncio.start_unix_server(self._serve_client, address)
+        flusher = asyncio.create_task(self._flush_periodically())
+        try:
+            async with server:
+                if ready is not None:
+                    ready.set()
+                await server.serve_forever()
+        finally:
+            flusher.cancel()
+            self.flush()
+            if not isinstance(address, tuple):
+                Path(address).unlink(missing_ok=True)
+
+
+class LedgerClient:
+    """Synchronous client for a running :class:`LedgerServer`.
+
+    *storage*, *backend* and *journal* select the ledger exactly as they do
+    for :meth:`AllowanceLedger.load`.
+    """
+
+    def __init__(
+        self,
+        address: Address,
+        storage: Optional[Path] = None,
+        backend: Optional[str] = None,
+        journal: bool = False,
+    ) -> None:
+        if isinstance(address, tuple):
+            self._socket = socket.create_connection(address)
+        else:
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self._socket.connect(address)
+        self._stream = self._socket.makefile("rwb")
+        self._selector = {
+            "storage": str(storage) if storage else None,
+            "backend": backend,
+            "journal": journal,
+        }
+
+    def close(self) -> None:
+        self._stream.close()
+        self._socket.close()
+
+    def __enter__(self) -> "LedgerClient":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def request(self, op: str, **params: Any) -> Dict[str, Any]:
+        message = {"op": op, **self._selector, **params}
+        self._stream.write(json.dumps(message).encode("utf-8") + b"\n")
+        self._stream.flush()
+        line = self._stream.readline()
+        if not line:
+            raise ConnectionError("The ledger server closed the connection.")
+        response = json.loads(line)
+        if not response.get("ok"):
+            raise ValueError(response.get("error", "Request failed."))
+        return response
+
+    def set_plan(
+        self, income: float, allocations: Dict[str, float]
+    ) -> Tuple[AllowancePlan, List[str]]:
+        response = self.request("plan", income=income, allocation=allocations)
+        return _deserialize_plan(response["plan"]), response["categories"]
+
+    def add_transaction(
+        self, category: str, amount: float, description: str = ""
+    ) -> Transaction:
+        response = self.request(
+            "record", category=category, amount=amount, description=description
+        )
+        return _deserialize_transaction(response["transaction"])
+
+    def summary(
+        self, check: bool = False
+    ) -> Tuple[LedgerSummary, Optional[Dict[str, Tuple[float, float]]]]:
+        response = self.request("summary", check=check)
+        summary = LedgerSummary(
+            plan=_deserialize_plan(response["plan"]),
+            spent_cents=response["spent_cents"],
+            transaction_count=response["transaction_count"],
+        )
+        mismatches = response.get("mismatches")
+        if mismatches is not None:
+            mismatches = {k: tuple(v) for k, v in mismatches.items()}
+        return summary, mismatches
+
+    def reset(self, everything: bool = False) -> None:
+        self.request("reset", everything=everything)
+
+    def flush(self) -> int:
+        return self.request("flush")["flushed"]
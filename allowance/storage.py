@@ -1,14 +1,47 @@
 """Persistence helpers for the allowance planner."""
 from __future__ import annotations
 
+import codecs
+from contextlib import contextmanager
 from datetime import datetime
+import hashlib
 import json
+import os
 from pathlib import Path
-from typing import Any, Dict
+import threading
+import time
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    MutableSequence,
+    Optional,
+    Tuple,
+)
 
-from .models import AllowancePlan, AllowanceState, Transaction
+try:  # pragma: no cover - depends on the platform
+    import fcntl
+except ImportError:  # pragma: no cover - Windows has no fcntl
+    fcntl = None  # type: ignore[assignment]
+
+from . import tracing
+from .binary import BinaryLedger, is_binary, read_binary, read_binary_summary
+from .jsonstream import DEFAULT_CHUNK_SIZE, JsonStreamReader
+from .models import AllowancePlan, AllowanceState, LedgerSummary, Transaction
+from .money import CENTS_PER_UNIT, to_cents
+from .table import TransactionTable
 
 DEFAULT_STORAGE_FILE = Path.home() / ".allowance.json"
+JOURNAL_SUFFIX = ".journal"
+LOCK_SUFFIX = ".lock"
+HEADER_VERSION = 3
+
+_DOCUMENT_START = "{\n"
+_held_locks = threading.local()
+_HEADER_PREFIX = '  "header": '
 
 
 def _serialize_transaction(txn: Transaction) -> Dict[str, Any]:
@@ -30,6 +63,9 @@ def _deserialize_transaction(data: Dict[str, Any]) -> Transaction:
     )
 
 
+tracing.instrument(globals(), "_deserialize_transaction", "storage.deserialize")
+
+
 def _serialize_plan(plan: AllowancePlan) -> Dict[str, Any]:
     return {
         "income": plan.income,
@@ -44,26 +80,533 @@ def _deserialize_plan(data: Dict[str, Any]) -> AllowancePlan:
     )
 
 
-def load_state(path: Path = DEFAULT_STORAGE_FILE) -> AllowanceState:
-    """Load a previously saved allowance state or return an empty one."""
+def lock_path(path: Path) -> Path:
+    """Return the lock file guarding *path*."""
 
-    if path.exists():
-        payload = json.loads(path.read_text())
-        plan_data = payload.get("plan", {})
-        plan = _deserialize_plan(plan_data)
-        transactions = [_deserialize_transaction(item) for item in payload.get("transactions", [])]
+    return path.with_name(path.name + LOCK_SUFFIX)
+
+
+@contextmanager
+def ledger_lock(path: Path, blocking: bool = True) -> Iterator[bool]:
+    """Hold an exclusive advisory lock on *path* for the duration of the block.
+
+    The lock lives in a separate ``.lock`` file so that atomic renames of the
+    ledger itself do not release it.  It is re-entrant within a thread.  With
+    ``blocking=False`` the block runs immediately and receives ``False`` when
+    another process or thread holds the lock.  On platforms without
+    :mod:`fcntl` the lock is a no-op.
+    """
+
+    held: Dict[Path, int] = _held_locks.__dict__.setdefault("counts", {})
+    key = path.resolve()
+    if held.get(key) or fcntl is None:
+        held[key] = held.get(key, 0) + 1
+        try:
+            yield True
+        finally:
+            held[key] -= 1
+        return
+
+    with lock_path(path).open("a") as handle:
+        flags = fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB
+        try:
+            fcntl.flock(handle.fileno(), flags)
+        except BlockingIOError:
+            acquired = False
+        else:
+            acquired = True
+        if not acquired:
+            yield False
+            return
+        held[key] = 1
+        try:
+            yield True
+        finally:
+            held[key] = 0
+            fcntl.flock(handle.fileno(), fcntl.LOCK_UN)
+
+
+def journal_path(path: Path) -> Path:
+    """Return the append-only journal file that accompanies *path*."""
+
+    return path.with_name(path.name + JOURNAL_SUFFIX)
+
+
+StorageStamp = Tuple[Optional[Tuple[int, int, int]], ...]
+
+
+def storage_stamp(path: Path) -> StorageStamp:
+    """Return what identifies the current contents of *path* and its journal.
+
+    Any write through this module replaces the file or grows the journal,
+    which changes the inode, size or modification time recorded here.
+    """
+
+    stamps = []
+    for candidate in (path, journal_path(path)):
+        try:
+            stat = candidate.stat()
+        except FileNotFoundError:
+            stamps.append(None)
+        else:
+            stamps.append((stat.st_ino, stat.st_size, stat.st_mtime_ns))
+    return tuple(stamps)
+
+
+def _iter_journal(path: Path) -> Iterator[Dict[str, Any]]:
+    journal = journal_path(path)
+    if not journal.exists():
+        return
+    with journal.open("r", encoding="utf-8") as handle:
+        for line in handle:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                # A record without its trailing newline is a write that was
+                # interrupted half way through; everything before it is intact.
+                if line.endswith("\n"):
+                    raise
+                return
+
+
+def journal_length(path: Path = DEFAULT_STORAGE_FILE) -> int:
+    """Return the number of records waiting in the journal for *path*."""
+
+    return sum(1 for _ in _iter_journal(path))
+
+
+@tracing.traced("storage.read_snapshot")
+def _read_snapshot(
+    path: Path, on_transaction: Callable[[Dict[str, Any]], None]
+) -> Dict[str, Any]:
+    """Stream the snapshot in *path* without reading the whole file at once.
+
+    Every transaction record is handed to *on_transaction* as soon as it has
+    been decoded; the remaining top-level values are returned.
+    """
+
+    document: Dict[str, Any] = {}
+    with path.open("r", encoding="utf-8") as handle:
+        reader = JsonStreamReader(handle)
+        for key in reader.iter_object():
+            if key == "transactions":
+                for item in reader.iter_array():
+                    on_transaction(item)
+            else:
+                document[key] = reader.read_value()
+    return document
+
+
+def iter_transactions(path: Path = DEFAULT_STORAGE_FILE) -> Iterator[Transaction]:
+    """Yield the transactions stored in *path* one at a time.
+
+    Nothing but the record being decoded is held in memory, whichever format
+    *path* is in; journaled records follow the snapshot's.
+    """
+
+    if is_binary(path):
+        with BinaryLedger(path) as ledger:
+            yield from ledger
+    elif path.exists():
+        with path.open("r", encoding="utf-8") as handle:
+            reader = JsonStreamReader(handle)
+            for key in reader.iter_object():
+                if key != "transactions":
+                    reader.skip_value()
+                    continue
+                for item in reader.iter_array():
+                    yield _deserialize_transaction(item)
+    for item in _iter_journal(path):
+        yield _deserialize_transaction(item)
+
+
+def _projector(table: TransactionTable) -> Callable[[Dict[str, Any]], None]:
+    """Return a callback appending only *table*'s fields from raw records."""
+
+    keep_description = table.description_ids is not None
+    keep_timestamp = table.timestamps is not None
+
+    def append(item: Dict[str, Any]) -> None:
+        timestamp = item.get("timestamp") if keep_timestamp else None
+        table.append_values(
+            item["category"],
+            float(item["amount"]),
+            item.get("description", "") if keep_description else "",
+            datetime.fromisoformat(timestamp) if timestamp else None,
+        )
+
+    return append
+
+
+class _HashingReader:
+    """Text view of the rest of a binary *handle* that hashes what it reads.
+
+    *prefix* is handed out before the first chunk without being hashed.
+    """
+
+    def __init__(self, handle: BinaryIO, prefix: str = "") -> None:
+        self._handle = handle
+        self._prefix = prefix
+        self._decoder = codecs.getincrementaldecoder("utf-8")()
+        self.digest = hashlib.sha256()
+
+    def read(self, size: int = -1) -> str:
+        text = self._prefix
+        self._prefix = ""
+        # A chunk may end inside a multi-byte character; only an empty read
+        # means the end of the file.
+        while not text:
+            data = self._handle.read(size)
+            self.digest.update(data)
+            text = self._decoder.decode(data, final=not data)
+            if not data:
+                break
+        return text
+
+    def hexdigest(self) -> str:
+        """Hash whatever is left unread and return the digest."""
+
+        while self.read(DEFAULT_CHUNK_SIZE):
+            pass
+        return self.digest.hexdigest()
+
+
+@tracing.traced("storage.read_verified")
+def _read_verified(
+    path: Path, on_transaction: Callable[[Dict[str, Any]], None]
+) -> Optional[Dict[str, Any]]:
+    """Stream the snapshot in *path*, checking it against its checksum.
+
+    Like :func:`_read_snapshot`, records are handed to *on_transaction* as
+    they are decoded and the other top-level values are returned, while the
+    body is hashed on the way.  ``None`` means the header is missing or stale,
+    or the contents do not match it; the records already handed out must then
+    be discarded and checked one by one.
+    """
+
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        return None
+    with handle:
+        start = handle.readline()
+        line = handle.readline()
+        header = _parse_header(start, line, os.fstat(handle.fileno()).st_size)
+        if header is None or not isinstance(header.get("sha256"), str):
+            return None
+        # The header line is not part of the hashed body, so the document is
+        # read as its opening brace followed by the body.
+        body = _HashingReader(handle, _DOCUMENT_START)
+        document: Dict[str, Any] = {}
+        try:
+            reader = JsonStreamReader(body)
+            for key in reader.iter_object():
+                if key == "transactions":
+                    for item in reader.iter_array():
+                        on_transaction(item)
+                else:
+                    document[key] = reader.read_value()
+        except (KeyError, TypeError, ValueError):
+            # Not what save_state wrote; the checked path reports the problem.
+            return None
+        if body.hexdigest() != header["sha256"]:
+            return None
+    return document
+
+
+def _trusted_appender(
+    transactions: MutableSequence[Transaction],
+) -> Callable[[Dict[str, Any]], None]:
+    """Return a callback appending records of a verified snapshot unchecked."""
+
+    if isinstance(transactions, TransactionTable):
+        table = transactions
+        keep_timestamp = table.timestamps is not None
+
+        def append_row(item: Dict[str, Any]) -> None:
+            timestamp = item.get("timestamp") if keep_timestamp else None
+            table.append_values(
+                item["category"],
+                item["amount"],
+                item.get("description", ""),
+                datetime.fromisoformat(timestamp) if timestamp else None,
+                validate=False,
+            )
+
+        return append_row
+
+    trusted = Transaction.trusted
+    append = transactions.append
+
+    def append_transaction(item: Dict[str, Any]) -> None:
+        # A verified file holds amounts exactly as save_state normalised them.
+        append(
+            trusted(
+                item["category"],
+                round(item["amount"] * CENTS_PER_UNIT),
+                item.get("description", ""),
+                item.get("timestamp") or datetime.utcnow(),
+            )
+        )
+
+    return append_transaction
+
+
+@tracing.traced("storage.load_state")
+def load_state(
+    path: Path = DEFAULT_STORAGE_FILE,
+    columnar: bool = False,
+    fields: Optional[Iterable[str]] = None,
+) -> AllowanceState:
+    """Load a previously saved allowance state or return an empty one.
+
+    *path* may hold a JSON snapshot or a binary ledger (see
+    :mod:`allowance.binary`); the format is detected from its first bytes.
+    Records appended to the journal with :func:`append_transaction` are
+    replayed on top of the snapshot stored in *path*.  With *columnar* the
+    transactions are kept in a compact :class:`TransactionTable`.
+
+    JSON snapshots are streamed, never read whole.  One whose content
+    matches the checksum recorded by :func:`save_state` was written by this
+    module and not changed since, so its records are loaded without
+    validating each one, and timestamps are only parsed when read.  Any other
+    file, and any load with *fields*, is checked record by record.
+
+    *fields* restricts loading to the listed transaction fields (category
+    and amount are always kept).  Records are then copied straight into a
+    projected table, skipping timestamp parsing and :class:`Transaction`
+    construction for fields that are not needed.  Such a state is read-only:
+    :func:`save_state` refuses to write it back.
+    """
+
+    transactions: MutableSequence[Transaction]
+    binary = is_binary(path)
+    if binary:
+        plan, transactions = read_binary(path, columnar, fields)
+    elif fields is not None:
+        transactions = TransactionTable(fields=fields)
+    else:
+        transactions = TransactionTable() if columnar else []
+
+    if fields is not None:
+        append = _projector(transactions)
     else:
+
+        def append(item: Dict[str, Any]) -> None:
+            transactions.append(_deserialize_transaction(item))
+
+    if not binary:
         plan = AllowancePlan(income=0.0, allocation={})
-        transactions = []
+        snapshot = None
+        if fields is None:
+            snapshot = _read_verified(path, _trusted_appender(transactions))
+            if snapshot is None:
+                # Rows taken from a file that failed verification are read
+                # again below with every record checked.
+                transactions.clear()
+        if snapshot is not None:
+            plan = _deserialize_plan(snapshot.get("plan", {}))
+        elif path.exists():
+            payload = _read_snapshot(path, append)
+            plan = _deserialize_plan(payload.get("plan", {}))
+    with tracing.span("storage.replay_journal"):
+        for item in _iter_journal(path):
+            append(item)
     return AllowanceState(plan=plan, transactions=transactions)
 
 
+@tracing.traced("storage.save_state")
 def save_state(state: AllowanceState, path: Path = DEFAULT_STORAGE_FILE) -> None:
-    """Persist *state* to *path* in JSON format."""
+    """Persist *state* to *path* in JSON format.
 
-    payload = {
-        "plan": _serialize_plan(state.plan),
-        "transactions": [_serialize_transaction(txn) for txn in state.transactions],
+    The snapshot contains every transaction, so any pending journal is
+    discarded once it has been written.
+    """
+
+    if state.is_partial:
+        raise ValueError("Cannot save a state that was loaded with a field projection.")
+    with tracing.span("storage.serialize"):
+        payload = {
+            "plan": _serialize_plan(state.plan),
+            "transactions": [_serialize_transaction(txn) for txn in state.transactions],
+        }
+        # ``body`` is the document without its opening brace; the header line
+        # is spliced in front of it so it can be read without touching the rest.
+        body = json.dumps(payload, indent=2)[len(_DOCUMENT_START):].encode("utf-8")
+    summary = state.summary()
+    with tracing.span("storage.checksum"):
+        digest = hashlib.sha256(body).hexdigest()
+    # The file is given this modification time, so a header whose file still
+    # has it was not edited since.  Whole seconds survive coarse filesystems.
+    mtime_ns = time.time_ns() // 1_000_000_000 * 1_000_000_000
+    header = {
+        "version": HEADER_VERSION,
+        "transaction_count": summary.transaction_count,
+        "spent_cents": summary.spent_cents,
+        "length": len(body),
+        "sha256": digest,
+        "mtime_ns": mtime_ns,
     }
-    path.write_text(json.dumps(payload, indent=2))
+    header_line = f"{_HEADER_PREFIX}{json.dumps(header)},\n".encode("utf-8")
+    atomic_write(path, _DOCUMENT_START.encode("utf-8") + header_line + body, mtime_ns)
+    journal_path(path).unlink(missing_ok=True)
+
+
+def _fsync_directory(directory: Path) -> None:
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    descriptor = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(descriptor)
+    finally:
+        os.close(descriptor)
+
+
+@tracing.traced("storage.write")
+def atomic_write(path: Path, data: bytes, mtime_ns: Optional[int] = None) -> None:
+    """Replace *path* with *data* so readers never observe a partial file.
+
+    The data is written to a temporary file in the same directory, flushed to
+    disk and renamed over *path*; a crash leaves either the old or the new
+    contents in place.  *mtime_ns* sets the new file's modification time.
+    """
+
+    temporary = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with temporary.open("wb") as handle:
+            handle.write(data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        if mtime_ns is not None:
+            os.utime(temporary, ns=(mtime_ns, mtime_ns))
+        os.replace(temporary, path)
+    finally:
+        temporary.unlink(missing_ok=True)
+    _fsync_directory(path.parent)
+
+
+def read_header(path: Path = DEFAULT_STORAGE_FILE) -> Optional[Dict[str, Any]]:
+    """Return the aggregate header of *path* if it is present and current.
+
+    Only the first two lines are read.  The header is rejected when its
+    version is unknown, or when the file no longer has the length and
+    modification time it was saved with, which catches files edited, copied
+    or truncated since; their contents are checked against the checksum when
+    they are loaded.
+    """
+
+    try:
+        handle = path.open("rb")
+    except FileNotFoundError:
+        return None
+    with handle:
+        start = handle.readline()
+        line = handle.readline()
+        stat = os.fstat(handle.fileno())
+    header = _parse_header(start, line, stat.st_size)
+    if header is None or header.get("mtime_ns") != stat.st_mtime_ns:
+        return None
+    return header
+
+
+def _parse_header(start: bytes, line: bytes, size: int) -> Optional[Dict[str, Any]]:
+    prefix = _HEADER_PREFIX.encode("utf-8")
+    if start != _DOCUMENT_START.encode("utf-8") or not line.startswith(prefix):
+        return None
+    try:
+        header = json.loads(line[len(prefix):].rstrip().rstrip(b","))
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(header, dict) or header.get("version") != HEADER_VERSION:
+        return None
+    length = header.get("length")
+    if not isinstance(length, int) or size != len(start) + len(line) + length:
+        return None
+    if not isinstance(header.get("spent_cents"), dict):
+        return None
+    if not isinstance(header.get("transaction_count"), int):
+        return None
+    return header
+
+
+@tracing.traced("storage.read_summary")
+def read_summary(path: Path = DEFAULT_STORAGE_FILE) -> Optional[LedgerSummary]:
+    """Build a :class:`LedgerSummary` from the header of *path* alone.
+
+    For a binary ledger the totals come from its metadata.
+
+    Pending journal records are added on top of the header totals.  Returns
+    ``None`` when the header is missing or stale and a full scan is needed.
+    """
+
+    if is_binary(path):
+        summary = read_binary_summary(path)
+        plan, spent, count = summary.plan, summary.spent_cents, summary.transaction_count
+    else:
+        header = read_header(path)
+        if header is None:
+            return None
+        with path.open("r", encoding="utf-8") as handle:
+            reader = JsonStreamReader(handle)
+            plan_data: Dict[str, Any] = {}
+            for key in reader.iter_object():
+                if key == "plan":
+                    plan_data = reader.read_value()
+                    break
+                reader.skip_value()
+        plan = _deserialize_plan(plan_data)
+        spent = {category: int(cents) for category, cents in header["spent_cents"].items()}
+        count = header["transaction_count"]
+    for item in _iter_journal(path):
+        spent[item["category"]] = spent.get(item["category"], 0) + to_cents(
+            float(item["amount"])
+        )
+        count += 1
+    return LedgerSummary(plan=plan, spent_cents=spent, transaction_count=count)
+
+
+def append_transaction(txn: Transaction, path: Path = DEFAULT_STORAGE_FILE) -> None:
+    """Append *txn* to the journal for *path* without rewriting the snapshot."""
+
+    append_transactions([txn], path)
+
+
+def append_transactions(
+    txns: Iterable[Transaction], path: Path = DEFAULT_STORAGE_FILE
+) -> None:
+    """Append every transaction in *txns* to the journal in a single write.
+
+    A record left half written by an interrupted append is removed first, so
+    the new records never end up on the same line as it.
+    """
+
+    lines = "".join(json.dumps(_serialize_transaction(txn)) + "\n" for txn in txns)
+    with ledger_lock(path), journal_path(path).open("a+b") as handle:
+        _drop_torn_record(handle)
+        handle.write(lines.encode("utf-8"))
+        handle.flush()
+        os.fsync(handle.fileno())
+
+
+def _drop_torn_record(handle: BinaryIO, chunk_size: int = 4096) -> None:
+    """Truncate *handle* after its last newline, if it does not end in one."""
+
+    end = handle.seek(0, os.SEEK_END)
+    if not end:
+        return
+    handle.seek(end - 1)
+    if handle.read(1) == b"\n":
+        return
+    position = end
+    while position > 0:
+        start = max(0, position - chunk_size)
+        handle.seek(start)
+        newline = handle.read(position - start).rfind(b"\n")
+        if newline != -1:
+            handle.truncate(start + newline + 1)
+            return
+        position = start
+    handle.truncate(0)
 
@@ -0,0 +1,249 @@
+"""Many named ledgers under one directory, with the busiest kept in memory.
+
+A :class:`LedgerStore` maps a ledger name (one per child or household) to a
+file under its root, sharded into subdirectories by a hash of the name so no
+directory grows too large::
+
+    <root>/3f/a2/alice.json
+
+Ledgers are loaded on first use into a :class:`LedgerCache`, which holds
+them with *autosave* disabled and writes their changes when they are
+flushed or evicted.  The cache is bounded both by the number of ledgers and
+by their estimated size in memory, and evicts the least recently used first.
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+import hashlib
+import logging
+from pathlib import Path
+import sqlite3
+from typing import Callable, Dict, Hashable, Iterator, Optional, Union
+from urllib.parse import quote, unquote
+
+from .backends import StorageBackend
+from .planner import AllowanceLedger, resolve_storage
+from .storage import ledger_lock
+
+DEFAULT_STORE_ROOT = Path.home() / ".allowance.d"
+DEFAULT_SHARD_DEPTH = 2
+DEFAULT_MAX_LEDGERS = 1024
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+MAX_NAME_LENGTH = 200
+# Most filesystems limit a file name to 255 bytes.  Leave room for the names
+# derived from a ledger's: its ``.journal``, ``.lock``, ``.spool`` and
+# ``.archive`` sidecars and the ``.<name>.<pid>.tmp`` of an atomic write.
+MAX_FILENAME_BYTES = 255 - 16
+
+# Errors that leave a ledger unwritten; it stays cached and dirty so the
+# next flush or eviction tries again.
+_WRITE_ERRORS = (OSError, ValueError, sqlite3.Error)
+
+_log = logging.getLogger(__name__)
+
+# Rough per-ledger and per-row costs of a ledger whose transactions are a
+# plain list; columnar tables report their own size.
+_LEDGER_BYTES = 4096
+_ROW_BYTES = 170
+
+
+def estimate_nbytes(ledger: AllowanceLedger) -> int:
+    """Return an estimate of the memory held by *ledger*, in constant time."""
+
+    transactions = ledger.state.transactions
+    nbytes = getattr(transactions, "nbytes", None)
+    if nbytes is None:
+        nbytes = _ROW_BYTES * len(transactions)
+    return _LEDGER_BYTES + nbytes
+
+
+class LedgerCache:
+    """Least recently used ledgers, written back when flushed or evicted.
+
+    At most *max_ledgers* ledgers are kept, and fewer once their estimated
+    size passes *max_bytes*; the ledger most recently handed out is never
+    evicted.  Sizes are measured with :func:`estimate_nbytes` whenever a
+    ledger is handed out and on every :meth:`flush`, so the memory bound is
+    approximate.  The cache is not thread-safe.
+    """
+
+    def __init__(
+        self, max_ledgers: int = DEFAULT_MAX_LEDGERS, max_bytes: int = DEFAULT_MAX_BYTES
+    ) -> None:
+        if max_ledgers < 1:
+            raise ValueError("The cache must hold at least one ledger.")
+        self.max_ledgers = max_ledgers
+        self.max_bytes = max_bytes
+        self.nbytes = 0
+        self.evictions = 0
+        self._ledgers: "OrderedDict[Hashable, AllowanceLedger]" = OrderedDict()
+        self._sizes: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._ledgers)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._ledgers
+
+    def get(self, key: Hashable, load: Callable[[], AllowanceLedger]) -> AllowanceLedger:
+        """Return the ledger cached under *key*, calling *load* on a miss."""
+
+        ledger = self._ledgers.get(key)
+        if ledger is None:
+            ledger = load()
+            ledger.autosave = False
+            self._ledgers[key] = ledger
+        else:
+            self._ledgers.move_to_end(key)
+        self._measure(key, ledger)
+        self._evict()
+        return ledger
+
+    def _measure(self, key: Hashable, ledger: AllowanceLedger) -> None:
+        size = estimate_nbytes(ledger)
+        self.nbytes += size - self._sizes.get(key, 0)
+        self._sizes[key] = size
+
+    def _evict(self) -> None:
+        # The most recently used ledger is never a candidate.
+        for key in list(self._ledgers)[:-1]:
+            if len(self._ledgers) <= self.max_ledgers and self.nbytes <= self.max_bytes:
+                break
+            try:
+                self.evict(key)
+            except _WRITE_ERRORS:
+                # Keep the ledger past the bound rather than failing whoever
+                # asked for another one.
+                _log.exception("Could not write ledger %r; keeping it cached", key)
+                continue
+            self.evictions += 1
+
+    def evict(self, key: Hashable) -> Optional[AllowanceLedger]:
+        """Write the ledger under *key* if it is cached, then drop it."""
+
+        ledger = self._ledgers.get(key)
+        if ledger is None:
+            return None
+        # Write before forgetting the ledger so a failed write loses nothing.
+        _write(ledger)
+        del self._ledgers[key]
+        self.nbytes -= self._sizes.pop(key)
+        return ledger
+
+    def flush(self) -> int:
+        """Write every dirty ledger; returns how many were written.
+
+        A ledger that fails to write stays dirty and does not stop the others
+        from being written; the first such error is raised once all of them
+        have been tried.
+        """
+
+        written = 0
+        error: Optional[BaseException] = None
+        for key, ledger in list(self._ledgers.items()):
+            try:
+                if _write(ledger):
+                    written += 1
+            except _WRITE_ERRORS as exc:
+                if error is None:
+                    error = exc
+            self._measure(key, ledger)
+        self._evict()
+        if error is not None:
+            raise error
+        return written
+
+    def close(self) -> None:
+        """Flush and drop every ledger."""
+
+        self.flush()
+        self._ledgers.clear()
+        self._sizes.clear()
+        self.nbytes = 0
+
+
+def _write(ledger: AllowanceLedger) -> bool:
+    if not ledger.dirty:
+        return False
+    with ledger_lock(ledger.storage_path):
+        return ledger.flush()
+
+
+class LedgerStore:
+    """Named ledgers stored under *root* and cached in a :class:`LedgerCache`.
+
+    Every ledger uses *backend* (JSON by default), and is loaded as a
+    columnar table unless *columnar* is false.  Use the store as a context
+    manager, or call :meth:`close`, so pending changes are written.
+    """
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_STORE_ROOT,
+        backend: Union[str, StorageBackend, None] = None,
+        journal: bool = False,
+        shard_depth: int = DEFAULT_SHARD_DEPTH,
+        max_ledgers: int = DEFAULT_MAX_LEDGERS,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        columnar: bool = True,
+    ) -> None:
+        self.root = Path(root)
+        self.backend = resolve_storage(None, backend, journal)[1]
+        self.suffix = self.backend.default_path.suffix
+        self.shard_depth = shard_depth
+        self.columnar = columnar
+        self.cache = LedgerCache(max_ledgers, max_bytes)
+
+    def __enter__(self) -> "LedgerStore":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+    def path(self, name: str, create: bool = False) -> Path:
+        """Return the file of the ledger *name*, creating its shard with *create*."""
+
+        if not name or len(name) > MAX_NAME_LENGTH or not name.isprintable():
+            raise ValueError(f"Invalid ledger name: {name!r}")
+        filename = f"{quote(name, safe='')}{self.suffix}"
+        if len(filename.encode("utf-8")) > MAX_FILENAME_BYTES:
+            raise ValueError(
+                f"Ledger name is too long once encoded as a file name: {name!r}"
+            )
+        digest = hashlib.sha256(name.encode("utf-8")).hexdigest()
+        shard = self.root.joinpath(
+            *(digest[2 * level:2 * level + 2] for level in range(self.shard_depth))
+        )
+        if create:
+            shard.mkdir(parents=True, exist_ok=True)
+        return shard / filename
+
+    def __contains__(self, name: str) -> bool:
+        return self.path(name).exists()
+
+    def names(self) -> Iterator[str]:
+        """Yield the names of the ledgers saved under the root, in no set order."""
+
+        pattern = "/".join(["??"] * self.shard_depth + [f"*{self.suffix}"])
+        for path in self.root.glob(pattern):
+            yield unquote(path.name[: -len(self.suffix)])
+
+    def ledger(self, name: str) -> AllowanceLedger:
+        """Return the ledger *name*, from the cache when it is there."""
+
+        return self.cache.get(name, lambda: self._load(name))
+
+    def _load(self, name: str) -> AllowanceLedger:
+        path = self.path(name, create=True)
+        return AllowanceLedger.load(path, backend=self.backend, columnar=self.columnar)
+
+    def evict(self, name: str) -> Optional[AllowanceLedger]:
+        """Write the ledger *name* if it is cached and drop it from the cache."""
+
+        return self.cache.evict(name)
+
+    def flush(self) -> int:
+        return self.cache.flush()
+
+    def close(self) -> None:
+        self.cache.close()
@@ -0,0 +1,274 @@
+"""Columnar, array-backed storage for large transaction lists."""
+from __future__ import annotations
+
+from array import array
+from collections.abc import MutableSequence
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, overload
+
+from . import tracing
+from .models import (
+    ALLOWED_CATEGORIES,
+    EPOCH,
+    TRANSACTION_FIELDS,
+    Transaction,
+    from_epoch,
+    to_epoch,
+    validate_transaction,
+)
+from .money import from_cents, group_cents, to_cents
+
+MAX_CATEGORIES = 256
+# Rough cost of one interned description: the string plus its index entries.
+_DESCRIPTION_BYTES = 96
+
+tracing.instrument(globals(), "validate_transaction", "models.validate")
+
+
+class TransactionTable(MutableSequence):
+    """A drop-in replacement for ``List[Transaction]`` stored column by column.
+
+    Categories are kept as one-byte codes, amounts as integer cents and
+    timestamps as epoch seconds in :mod:`array` buffers, while descriptions
+    are interned in a side table.  :class:`Transaction` objects are only built
+    when rows are read, so a table costs a few dozen bytes per row instead of
+    a full object graph.
+
+    A table created with a *fields* projection only keeps the category and
+    amount plus the listed optional fields; rows read back from it carry the
+    default description and :data:`EPOCH` as their timestamp.
+    """
+
+    def __init__(
+        self,
+        transactions: Iterable[Transaction] = (),
+        fields: Optional[Iterable[str]] = None,
+    ) -> None:
+        if fields is None:
+            self.fields = TRANSACTION_FIELDS
+        else:
+            unknown = set(fields).difference(TRANSACTION_FIELDS)
+            if unknown:
+                raise ValueError(f"Unknown transaction fields: {sorted(unknown)}")
+            self.fields = tuple(
+                name
+                for name in TRANSACTION_FIELDS
+                if name in fields or name in ("category", "amount")
+            )
+        self._categories: List[str] = list(ALLOWED_CATEGORIES)
+        self._category_codes: Dict[str, int] = {
+            category: code for code, category in enumerate(self._categories)
+        }
+        self._descriptions: List[str] = [""]
+        self._description_ids: Dict[str, int] = {"": 0}
+        self.codes = array("B")
+        self.cents = array("q")
+        self.timestamps = array("d") if "timestamp" in self.fields else None
+        self.description_ids = array("I") if "description" in self.fields else None
+        self._columns = [
+            column
+            for column in (self.codes, self.cents, self.timestamps, self.description_ids)
+            if column is not None
+        ]
+        self.extend(transactions)
+
+    # Encoding ------------------------------------------------------------
+    def _category_code(self, category: str) -> int:
+        code = self._category_codes.get(category)
+        if code is None:
+            code = len(self._categories)
+            if code >= MAX_CATEGORIES:
+                raise ValueError(f"A table holds at most {MAX_CATEGORIES} categories.")
+            self._categories.append(category)
+            self._category_codes[category] = code
+        return code
+
+    def _description_id(self, description: str) -> int:
+        ident = self._description_ids.get(description)
+        if ident is None:
+            ident = len(self._descriptions)
+            self._descriptions.append(description)
+            self._description_ids[description] = ident
+        return ident
+
+    def _encode(self, txn: Transaction) -> List[Union[int, float]]:
+        values: List[Union[int, float]] = [
+            self._category_code(txn.category),
+            txn.cents,
+        ]
+        if self.timestamps is not None:
+            values.append(to_epoch(txn.timestamp))
+        if self.description_ids is not None:
+            values.append(self._description_id(txn.description))
+        return values
+
+    def _row(self, index: int) -> Transaction:
+        return Transaction(
+            category=self._categories[self.codes[index]],
+            amount=from_cents(self.cents[index]),
+            description=(
+                self._descriptions[self.description_ids[index]]
+                if self.description_ids is not None
+                else ""
+            ),
+            timestamp=(
+                from_epoch(self.timestamps[index])
+                if self.timestamps is not None
+                else EPOCH
+            ),
+        )
+
+    @property
+    def categories(self) -> Tuple[str, ...]:
+        """Category names indexed by the codes stored in :attr:`codes`."""
+
+        return tuple(self._categories)
+
+    @property
+    def descriptions(self) -> Tuple[str, ...]:
+        """Interned descriptions indexed by the ids in :attr:`description_ids`."""
+
+        return tuple(self._descriptions)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory held by the table.
+
+        Interned descriptions are counted at a flat size each, so the estimate
+        is computed in constant time.
+        """
+
+        columns = sum(column.itemsize * len(column) for column in self._columns)
+        return columns + _DESCRIPTION_BYTES * len(self._descriptions)
+
+    def load_columns(
+        self,
+        categories: Iterable[str],
+        descriptions: Iterable[str],
+        codes: "array[int]",
+        cents: "array[int]",
+        timestamps: "array[float]",
+        description_ids: "array[int]",
+    ) -> None:
+        """Replace the rows with columns that are already encoded.
+
+        The arrays are adopted as they are, without copying or validation;
+        the caller vouches for them.  Columns outside the table's projection
+        are dropped.
+        """
+
+        self._categories = list(categories)
+        self._category_codes = {name: code for code, name in enumerate(self._categories)}
+        self._descriptions = list(descriptions)
+        self._description_ids = {text: ident for ident, text in enumerate(self._descriptions)}
+        self.codes = codes
+        self.cents = cents
+        if self.timestamps is not None:
+            self.timestamps = timestamps
+        if self.description_ids is not None:
+            self.description_ids = description_ids
+        self._columns = [
+            column
+            for column in (self.codes, self.cents, self.timestamps, self.description_ids)
+            if column is not None
+        ]
+
+    # Sequence protocol ---------------------------------------------------
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    @overload
+    def __getitem__(self, index: int) -> Transaction: ...
+
+    @overload
+    def __getitem__(self, index: slice) -> List[Transaction]: ...
+
+    def __getitem__(
+        self, index: Union[int, slice]
+    ) -> Union[Transaction, List[Transaction]]:
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("transaction index out of range")
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Transaction]:
+        for index in range(len(self)):
+            yield self._row(index)
+
+    def __setitem__(self, index: int, txn: Transaction) -> None:  # type: ignore[override]
+        for column, value in zip(self._columns, self._encode(txn)):
+            column[index] = value
+
+    def __delitem__(self, index: Union[int, slice]) -> None:
+        for column in self._columns:
+            del column[index]
+
+    def insert(self, index: int, txn: Transaction) -> None:
+        for column, value in zip(self._columns, self._encode(txn)):
+            column.insert(index, value)
+
+    def append(self, txn: Transaction) -> None:
+        for column, value in zip(self._columns, self._encode(txn)):
+            column.append(value)
+
+    def append_values(
+        self,
+        category: str,
+        amount: float,
+        description: str = "",
+        timestamp: Optional[datetime] = None,
+        validate: bool = True,
+    ) -> None:
+        """Append a row from raw field values without building a Transaction.
+
+        Values for fields outside the table's projection are ignored.  Pass
+        ``validate=False`` for values known to be valid, such as records of a
+        file whose checksum was verified.
+        """
+
+        if validate:
+            validate_transaction(category, amount)
+        self.codes.append(self._category_code(category))
+        self.cents.append(to_cents(amount))
+        if self.timestamps is not None:
+            self.timestamps.append(to_epoch(timestamp) if timestamp else 0.0)
+        if self.description_ids is not None:
+            self.description_ids.append(self._description_id(description))
+
+    def iter_index_keys(self, start: int = 0) -> Iterator[Tuple[str, float]]:
+        """Yield ``(category, epoch_seconds)`` for the rows from *start* on."""
+
+        if self.timestamps is None:
+            raise ValueError("This table was loaded without timestamps.")
+        categories = self._categories
+        for code, timestamp in zip(self.codes[start:], self.timestamps[start:]):
+            yield categories[code], timestamp
+
+    def extend(self, transactions: Iterable[Transaction]) -> None:
+        for txn in transactions:
+            self.append(txn)
+
+    def clear(self) -> None:
+        for column in self._columns:
+            del column[:]
+
+    # Aggregation ---------------------------------------------------------
+    def category_totals(self) -> Tuple[Dict[str, int], Dict[str, int]]:
+        """Return ``(spent_cents, counts)`` per category.
+
+        The sums run over the contiguous code and cents buffers with
+        :func:`~allowance.money.group_cents`, so the per-row work happens in C
+        (or NumPy) rather than in Python, and the totals are exact.
+        """
+
+        totals, counts = group_cents(self.codes, self.cents, len(self._categories))
+        spent: Dict[str, int] = {}
+        present: Dict[str, int] = {}
+        for code, category in enumerate(self._categories):
+            if counts[code]:
+                spent[category] = totals[code]
+                present[category] = counts[code]
+        return spent, present
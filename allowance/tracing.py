@@ -0,0 +1,306 @@
+"""Lightweight tracing spans for the command line, ledger and storage paths.
+
+Code marks interesting regions with :func:`span` (or :func:`traced`), and
+per-row helpers that run millions of times are registered with
+:func:`instrument`.  Nothing is measured until a :class:`TraceCollector` is
+installed: :func:`span` then hands back a shared no-op context manager, and
+instrumented helpers are the original functions, so disabled tracing costs a
+global lookup per span and nothing per row.
+
+Embedding applications collect the same metrics as ``--profile`` with::
+
+    with tracing.collect() as collector:
+        ledger = AllowanceLedger.load(path)
+    print(collector.report())
+"""
+from __future__ import annotations
+
+from contextlib import contextmanager
+from dataclasses import dataclass
+import functools
+import json
+import os
+from pathlib import Path
+import threading
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, Iterator, List, MutableMapping, Optional, Tuple
+
+_collector: Optional["TraceCollector"] = None
+# (namespace, attribute, span name, original function) for :func:`instrument`.
+_instrumented: List[Tuple[MutableMapping[str, Any], str, str, Callable[..., Any]]] = []
+
+
+@dataclass
+class SpanEvent:
+    """One completed span; *start* is relative to the collector's creation."""
+
+    name: str
+    start: float
+    duration: float
+    thread_id: int
+    depth: int
+    allocated: Optional[int] = None
+
+
+@dataclass
+class SpanStats:
+    """Totals for every span, or instrumented call, sharing one name."""
+
+    name: str
+    count: int = 0
+    total: float = 0.0
+    self_time: float = 0.0
+    allocated: int = 0
+
+
+class _Frame:
+    __slots__ = ("name", "started", "children", "memory")
+
+    def __init__(self, name: str, started: float, memory: Optional[int]) -> None:
+        self.name = name
+        self.started = started
+        self.children = 0.0
+        self.memory = memory
+
+
+class _NullSpan:
+    def __enter__(self) -> None:
+        return None
+
+    def __exit__(self, *exc_info: object) -> None:
+        return None
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("_collector", "_name", "_frame")
+
+    def __init__(self, collector: "TraceCollector", name: str) -> None:
+        self._collector = collector
+        self._name = name
+
+    def __enter__(self) -> None:
+        self._frame = self._collector._enter(self._name, self._collector.memory)
+
+    def __exit__(self, *exc_info: object) -> None:
+        self._collector._exit(self._frame, record=True)
+
+
+class TraceCollector:
+    """Gather span timings (and optionally allocations) while installed.
+
+    With *memory*, :mod:`tracemalloc` is started so every span also reports
+    the net number of bytes it left allocated; this slows the traced code
+    down noticeably.  *on_span* is called with each :class:`SpanEvent` as it
+    completes, letting an application forward spans to its own metrics.
+    """
+
+    def __init__(
+        self,
+        memory: bool = False,
+        on_span: Optional[Callable[[SpanEvent], None]] = None,
+    ) -> None:
+        self.memory = memory
+        self.on_span = on_span
+        self.events: List[SpanEvent] = []
+        self.stats: Dict[str, SpanStats] = {}
+        self.peak_memory: Optional[int] = None
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    # Recording ---------------------------------------------------------
+    def _stack(self) -> List[_Frame]:
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def _enter(self, name: str, memory: bool) -> _Frame:
+        current = tracemalloc.get_traced_memory()[0] if memory else None
+        frame = _Frame(name, time.perf_counter(), current)
+        self._stack().append(frame)
+        return frame
+
+    def _exit(self, frame: _Frame, record: bool) -> None:
+        ended = time.perf_counter()
+        duration = ended - frame.started
+        allocated = None
+        if frame.memory is not None:
+            allocated = tracemalloc.get_traced_memory()[0] - frame.memory
+        stack = self._stack()
+        stack.pop()
+        if stack:
+            stack[-1].children += duration
+        with self._lock:
+            stats = self.stats.get(frame.name)
+            if stats is None:
+                stats = self.stats[frame.name] = SpanStats(frame.name)
+            stats.count += 1
+            stats.total += duration
+            stats.self_time += duration - frame.children
+            if allocated is not None:
+                stats.allocated += allocated
+            if not record:
+                return
+            event = SpanEvent(
+                name=frame.name,
+                start=frame.started - self._origin,
+                duration=duration,
+                thread_id=threading.get_ident(),
+                depth=len(stack),
+                allocated=allocated,
+            )
+            self.events.append(event)
+        if self.on_span is not None:
+            self.on_span(event)
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def _counting(self, name: str, function: Callable[..., Any]) -> Callable[..., Any]:
+        """Wrap a hot helper so its calls are totalled without per-call events."""
+
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            frame = self._enter(name, False)
+            try:
+                return function(*args, **kwargs)
+            finally:
+                self._exit(frame, record=False)
+
+        return wrapper
+
+    # Reporting ---------------------------------------------------------
+    def report(self) -> str:
+        """Return a table of span totals, slowest first."""
+
+        rows = sorted(self.stats.values(), key=lambda stats: stats.total, reverse=True)
+        if not rows:
+            return "Profile: no spans were recorded."
+        width = max(len("Span"), *(len(stats.name) for stats in rows))
+        header = f"  {'Span':<{width}} {'Calls':>9} {'Total ms':>11} {'Self ms':>11}"
+        if self.memory:
+            header += f" {'Alloc KiB':>11}"
+        lines = ["Profile:", header]
+        for stats in rows:
+            line = (
+                f"  {stats.name:<{width}} {stats.count:>9}"
+                f" {stats.total * 1000:>11.2f} {stats.self_time * 1000:>11.2f}"
+            )
+            if self.memory:
+                line += f" {stats.allocated / 1024:>11.1f}"
+            lines.append(line)
+        if self.peak_memory is not None:
+            lines.append(f"  Peak traced memory: {self.peak_memory / 1024:.1f} KiB")
+        return "\n".join(lines)
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        """Return the spans in Chrome's trace event format (``chrome://tracing``)."""
+
+        pid = os.getpid()
+        events = []
+        for event in self.events:
+            entry: Dict[str, Any] = {
+                "name": event.name,
+                "cat": event.name.partition(".")[0],
+                "ph": "X",
+                "ts": event.start * 1e6,
+                "dur": event.duration * 1e6,
+                "pid": pid,
+                "tid": event.thread_id,
+            }
+            if event.allocated is not None:
+                entry["args"] = {"allocated": event.allocated}
+            events.append(entry)
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def write_chrome_trace(self, path: Path) -> None:
+        path.write_text(json.dumps(self.chrome_trace()), encoding="utf-8")
+
+
+# Global switch ----------------------------------------------------------
+def enabled() -> bool:
+    return _collector is not None
+
+
+def install(collector: Optional[TraceCollector]) -> Optional[TraceCollector]:
+    """Make *collector* receive spans (``None`` disables tracing).
+
+    Returns the previously installed collector so it can be restored.
+    """
+
+    global _collector
+    previous = _collector
+    _collector = collector
+    for namespace, attribute, name, original in _instrumented:
+        namespace[attribute] = (
+            collector._counting(name, original) if collector is not None else original
+        )
+    return previous
+
+
+@contextmanager
+def collect(
+    memory: bool = False, on_span: Optional[Callable[[SpanEvent], None]] = None
+) -> Iterator[TraceCollector]:
+    """Collect spans for the duration of the block."""
+
+    collector = TraceCollector(memory=memory, on_span=on_span)
+    started_tracemalloc = memory and not tracemalloc.is_tracing()
+    if started_tracemalloc:
+        tracemalloc.start()
+    previous = install(collector)
+    try:
+        yield collector
+    finally:
+        install(previous)
+        if memory:
+            collector.peak_memory = tracemalloc.get_traced_memory()[1]
+        if started_tracemalloc:
+            tracemalloc.stop()
+
+
+# Instrumentation points ---------------------------------------------------
+def span(name: str) -> Any:
+    """Return a context manager timing the enclosed block as *name*."""
+
+    collector = _collector
+    if collector is None:
+        return _NULL_SPAN
+    return collector.span(name)
+
+
+def traced(name: str) -> Callable[[Callable[..., Any]], Callable[..., Any]]:
+    """Decorate a function so each call is recorded as span *name*."""
+
+    def decorate(function: Callable[..., Any]) -> Callable[..., Any]:
+        @functools.wraps(function)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            collector = _collector
+            if collector is None:
+                return function(*args, **kwargs)
+            with collector.span(name):
+                return function(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def instrument(namespace: MutableMapping[str, Any], attribute: str, name: str) -> None:
+    """Count calls to the hot helper ``namespace[attribute]`` while tracing.
+
+    Pass a module's ``globals()``: while a collector is installed the helper
+    is replaced there by a wrapper that totals its calls under *name*, and it
+    is restored when tracing stops, so callers in that module pay nothing
+    when tracing is off.
+    """
+
+    original = namespace[attribute]
+    _instrumented.append((namespace, attribute, name, original))
+    if _collector is not None:
+        namespace[attribute] = _collector._counting(name, original)
@@ -0,0 +1,265 @@
+"""HTTP API behind the web UI, served next to its static files.
+
+The ledger is exposed as JSON with every amount in integer cents:
+
+``GET /api/summary``
+    The plan, the spent totals and the current ``version``.
+``GET /api/transactions?cursor=N&limit=M``
+    Up to *M* transactions starting at position *N*, oldest first, and the
+    ``next_cursor`` to continue from (``null`` once the page reaches the end).
+``GET /api/changes?since=VERSION``
+    The transactions recorded after *VERSION*, plus the plan when it changed.
+    A ``reset`` flag tells the client its version is from another server run
+    and it has to start over.
+``POST /api/transactions``
+    Record ``{"category", "amount", "description"}``.
+``POST /api/plan``
+    Replace the plan with ``{"income", "allocation"}``.
+
+Transactions are only ever appended while the server runs, so a position is
+a stable cursor and a version (``EPOCH.COUNT.PLAN``) says exactly which rows
+a client has.  Every ``GET`` answer carries that version as its ``ETag`` and
+``If-None-Match`` gets an empty ``304`` while nothing has changed.
+"""
+from __future__ import annotations
+
+from http import HTTPStatus
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+import json
+from pathlib import Path
+import secrets
+import threading
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+from .models import Transaction
+from .planner import AllowanceLedger
+from .storage import _serialize_plan, ledger_lock
+
+WEB_ROOT = Path(__file__).with_name("web")
+DEFAULT_WEB_PORT = 8000
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def _row(position: int, txn: Transaction) -> Dict[str, Any]:
+    return {
+        "id": position,
+        "category": txn.category,
+        "cents": txn.cents,
+        "description": txn.description,
+        "timestamp": txn.timestamp.isoformat(),
+    }
+
+
+class LedgerFeed:
+    """Versioned, append-only view of a ledger for HTTP clients.
+
+    The epoch is drawn at random when the feed is created, so versions handed
+    out by an earlier server run are never mistaken for current ones.  It is
+    drawn again whenever the ledger is reloaded because another process wrote
+    to it, since the positions handed out may no longer hold.
+    """
+
+    def __init__(self, ledger: AllowanceLedger) -> None:
+        self.ledger = ledger
+        self.epoch = secrets.token_hex(4)
+        self.plan_revision = 0
+        self._lock = threading.RLock()
+
+    @property
+    def version(self) -> str:
+        count = len(self.ledger.state.transactions)
+        return f"{self.epoch}.{count}.{self.plan_revision}"
+
+    def _parse_version(self, version: str) -> Optional[Tuple[int, int]]:
+        """Return ``(count, plan_revision)`` for a version of this epoch."""
+
+        epoch, _, rest = version.partition(".")
+        count, _, revision = rest.partition(".")
+        if epoch != self.epoch or not count.isdigit() or not revision.isdigit():
+            return None
+        if int(count) > len(self.ledger.state.transactions):
+            return None
+        return int(count), int(revision)
+
+    def _totals(self) -> Dict[str, Any]:
+        summary = self.ledger.summary()
+        return {
+            "plan": {
+                "income_cents": summary.plan.income_cents,
+                "allocation_cents": summary.plan.allocation_cents,
+            },
+            "spent_cents": summary.spent_cents,
+            "transaction_count": summary.transaction_count,
+        }
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refresh()
+            return {"version": self.version, **self._totals()}
+
+    def page(self, cursor: int = 0, limit: int = DEFAULT_PAGE_SIZE) -> Dict[str, Any]:
+        if cursor < 0 or limit < 1:
+            raise ValueError("The cursor must be non-negative and the limit positive.")
+        limit = min(limit, MAX_PAGE_SIZE)
+        with self._lock:
+            transactions = self.ledger.state.transactions
+            end = min(cursor + limit, len(transactions))
+            rows = [_row(position, transactions[position]) for position in range(cursor, end)]
+            return {
+                "version": self.version,
+                "transactions": rows,
+                "next_cursor": end if end < len(transactions) else None,
+            }
+
+    def changes(self, since: str, limit: int = MAX_PAGE_SIZE) -> Dict[str, Any]:
+        """Return what was recorded after *since*, at most *limit* rows at a time.
+
+        When more rows are pending the returned version only covers the rows
+        included, so asking again with it picks up where this answer stopped.
+        """
+
+        with self._lock:
+            self._refresh()
+            parsed = self._parse_version(since)
+            if parsed is None:
+                return {"reset": True, **self.summary()}
+            count, revision = parsed
+            transactions = self.ledger.state.transactions
+            end = min(count + max(1, min(limit, MAX_PAGE_SIZE)), len(transactions))
+            response: Dict[str, Any] = {
+                "reset": False,
+                "version": f"{self.epoch}.{end}.{self.plan_revision}",
+                "transactions": [
+                    _row(position, transactions[position]) for position in range(count, end)
+                ],
+            }
+            if revision != self.plan_revision:
+                response["plan"] = self._totals()["plan"]
+            return response
+
+    def _refresh(self) -> None:
+        if self.ledger.refresh():
+            self.epoch = secrets.token_hex(4)
+
+    def current_version(self) -> str:
+        """Return the version after picking up writes made by other processes."""
+
+        with self._lock:
+            self._refresh()
+            return self.version
+
+    def record(self, category: str, amount: float, description: str = "") -> Dict[str, Any]:
+        with self._lock, ledger_lock(self.ledger.storage_path):
+            self._refresh()
+            txn = self.ledger.add_transaction(category, amount, description)
+            position = len(self.ledger.state.transactions) - 1
+            return {"version": self.version, "transaction": _row(position, txn)}
+
+    def set_plan(self, income: float, allocations: Dict[str, float]) -> Dict[str, Any]:
+        with self._lock, ledger_lock(self.ledger.storage_path):
+            self._refresh()
+            plan = self.ledger.set_plan(income, allocations)
+            self.plan_revision += 1
+            return {"version": self.version, "plan": _serialize_plan(plan)}
+
+
+class WebRequestHandler(SimpleHTTPRequestHandler):
+    """Serve ``/api/`` from the server's :class:`LedgerFeed` and files otherwise."""
+
+    server: "WebServer"
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, directory=str(WEB_ROOT), **kwargs)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def _send_json(
+        self, payload: Dict[str, Any], status: HTTPStatus = HTTPStatus.OK,
+        etag: Optional[str] = None,
+    ) -> None:
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.send_header("Cache-Control", "no-cache")
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json({"error": message}, status)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+        if not url.path.startswith("/api/"):
+            super().do_GET()
+            return
+        feed = self.server.feed
+        params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        # The version covers everything an answer depends on besides the URL.
+        etag = f'"{feed.current_version()}"'
+        if etag in (self.headers.get("If-None-Match") or ""):
+            self.send_response(HTTPStatus.NOT_MODIFIED)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+        try:
+            if url.path == "/api/summary":
+                payload = feed.summary()
+            elif url.path == "/api/transactions":
+                payload = feed.page(
+                    int(params.get("cursor", 0)), int(params.get("limit", DEFAULT_PAGE_SIZE))
+                )
+            elif url.path == "/api/changes":
+                payload = feed.changes(
+                    params.get("since", ""), int(params.get("limit", MAX_PAGE_SIZE))
+                )
+            else:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {url.path}")
+                return
+        except ValueError as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        self._send_json(payload, etag=f'"{payload["version"]}"')
+
+    def do_POST(self) -> None:
+        url = urlsplit(self.path)
+        try:
+            length = int(self.headers.get("Content-Length") or 0)
+            request = json.loads(self.rfile.read(length) or b"{}")
+            if url.path == "/api/transactions":
+                payload = self.server.feed.record(
+                    request["category"],
+                    float(request["amount"]),
+                    request.get("description", ""),
+                )
+            elif url.path == "/api/plan":
+                payload = self.server.feed.set_plan(
+                    float(request["income"]),
+                    {k: float(v) for k, v in request.get("allocation", {}).items()},
+                )
+            else:
+                self._send_error(HTTPStatus.NOT_FOUND, f"Unknown endpoint: {url.path}")
+                return
+        except (KeyError, TypeError, ValueError) as exc:
+            self._send_error(HTTPStatus.BAD_REQUEST, str(exc))
+            return
+        self._send_json(payload, HTTPStatus.CREATED)
+
+
+class WebServer(ThreadingHTTPServer):
+    """HTTP server for the web UI bound to one ledger."""
+
+    daemon_threads = True
+
+    def __init__(
+        self, address: Tuple[str, int], ledger: AllowanceLedger, quiet: bool = False
+    ) -> None:
+        super().__init__(address, WebRequestHandler)
+        self.feed = LedgerFeed(ledger)
+        self.quiet = quiet
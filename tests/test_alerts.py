@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from allowance.alerts import BudgetAlert
+from allowance.cli import main
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+
+
+def test_alerts_fire_once_per_threshold_crossing(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.set_plan(20.0, {"spend": 10.0, "save": 5.0})
+    raised: list[BudgetAlert] = []
+    ledger.alerts.subscribe(raised.append)
+
+    ledger.add_transaction("spend", 7.99)
+    assert raised == []
+    ledger.add_transaction("spend", 0.01)
+    assert [(a.category, a.threshold, a.spent) for a in raised] == [("spend", 80.0, 8.0)]
+    ledger.add_transaction("spend", 1.0)
+    ledger.add_transaction("share", 3.0)  # nothing planned
+    assert len(raised) == 1
+
+    # One transaction can cross several thresholds; later ones stay quiet.
+    ledger.add_transaction("save", 6.0)
+    assert [(a.category, a.threshold) for a in raised[1:]] == [("save", 80.0), ("save", 100.0)]
+    assert raised[-1].message() == "Save has reached 100% of its plan (6.00 of 5.00)."
+    ledger.add_transaction("save", 1.0)
+    assert len(raised) == 3
+
+    # Batches are checked row by row and reported after the write.
+    ledger.alerts.set_thresholds([50], category="spend")
+    ledger.clear_transactions()
+    written = []
+    ledger.alerts.subscribe(
+        lambda alert: written.append(len(AllowanceLedger.load(storage).state.transactions))
+    )
+    ledger.add_transactions(
+        Transaction("spend", 3.0, "", datetime(2024, 1, day)) for day in range(1, 4)
+    )
+    assert [(a.category, a.threshold, a.spent) for a in raised[3:]] == [("spend", 50.0, 6.0)]
+    assert written == [3]
+
+
+def test_record_reports_alerts_and_runs_the_hook(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    log = tmp_path / "alerts.log"
+    hook = f'echo "$ALLOWANCE_CATEGORY $ALLOWANCE_THRESHOLD $ALLOWANCE_SPENT" >> {log}'
+    main(["--storage", str(storage), "plan", "20", "--spend", "10"])
+
+    base = ["--storage", str(storage), "record"]
+    assert main([*base, "spend", "4"]) == "Recorded 4.00 to spend."
+    output = main([*base, "spend", "5", "--alert-at", "spend=90", "--alert-command", hook])
+    assert output.splitlines() == [
+        "Recorded 5.00 to spend.",
+        "Alert: Spend has reached 90% of its plan (9.00 of 10.00).",
+    ]
+    assert main([*base, "spend", "2", "--alert-command", hook]).splitlines()[1:] == [
+        "Alert: Spend has reached 100% of its plan (11.00 of 10.00)."
+    ]
+    assert log.read_text().splitlines() == ["spend 90 9.00", "spend 100 11.00"]
+
+
+def test_group_commit_reports_alerts_after_the_commit(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    main(["--storage", str(storage), "plan", "20", "--spend", "10"])
+
+    base = ["--storage", str(storage), "--journal", "record", "--group-commit"]
+    assert main([*base, "spend", "7", "--alert-at", "50"]).splitlines() == [
+        "Recorded 7.00 to spend.",
+        "Alert: Spend has reached 50% of its plan (7.00 of 10.00).",
+    ]
+    assert main([*base, "spend", "1", "--alert-at", "50"]) == "Recorded 1.00 to spend."
+    log = tmp_path / "alerts.log"
+    hook = f'echo "$ALLOWANCE_THRESHOLD $ALLOWANCE_SPENT" >> {log}'
+    output = main([*base, "spend", "3", "--alert-command", hook])
+    assert output.splitlines()[1:] == [
+        "Alert: Spend has reached 100% of its plan (11.00 of 10.00)."
+    ]
+    assert log.read_text().splitlines() == ["100 11.00"]
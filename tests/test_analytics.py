@@ -0,0 +1,95 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from allowance import analytics
+from allowance.cli import main
+from allowance.models import AllowancePlan, Transaction
+from allowance.planner import AllowanceLedger
+from allowance.table import TransactionTable
+
+ROWS = [
+    (datetime(2024, 1, 3), "spend", 3.0),
+    (datetime(2024, 1, 20), "save", 2.0),
+    (datetime(2024, 3, 1), "spend", 5.0),
+    (datetime(2024, 3, 4), "spend", 4.0),
+    (datetime(2024, 3, 9), "save", 1.5),
+]
+
+
+@pytest.fixture(params=["numpy", "python"])
+def backend(request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch) -> None:
+    if request.param == "numpy" and analytics.numpy is None:
+        pytest.skip("NumPy is not installed")
+    if request.param == "python":
+        monkeypatch.setattr(analytics, "numpy", None)
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_rollup_fills_gaps_and_averages(backend: None, columnar: bool) -> None:
+    rows = [Transaction(category, amount, timestamp=when) for when, category, amount in ROWS]
+    transactions = TransactionTable(rows) if columnar else rows
+
+    months = analytics.rollup(transactions, "month")
+    assert months.labels() == ["2024-01", "2024-02", "2024-03"]
+    assert months.cents == {"save": [200, 0, 150], "spend": [300, 0, 900]}
+    assert months.rolling_average(window=2) == [500.0, 250.0, 525.0]
+
+    weeks = analytics.rollup(transactions, "week")
+    # 2024-01-01 and 2024-02-26 are Mondays.
+    assert weeks.labels()[0] == "2024-01-01"
+    assert weeks.labels()[-1] == "2024-03-04"
+    assert weeks.cents["spend"][-2:] == [500, 400]
+    assert sum(weeks.totals()) == 1550
+
+
+def test_forecast_projects_and_dates_exhaustion(backend: None) -> None:
+    rows = [Transaction(category, amount, timestamp=when) for when, category, amount in ROWS]
+    plan = AllowancePlan(income=30.0, allocation={"spend": 10.0, "save": 10.0})
+
+    save, spend = analytics.forecast(plan, rows, "month", window=1)
+    # Spend reached 10.00 with the 2024-03-04 purchase.
+    assert spend.exhausted and spend.run_out == datetime(2024, 3, 4)
+    # Save spent 1.50 over the 8 days of March so far: 6.50 left lasts 34.67 days.
+    assert not save.exhausted
+    assert save.daily_cents == pytest.approx(150 / 8)
+    assert save.run_out.date() == datetime(2024, 4, 12).date()
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_forecast_ignores_spending_after_as_of(backend: None, columnar: bool) -> None:
+    rows = [
+        Transaction("spend", 10.0, timestamp=datetime(2024, month, 1)) for month in range(1, 7)
+    ]
+    transactions = TransactionTable(rows) if columnar else rows
+    plan = AllowancePlan(income=100.0, allocation={"spend": 100.0})
+
+    (spend,) = analytics.forecast(plan, transactions, "month", as_of=datetime(2024, 2, 15))
+    # January and February only: 20.00 over the 45 days since 1 January.
+    assert spend.spent_cents == 2000
+    assert spend.daily_cents == pytest.approx(2000 / 45)
+    assert spend.run_out.date() == datetime(2024, 8, 13).date()
+
+
+def test_trends_command(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.set_plan(30.0, {"spend": 10.0, "save": 10.0, "share": 5.0})
+    ledger.add_transactions(
+        Transaction(category, amount, timestamp=when) for when, category, amount in ROWS
+    )
+
+    output = main(["--storage", str(storage), "trends", "--window", "1", "--last", "2"])
+    assert output.splitlines() == [
+        "Monthly spending, 2024-01 to 2024-03 (3 period(s), 1-period rolling average):",
+        "  Period          Save     Spend     Total   Rolling",
+        "  2024-02         0.00      0.00      0.00      0.00",
+        "  2024-03         1.50      9.00     10.50     10.50",
+        "Projected run-out at the recent spending rate:",
+        "  Save     Remaining 6.50 at 0.19/day -> 2024-04-12",
+        "  Spend    Allocation used up on 2024-03-04",
+        "  Share    Remaining 5.00, nothing spent recently",
+    ]
@@ -0,0 +1,119 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from allowance import archive
+from allowance.archive import archive_dir, count_history, list_segments, query_history
+from allowance.cli import main
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+
+
+def _ledger(path: Path) -> AllowanceLedger:
+    ledger = AllowanceLedger.load(path)
+    ledger.set_plan(50.0, {"save": 20.0, "spend": 30.0})
+    ledger.add_transactions(
+        Transaction(category, float(day), f"day {day}", datetime(2024, month, day))
+        for month, day, category in [
+            (1, 5, "spend"),
+            (1, 20, "save"),
+            (2, 3, "spend"),
+            (3, 1, "spend"),
+            (3, 9, "save"),
+        ]
+    )
+    return ledger
+
+
+@pytest.mark.parametrize("compression", ["gzip", "xz"])
+def test_close_period_moves_old_rows_into_a_segment(tmp_path: Path, compression: str) -> None:
+    storage = tmp_path / "data.json"
+    _ledger(storage)
+
+    output = main(
+        ["--storage", str(storage), "close-period", "--before", "2024-03-01", "--compression", compression]
+    )
+    (segment,) = list_segments(storage)
+    assert output == f"Archived 3 transaction(s) to {segment.path}."
+    assert segment.path.parent == archive_dir(storage)
+    assert (segment.first, segment.last) == (datetime(2024, 1, 5), datetime(2024, 2, 3))
+    header = segment.header()
+    assert header["spent_cents"] == {"spend": 800, "save": 2000}
+    assert header["counts"] == {"spend": 2, "save": 1}
+
+    ledger = AllowanceLedger.load(storage)
+    assert [txn.amount for txn in ledger.state.transactions] == [1.0, 9.0]
+    assert ledger.state.spent_cents_for("spend") == 100
+    assert ledger.state.plan.income == 50.0
+
+    assert main(["--storage", str(storage), "close-period", "--before", "2024-03-01"]) == (
+        "No transactions before 2024-03-01 00:00; nothing to archive."
+    )
+
+
+def test_close_period_accepts_a_cutoff_with_an_offset(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    _ledger(storage)
+
+    # 02:00 at +02:00 is midnight UTC, so the 1 March row stays in the ledger.
+    output = main(
+        ["--storage", str(storage), "close-period", "--before", "2024-03-01T02:00+02:00"]
+    )
+    assert output.startswith("Archived 3 transaction(s)")
+    assert [txn.amount for txn in AllowanceLedger.load(storage).state.transactions] == [1.0, 9.0]
+
+
+def test_history_merges_archive_and_skips_other_segments(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    storage = tmp_path / "data.json"
+    _ledger(storage)
+    main(["--storage", str(storage), "close-period", "--before", "2024-02-01"])
+    main(["--storage", str(storage), "close-period", "--before", "2024-03-01"])
+    assert len(list_segments(storage)) == 2
+
+    ledger = AllowanceLedger.load(storage)
+    assert [txn.amount for txn in query_history(ledger)] == [5.0, 20.0, 3.0, 1.0, 9.0]
+    assert [txn.amount for txn in query_history(ledger, offset=1, limit=3)] == [20.0, 3.0, 1.0]
+    assert count_history(ledger, category="save") == 2
+    assert count_history(ledger, since=datetime(2024, 1, 10), until=datetime(2024, 3, 2)) == 3
+
+    opened = []
+    original = archive.Segment._open
+
+    def tracking_open(segment):
+        opened.append(segment.path)
+        return original(segment)
+
+    monkeypatch.setattr(archive.Segment, "_open", tracking_open)
+    since = datetime(2024, 2, 1)
+    assert [txn.amount for txn in query_history(ledger, since=since)] == [3.0, 1.0, 9.0]
+    assert count_history(ledger, since=since) == 3
+    assert opened == [list_segments(storage)[1].path] * 2
+
+    output = main(["--storage", str(storage), "history", "--until", "2024-01-31"])
+    assert output.splitlines()[0] == "Transactions 1-2 of 2:"
+
+
+def test_export_includes_archived_transactions(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    _ledger(storage)
+    main(["--storage", str(storage), "close-period", "--before", "2024-03-01"])
+
+    output = tmp_path / "export.jsonl"
+    base = ["--storage", str(storage), "export", "--output", str(output)]
+    assert main(base) == f"Exported 5 transaction(s) to {output}."
+    assert main([*base, "--since", "2024-01-10", "--until", "2024-03-02"]) == (
+        f"Exported 3 transaction(s) to {output}."
+    )
+    copy = tmp_path / "copy.json"
+    main(["--storage", str(copy), "import", str(output)])
+    amounts = [txn.amount for txn in AllowanceLedger.load(copy).state.transactions]
+    assert amounts == [20.0, 3.0, 1.0]
+
+    # A range with an offset is compared in UTC against archive and ledger alike.
+    offset = ["--since", "2024-01-20T01:00+01:00", "--until", "2024-03-01T01:00+01:00"]
+    assert main([*base, *offset]) == f"Exported 2 transaction(s) to {output}."
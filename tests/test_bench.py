@@ -0,0 +1,54 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from allowance.bench import BENCH_OPERATIONS, iter_synthetic_rows, parse_size, write_synthetic_ledger
+from allowance.cli import main
+from allowance.planner import AllowanceLedger
+
+
+def test_synthetic_ledgers_are_reproducible(tmp_path: Path) -> None:
+    rows = list(iter_synthetic_rows(500, seed=3))
+    assert rows == list(iter_synthetic_rows(500, seed=3))
+    assert [row[3] for row in rows] == sorted(row[3] for row in rows)
+    categories = [row[0] for row in rows]
+    assert categories.count("spend") > categories.count("share")
+
+    path = write_synthetic_ledger(tmp_path / "ledger.json", 500, seed=3)
+    ledger = AllowanceLedger.load(path)
+    assert len(ledger.state.transactions) == 500
+    for category in ledger.iter_categories():
+        assert ledger.remaining_amount(category) >= 0
+
+
+def test_parse_size() -> None:
+    assert parse_size("1500") == 1500
+    assert parse_size("1e6") == 1_000_000
+    assert parse_size("10k") == 10_000
+    assert parse_size("2M") == 2_000_000
+    with pytest.raises(ValueError):
+        parse_size("lots")
+
+
+def test_bench_command_writes_json_results(tmp_path: Path) -> None:
+    output = tmp_path / "bench.json"
+    main(["bench", "--sizes", "200", "--repeat", "2", "--samples", "3", "--output", str(output)])
+    report = json.loads(output.read_text())
+    (result,) = report["results"]
+    assert result["size"] == 200
+    assert set(result["operations"]) == set(BENCH_OPERATIONS)
+    timing = result["operations"]["load_state"]
+    assert timing["samples"] == 2
+    assert timing["p50"] <= timing["p99"]
+    assert timing["unit"] == "rows/s"
+    assert result["operations"]["add_transaction"]["samples"] == 3
+
+
+@pytest.mark.parametrize("option", ["--repeat", "--samples"])
+def test_bench_rejects_counts_below_one(option: str, capsys: pytest.CaptureFixture[str]) -> None:
+    with pytest.raises(SystemExit):
+        main(["bench", "--sizes", "200", option, "0"])
+    assert "the value must be at least 1" in capsys.readouterr().err
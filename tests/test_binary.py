@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+import pytest
+
+from allowance import binary
+from allowance.binary import BinaryLedger, is_binary
+from allowance.cli import main
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger, load_summary
+from allowance.storage import journal_path, load_state
+
+
+def _write_json_ledger(path: Path) -> AllowanceLedger:
+    ledger = AllowanceLedger.load(path)
+    ledger.set_plan(20.0, {"save": 5.0, "spend": 10.0})
+    ledger.add_transactions(
+        [
+            Transaction("spend", 4.5, "Snacks", datetime(2024, 5, 3, 10, 30, 15, 123456)),
+            Transaction("save", 2.0, "", datetime(2024, 5, 4)),
+            Transaction("spend", 0.1, "Snacks", datetime(2024, 5, 5)),
+            Transaction("spend", 1.0, "Café ☕", datetime(2024, 5, 6)),
+        ]
+    )
+    return ledger
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_convert_round_trips_and_is_detected(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, use_numpy: bool
+) -> None:
+    if not use_numpy:
+        monkeypatch.setattr(binary, "numpy", None)
+    source = tmp_path / "data.json"
+    original = _write_json_ledger(source).state
+    converted = tmp_path / "ledger.dat"
+
+    output = main(["convert", str(source), str(converted), "--to", "binary"])
+    assert output == f"Converted 4 transaction(s) from {source} to {converted} (binary)."
+    assert is_binary(converted) and not is_binary(source)
+
+    for columnar in (False, True):
+        state = load_state(converted, columnar=columnar)
+        assert list(state.transactions) == list(original.transactions)
+        assert state.plan == original.plan
+        assert state.summary() == original.summary()
+
+    projected = load_state(converted, fields=["description"])
+    assert [txn.description for txn in projected.transactions] == ["Snacks", "", "Snacks", "Café ☕"]
+
+    with BinaryLedger(converted) as ledger:
+        assert len(ledger) == 4
+        assert ledger.summary() == original.summary()
+        assert list(ledger) == list(original.transactions)
+
+    back = tmp_path / "back.json"
+    main(["convert", str(converted), str(back)])
+    assert load_state(back).transactions == original.transactions
+
+
+def test_binary_backend_journals_and_compacts(tmp_path: Path) -> None:
+    storage = tmp_path / "data.bin"
+    main(["--storage", str(storage), "plan", "20", "--spend", "10"])
+    assert is_binary(storage)
+    snapshot = storage.read_bytes()
+
+    main(["--storage", str(storage), "record", "spend", "4", "Snacks"])
+    assert storage.read_bytes() == snapshot
+    assert journal_path(storage).exists()
+    summary = load_summary(storage)
+    assert summary.spent_cents == {"spend": 400}
+    assert summary.transaction_count == 1
+
+    main(["--storage", str(storage), "compact"])
+    assert not journal_path(storage).exists()
+    with BinaryLedger(storage) as ledger:
+        assert ledger.summary().spent_cents == {"spend": 400}
+
+    # Files are recognised by their contents whatever they are called.
+    renamed = storage.rename(tmp_path / "data.json")
+    assert AllowanceLedger.load(renamed).backend.name == "binary"
+
+
+def test_truncated_binary_ledger_is_rejected(tmp_path: Path) -> None:
+    source = tmp_path / "data.json"
+    _write_json_ledger(source)
+    converted = tmp_path / "data.bin"
+    main(["convert", str(source), str(converted)])
+    converted.write_bytes(converted.read_bytes()[:-3])
+
+    with pytest.raises(ValueError, match="truncated"):
+        load_state(converted)
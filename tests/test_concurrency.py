@@ -0,0 +1,85 @@
+from __future__ import annotations
+
+from concurrent.futures import ProcessPoolExecutor
+import os
+from pathlib import Path
+import threading
+
+import pytest
+
+import allowance.storage as storage
+from allowance.backends import JsonBackend, get_backend
+from allowance.cli import main
+from allowance import groupcommit
+from allowance.groupcommit import group_commit, spool_path
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+
+
+def _record(args: tuple[str, int]) -> None:
+    path, amount = args
+    main(["--storage", path, "record", "spend", str(amount)])
+
+
+def test_concurrent_records_are_not_lost(tmp_path: Path) -> None:
+    storage_file = tmp_path / "data.json"
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(_record, [(str(storage_file), n) for n in range(1, 21)]))
+
+    ledger = AllowanceLedger.load(storage_file)
+    assert ledger.state.count_for("spend") == 20
+    assert ledger.spent_amount("spend") == sum(range(1, 21))
+    assert [p.name for p in tmp_path.iterdir() if p.name.endswith(".tmp")] == []
+
+
+def test_group_commit_merges_concurrent_writers(tmp_path: Path, monkeypatch) -> None:
+    storage_file = tmp_path / "data.json"
+    fsyncs = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(storage.os, "fsync", lambda fd: (fsyncs.append(fd), real_fsync(fd)))
+
+    writers = [
+        threading.Thread(
+            target=group_commit,
+            args=(storage_file, [Transaction("save", float(n))], JsonBackend(journal=True), 0.05),
+        )
+        for n in range(1, 9)
+    ]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    ledger = AllowanceLedger.load(storage_file)
+    assert sorted(txn.amount for txn in ledger.state.transactions) == [float(n) for n in range(1, 9)]
+    assert len(fsyncs) < len(writers)
+
+
+@pytest.mark.parametrize("backend", ["json", "journal", "sqlite"])
+def test_group_commit_recovers_from_a_crashed_leader(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch, backend: str
+) -> None:
+    storage_file = tmp_path / ("data.db" if backend == "sqlite" else "data.json")
+    resolved = get_backend(storage_file, backend)
+    real_finish = groupcommit._finish
+
+    def crash(*args: object) -> None:
+        raise RuntimeError("crashed before removing the tickets")
+
+    # The leader dies after persisting the batch but before clearing the spool.
+    monkeypatch.setattr(groupcommit, "_finish", crash)
+    with pytest.raises(RuntimeError):
+        group_commit(storage_file, [Transaction("spend", 5.0)], resolved, 0)
+    monkeypatch.setattr(groupcommit, "_finish", real_finish)
+    group_commit(storage_file, [Transaction("spend", 1.0)], resolved, 0)
+    assert [txn.amount for txn in AllowanceLedger.load(storage_file).state.transactions] == [5.0, 1.0]
+
+    # One that dies before the write has its batch written by the next leader.
+    monkeypatch.setattr(resolved, "append_many", crash)
+    with pytest.raises(RuntimeError):
+        group_commit(storage_file, [Transaction("save", 2.0)], resolved, 0)
+    monkeypatch.undo()
+    group_commit(storage_file, [Transaction("save", 3.0)], resolved, 0)
+    amounts = [txn.amount for txn in AllowanceLedger.load(storage_file).state.transactions]
+    assert amounts == [5.0, 1.0, 2.0, 3.0]
+    assert list(spool_path(storage_file).iterdir()) == []
@@ -0,0 +1,56 @@
+from __future__ import annotations
+
+import csv
+from datetime import datetime
+import json
+from pathlib import Path
+
+import pytest
+
+from allowance.cli import main
+from allowance.importer import import_transactions
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+
+
+@pytest.mark.parametrize("name", ["data.json", "data.db", "data.bin"])
+def test_export_round_trips_through_import(tmp_path: Path, name: str) -> None:
+    storage = tmp_path / name
+    ledger = AllowanceLedger.load(storage)
+    ledger.add_transactions(
+        Transaction(category, amount, description, datetime(2024, 5, day))
+        for day, category, amount, description in [
+            (3, "spend", 4.5, "Snacks, with friends"),
+            (1, "save", 2.0, ""),
+            (5, "spend", 0.1, 'Sticker "star"'),
+        ]
+    )
+
+    for fmt in ("csv", "jsonl"):
+        exported = tmp_path / f"out.{fmt}"
+        output = main(["--storage", str(storage), "export", "--output", str(exported)])
+        assert output == f"Exported 3 transaction(s) to {exported}."
+        copy = AllowanceLedger.load(tmp_path / f"copy-{fmt}.json")
+        assert import_transactions(copy, exported).imported == 3
+        assert copy.state.transactions == ledger.state.transactions
+
+    with (tmp_path / "out.csv").open(newline="") as handle:
+        assert next(csv.reader(handle)) == ["category", "amount", "description", "timestamp"]
+
+
+def test_export_to_stdout_filters_by_date(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage, journal=True)
+    for day in (1, 2, 3):
+        ledger.add_transactions([Transaction("spend", float(day), timestamp=datetime(2024, 5, day))])
+
+    assert main(["--storage", str(storage), "export", "--format", "jsonl", "--since", "2024-05-02"]) == ""
+    captured = capsys.readouterr()
+    assert [json.loads(line)["amount"] for line in captured.out.splitlines()] == [2.0, 3.0]
+    assert captured.err.strip() == "Exported 2 transaction(s)."
+
+    rows = AllowanceLedger.stream(storage, until=datetime(2024, 5, 2))
+    assert [txn.amount for txn in rows] == [1.0]
+    assert [txn.amount for txn in ledger.iter_transactions(since=datetime(2024, 5, 3))] == [3.0]
@@ -0,0 +1,50 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from allowance.cli import main
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+
+
+def _ledger(tmp_path: Path) -> AllowanceLedger:
+    ledger = AllowanceLedger.load(tmp_path / "data.json")
+    # Imported rows do not have to arrive in timestamp order.
+    ledger.add_transactions(
+        Transaction(category, amount, f"day {day}", datetime(2024, 5, day))
+        for day, category, amount in [
+            (3, "spend", 3.0),
+            (1, "spend", 1.0),
+            (2, "save", 2.0),
+            (5, "spend", 5.0),
+            (4, "save", 4.0),
+        ]
+    )
+    return ledger
+
+
+def test_query_filters_by_range_and_category(tmp_path: Path) -> None:
+    ledger = _ledger(tmp_path)
+
+    assert [t.amount for t in ledger.query()] == [1.0, 2.0, 3.0, 4.0, 5.0]
+    assert [t.amount for t in ledger.query(since=datetime(2024, 5, 2), until=datetime(2024, 5, 4))] == [2.0, 3.0]
+    assert [t.amount for t in ledger.query(category="spend", offset=1, limit=1)] == [3.0]
+    assert ledger.count(category="save") == 2
+
+    # Rows added after the index was built are merged in order.
+    ledger.state.add_transaction(Transaction("save", 0.5, timestamp=datetime(2024, 5, 1, 12)))
+    assert [t.amount for t in ledger.query(category="save")] == [0.5, 2.0, 4.0]
+
+
+def test_history_command_pages_results(tmp_path: Path) -> None:
+    _ledger(tmp_path)
+    storage = str(tmp_path / "data.json")
+
+    output = main(["--storage", storage, "history", "--until", "2024-05-03", "--limit", "2"])
+
+    assert output.splitlines() == [
+        "Transactions 1-2 of 3:",
+        "  2024-05-01 00:00  Spend        1.00  day 1",
+        "  2024-05-02 00:00  Save         2.00  day 2",
+    ]
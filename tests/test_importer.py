@@ -0,0 +1,87 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from allowance.cli import main
+from allowance.importer import import_transactions
+from allowance.planner import AllowanceLedger
+
+
+def test_import_csv_reports_row_errors(tmp_path: Path) -> None:
+    source = tmp_path / "bank.csv"
+    source.write_text(
+        "category,amount,description,timestamp\n"
+        "spend,4.5,Snacks,2024-05-03T10:00:00\n"
+        "travel,2,Bus,\n"
+        "save,abc,,\n"
+        "save,3,,\n"
+    )
+    ledger = AllowanceLedger.load(tmp_path / "data.json")
+
+    report = import_transactions(ledger, source)
+
+    assert report.imported == 2
+    assert [(error.line, error.message) for error in report.errors] == [
+        (3, "Unknown category: travel"),
+        (4, "Invalid amount: 'abc'"),
+    ]
+    reloaded = AllowanceLedger.load(tmp_path / "data.json")
+    assert reloaded.spent_amount("spend") == 4.5
+    assert reloaded.state.transactions[0].timestamp.day == 3
+
+
+def test_import_command_commits_in_batches(tmp_path: Path) -> None:
+    source = tmp_path / "rows.jsonl"
+    source.write_text(
+        "".join(f'{{"category": "spend", "amount": {i}}}\n' for i in range(1, 6))
+        + "not json\n"
+    )
+    storage = tmp_path / "data.db"
+
+    output = main(["--storage", str(storage), "import", str(source), "--commit-every", "2"])
+
+    assert output.splitlines()[:2] == [
+        f"Imported 5 transaction(s) from {source}.",
+        "Skipped 1 invalid row(s):",
+    ]
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 15.0
+
+
+def test_import_reports_bad_timestamps_as_row_errors(tmp_path: Path) -> None:
+    source = tmp_path / "rows.jsonl"
+    source.write_text(
+        '{"category": "spend", "amount": 1}\n'
+        '{"category": "spend", "amount": 2, "timestamp": 123}\n'
+        '{"category": "spend", "amount": 3, "timestamp": "yesterday"}\n'
+        '{"category": "spend", "amount": 4}\n'
+    )
+    ledger = AllowanceLedger.load(tmp_path / "data.json")
+
+    report = import_transactions(ledger, source, commit_every=1)
+
+    assert report.imported == 2
+    assert [(error.line, error.message) for error in report.errors] == [
+        (2, "Invalid timestamp: 123"),
+        (3, "Invalid timestamp: 'yesterday'"),
+    ]
+    assert AllowanceLedger.load(tmp_path / "data.json").spent_amount("spend") == 5.0
+
+
+def test_import_normalises_offset_timestamps_to_utc(tmp_path: Path) -> None:
+    source = tmp_path / "rows.jsonl"
+    source.write_text(
+        '{"category": "spend", "amount": 1, "timestamp": "2024-05-03T10:00:00+02:00"}\n'
+        '{"category": "spend", "amount": 2, "timestamp": "2024-05-03T09:30:00"}\n'
+    )
+    storage = tmp_path / "data.json"
+    main(["--storage", str(storage), "import", str(source)])
+
+    stored = AllowanceLedger.load(storage).state.transactions
+    assert [txn.timestamp for txn in stored] == [datetime(2024, 5, 3, 8), datetime(2024, 5, 3, 9, 30)]
+    # Date filters compare against naive timestamps without raising.
+    assert "Transactions 1-1 of 1:" in main(
+        ["--storage", str(storage), "history", "--since", "2024-05-03T09:00"]
+    )
+    output = main(["--storage", str(storage), "close-period", "--before", "2024-05-03T09:00"])
+    assert output.startswith("Archived 1 transaction(s)")
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+from array import array
+from decimal import Decimal
+
+import pytest
+
+from allowance import money
+from allowance.models import AllowancePlan, AllowanceState, Transaction
+from allowance.table import TransactionTable
+
+
+def test_to_cents_converts_exactly() -> None:
+    assert money.to_cents(0.29) == 29
+    assert money.to_cents(5) == 500
+    assert money.to_cents(Decimal("10.005")) == 1000
+    assert money.to_cents("1.015") == 102
+    with pytest.raises(ValueError):
+        money.to_cents(float("nan"))
+    with pytest.raises(ValueError):
+        money.to_cents("ten")
+
+
+def test_plan_and_transactions_use_whole_cents() -> None:
+    # 0.1 + 0.2 exceeds 0.3 in floating point, but not in cents.
+    plan = AllowancePlan(income=0.3, allocation={"save": 0.1, "spend": 0.2})
+    assert plan.unallocated == 0.0
+    assert plan.allocation_cents == {"save": 10, "spend": 20}
+    with pytest.raises(ValueError):
+        AllowancePlan(income=0.3, allocation={"save": 0.11, "spend": 0.2})
+
+    txn = Transaction(category="spend", amount=1.005)
+    assert (txn.cents, txn.amount) == (100, 1.0)
+
+
+@pytest.mark.parametrize("use_numpy", [True, False])
+def test_totals_are_exact_with_and_without_numpy(
+    monkeypatch: pytest.MonkeyPatch, use_numpy: bool
+) -> None:
+    if use_numpy and money.numpy is None:
+        pytest.skip("NumPy is not installed")
+    if not use_numpy:
+        monkeypatch.setattr(money, "numpy", None)
+
+    rows = [Transaction(category="spend", amount=0.1) for _ in range(100_000)]
+    rows += [Transaction(category="save", amount=0.07) for _ in range(3)]
+    table = TransactionTable(rows)
+    assert table.category_totals() == ({"spend": 1_000_000, "save": 21}, {"spend": 100_000, "save": 3})
+    assert money.total_cents(table.cents) == 1_000_021
+
+    state = AllowanceState(plan=AllowancePlan(income=0.0, allocation={}), transactions=table)
+    assert state.spent_for("spend") == 10_000.0
+    assert money.group_cents(array("B"), array("q"), 2) == ([0, 0], [0, 0])
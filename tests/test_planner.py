@@ -23,3 +23,26 @@ def test_plan_and_transactions(tmp_path: Path) -> None:
     ledger2 = AllowanceLedger.load(storage)
     assert ledger2.spent_amount("save") == 2.0
     assert ledger2.state.plan.category_amount("share") == 3.0
+
+
+def test_state_keeps_running_totals(tmp_path: Path) -> None:
+    ledger = AllowanceLedger.load(tmp_path / "data.json")
+    ledger.add_transaction("spend", 4.0)
+    ledger.add_transaction("spend", 1.25)
+    ledger.add_transaction("share", 3.0)
+
+    state = ledger.state
+    assert state.spent_for("spend") == 5.25
+    assert state.count_for("spend") == 2
+    assert ledger.iter_categories() == ("spend", "share")
+    assert state.verify_totals() == {}
+
+    # Bypassing the state helpers leaves the cache stale until refreshed.
+    state.transactions.pop()
+    assert state.verify_totals() == {"share": (3.0, 0.0)}
+    state.refresh_totals()
+    assert state.verify_totals() == {}
+
+    ledger.clear_transactions()
+    assert state.spent_for("spend") == 0.0
+    assert state.categories == ()
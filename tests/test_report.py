@@ -0,0 +1,61 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from allowance.cli import main
+from allowance.planner import AllowanceLedger, report_ledgers
+
+
+def _write_ledgers(root: Path) -> None:
+    alice = AllowanceLedger.load(root / "alice.json")
+    alice.set_plan(20.0, {"spend": 10.0, "save": 5.0})
+    alice.add_transaction("spend", 4.0)
+    bob = AllowanceLedger.load(root / "bob.db")
+    bob.set_plan(10.0, {"spend": 6.0})
+    bob.add_transaction("spend", 1.5)
+    bob.add_transaction("save", 2.0)
+    (root / "notes.txt").write_text("not a ledger")
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_report_merges_ledgers(tmp_path: Path, workers: int) -> None:
+    _write_ledgers(tmp_path)
+
+    report = report_ledgers([tmp_path], workers=workers)
+
+    assert [path.name for path, _ in report.rows] == ["alice.json", "bob.db"]
+    assert report.spent == {"spend": 5.5, "save": 2.0}
+    assert report.planned == {"spend": 16.0, "save": 5.0}
+    assert report.transaction_count == 3
+    assert report.errors == []
+
+
+def test_report_command_accepts_globs(tmp_path: Path) -> None:
+    _write_ledgers(tmp_path)
+
+    output = main(["report", str(tmp_path / "*.json"), "--workers", "1"])
+
+    assert output.splitlines() == [
+        "Report for 1 ledger(s), 1 transaction(s):",
+        "  Ledger           Save     Spend     Total",
+        "  alice.json       0.00      4.00      4.00",
+        "  All ledgers      0.00      4.00      4.00",
+        "  Planned          5.00     10.00     15.00",
+    ]
+    for workers in ("0", "-2"):
+        with pytest.raises(SystemExit):
+            main(["report", str(tmp_path), "--workers", workers])
+
+
+def test_report_lists_unreadable_ledgers(tmp_path: Path) -> None:
+    _write_ledgers(tmp_path)
+    (tmp_path / "corrupt.db").write_bytes(b"definitely not sqlite" * 100)
+    (tmp_path / "partial.json").write_text('{"transactions": [{"amount": 1.0}]}')
+
+    report = report_ledgers([tmp_path], workers=1)
+
+    assert [path.name for path, _ in report.rows] == ["alice.json", "bob.db"]
+    assert [path.name for path, _ in report.errors] == ["corrupt.db", "partial.json"]
+    assert report.errors[1][1] == "malformed record (KeyError: 'category')"
@@ -0,0 +1,162 @@
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+from pathlib import Path
+import socket
+import threading
+from typing import Iterator
+
+import pytest
+
+from allowance.cli import main
+from allowance.planner import AllowanceLedger
+from allowance.server import LedgerClient, LedgerServer, parse_address
+
+
+@contextlib.contextmanager
+def run_server(address: str, flush_interval: float = 60.0) -> Iterator[LedgerServer]:
+    server = LedgerServer(flush_interval=flush_interval)
+    loop = asyncio.new_event_loop()
+    ready = threading.Event()
+
+    async def serve() -> None:
+        started = asyncio.Event()
+        task = asyncio.create_task(server.serve(parse_address(address), started))
+        await started.wait()
+        ready.set()
+        await task
+
+    task = None
+
+    def run() -> None:
+        nonlocal task
+        task = loop.create_task(serve())
+        with contextlib.suppress(asyncio.CancelledError):
+            loop.run_until_complete(task)
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    assert ready.wait(5)
+    try:
+        yield server
+    finally:
+        loop.call_soon_threadsafe(task.cancel)
+        thread.join(5)
+        loop.close()
+
+
+def test_cli_talks_to_running_server(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    address = f"unix:{tmp_path / 'ledger.sock'}"
+    with run_server(address):
+        base = ["--server", address, "--storage", str(storage)]
+        main([*base, "plan", "20", "--spend", "10"])
+        assert main([*base, "record", "spend", "4", "Snacks"]) == "Recorded 4.00 to spend. Note: Snacks"
+        output = main([*base, "summary", "--check"])
+        assert "Spend    Planned:  10.00 | Spent:   4.00 | Remaining:   6.00" in output
+        assert "Cached totals verified against 1 transaction(s)." in output
+
+        # Nothing has been written yet; the background flush is far away.
+        assert not storage.exists()
+        with LedgerClient(parse_address(address), storage) as client:
+            assert client.flush() == 1
+        assert AllowanceLedger.load(storage).spent_amount("spend") == 4.0
+
+        main([*base, "record", "spend", "1"])
+    # Stopping the server writes whatever is still pending.
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 5.0
+
+
+def test_server_reports_errors_and_rejects_unsupported_commands(tmp_path: Path) -> None:
+    address = f"unix:{tmp_path / 'ledger.sock'}"
+    with run_server(address):
+        with LedgerClient(parse_address(address), tmp_path / "data.json") as client:
+            with pytest.raises(ValueError, match="Unknown category"):
+                client.add_transaction("travel", 1.0)
+        with pytest.raises(SystemExit):
+            main(["--server", address, "history"])
+
+
+def test_server_rejects_requests_that_are_not_objects(tmp_path: Path) -> None:
+    address = f"unix:{tmp_path / 'ledger.sock'}"
+    with run_server(address):
+        with socket.socket(socket.AF_UNIX) as client:
+            client.connect(str(tmp_path / "ledger.sock"))
+            with client.makefile("rb") as reader:
+                responses = []
+                for line in (b"[1]\n", b'{"op": "ping"}\n'):
+                    client.sendall(line)
+                    responses.append(json.loads(reader.readline()))
+        assert responses == [
+            {"ok": False, "error": "Invalid request: expected a JSON object"},
+            {"ok": True},
+        ]
+
+
+def test_server_does_not_overwrite_records_made_elsewhere(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    server = LedgerServer()
+    request = {"op": "record", "storage": str(storage), "category": "spend", "amount": 1}
+    assert server.handle(request)["ok"]
+    assert server.flush() == 1
+
+    main(["--storage", str(storage), "record", "spend", "2"])
+    assert server.handle({**request, "amount": 3})["ok"]
+    summary = server.handle({"op": "summary", "storage": str(storage)})
+    assert summary["spent_cents"] == {"spend": 600}
+
+    main(["--storage", str(storage), "record", "spend", "4"])
+    server.flush()
+    amounts = [txn.amount for txn in AllowanceLedger.load(storage).state.transactions]
+    assert amounts == [1.0, 2.0, 4.0, 3.0]
+
+
+def test_server_survives_storage_errors(
+    tmp_path: Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    directory = tmp_path / "ledgers"
+    directory.mkdir()
+    storage = directory / "data.json"
+    server = LedgerServer(flush_interval=0.01)
+    request = {"op": "record", "storage": str(storage), "category": "spend", "amount": 1}
+    assert server.handle(request)["ok"]
+
+    # With the directory gone, flushes fail but the record stays pending.
+    directory.rmdir()
+    directory.write_text("")
+    response = server.handle({"op": "flush"})
+    assert not response["ok"] and response["error"].startswith("Storage error:")
+    other = {**request, "storage": str(directory / "other.json")}
+    assert not server.handle(other)["ok"]
+
+    threads = []
+    original = server._ledgers.flush
+
+    def tracking_flush() -> int:
+        threads.append(threading.get_ident())
+        return original()
+
+    monkeypatch.setattr(server._ledgers, "flush", tracking_flush)
+
+    async def flush_until_writable() -> None:
+        flusher = asyncio.create_task(server._flush_periodically())
+        await asyncio.sleep(0.05)
+        directory.unlink()
+        directory.mkdir()
+        await asyncio.sleep(0.05)
+        assert not flusher.done()
+        flusher.cancel()
+
+    asyncio.run(flush_until_writable())
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 1.0
+    # The periodic flush ran off the event loop's thread.
+    assert threads and threading.get_ident() not in threads
+
+
+def test_parse_address() -> None:
+    assert parse_address("unix:/tmp/a.sock") == "/tmp/a.sock"
+    assert parse_address("/tmp/a.sock") == "/tmp/a.sock"
+    assert parse_address("localhost:8765") == ("localhost", 8765)
+    assert parse_address(":8765") == ("127.0.0.1", 8765)
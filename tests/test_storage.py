@@ -0,0 +1,290 @@
+from __future__ import annotations
+
+import io
+from pathlib import Path
+import sqlite3
+
+import pytest
+
+from allowance import tracing
+from allowance.backends import StorageBackend
+from allowance.cli import main
+from allowance.jsonstream import JsonStreamReader
+from allowance.planner import AllowanceLedger, load_summary
+from allowance.storage import journal_path, load_state, read_header, read_summary
+
+
+def test_journal_appends_without_rewriting_snapshot(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage, journal=True)
+    ledger.set_plan(20.0, {"save": 5.0, "spend": 10.0})
+    snapshot = storage.read_text()
+
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    ledger.add_transaction("save", 2.0)
+
+    assert storage.read_text() == snapshot
+    assert len(journal_path(storage).read_text().splitlines()) == 2
+
+    state = load_state(storage)
+    assert [txn.amount for txn in state.transactions] == [4.0, 2.0]
+    assert state.transactions[0].description == "Snacks"
+
+
+def test_journal_ignores_torn_trailing_record(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage, journal=True)
+    ledger.add_transaction("spend", 1.5)
+    with journal_path(storage).open("a") as handle:
+        handle.write('{"category": "spend", "amo')
+
+    assert [txn.amount for txn in load_state(storage).transactions] == [1.5]
+
+    # The next append drops the torn record rather than writing after it.
+    ledger.add_transaction("save", 2.0)
+    assert [txn.amount for txn in load_state(storage).transactions] == [1.5, 2.0]
+
+
+def test_compact_command_folds_journal(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    main(["--storage", str(storage), "plan", "20", "--spend", "10"])
+    main(["--storage", str(storage), "--journal", "record", "spend", "3"])
+    main(["--storage", str(storage), "--journal", "record", "spend", "2"])
+
+    output = main(["--storage", str(storage), "compact"])
+
+    assert "Compacted 2" in output
+    assert not journal_path(storage).exists()
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 5.0
+
+
+def test_journal_record_does_not_load_the_ledger(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    main(["--storage", str(storage), "plan", "20", "--spend", "10"])
+    main(["--storage", str(storage), "--journal", "record", "spend", "3"])
+
+    with tracing.collect() as collector:
+        output = main(["--storage", str(storage), "--journal", "record", "spend", "6"])
+    assert "storage.load_state" not in collector.stats
+    assert output.splitlines() == [
+        "Recorded 6.00 to spend.",
+        "Alert: Spend has reached 80% of its plan (9.00 of 10.00).",
+    ]
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 9.0
+
+
+def test_journal_mode_keeps_the_storage_format(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    main(["--storage", str(storage), "--backend", "json", "--journal", "record", "spend", "3"])
+    assert journal_path(storage).exists()
+
+    database = tmp_path / "ledger.db"
+    for argv in (
+        ["--storage", str(database), "--journal", "record", "spend", "3"],
+        ["--storage", str(storage), "--backend", "sqlite", "--journal", "summary"],
+    ):
+        with pytest.raises(SystemExit):
+            main(argv)
+    assert not database.exists()
+
+
+def test_sqlite_backend_selected_by_extension(tmp_path: Path) -> None:
+    storage = tmp_path / "ledger.db"
+    ledger = AllowanceLedger.load(storage)
+    assert ledger.backend.name == "sqlite"
+
+    ledger.set_plan(20.0, {"save": 5.0, "spend": 10.0})
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    ledger.add_transaction("spend", 1.5)
+    ledger.add_transaction("save", 2.0)
+
+    reloaded = AllowanceLedger.load(storage)
+    assert [txn.description for txn in reloaded.state.transactions] == ["Snacks", "", ""]
+    assert reloaded.state.plan.category_amount("save") == 5.0
+
+    summary = load_summary(storage)
+    assert summary.spent_for("spend") == 5.5
+    assert summary.remaining_for("save") == 3.0
+    assert summary.transaction_count == 3
+
+
+def test_sqlite_backend_stores_integer_cents(tmp_path: Path) -> None:
+    storage = tmp_path / "ledger.db"
+    ledger = AllowanceLedger.load(storage)
+    ledger.set_plan(20.1, {"spend": 10.1})
+    ledger.add_transaction("spend", 0.1)
+    ledger.add_transaction("spend", 0.2)
+
+    with sqlite3.connect(storage) as connection:
+        assert connection.execute(
+            "SELECT typeof(amount_cents), amount_cents FROM transactions ORDER BY id"
+        ).fetchall() == [("integer", 10), ("integer", 20)]
+        assert connection.execute("SELECT income_cents FROM plan").fetchone() == (2010,)
+
+    summary = load_summary(storage)
+    assert summary.spent_for("spend") == 0.3
+    assert summary.remaining_for("spend") == 9.8
+
+
+def test_sqlite_backend_converts_real_amounts(tmp_path: Path) -> None:
+    storage = tmp_path / "ledger.db"
+    with sqlite3.connect(storage) as connection:
+        connection.executescript(
+            """
+            CREATE TABLE plan (id INTEGER PRIMARY KEY, income REAL NOT NULL);
+            CREATE TABLE allocations (category TEXT PRIMARY KEY, amount REAL NOT NULL);
+            CREATE TABLE transactions (
+                id INTEGER PRIMARY KEY,
+                category TEXT NOT NULL,
+                amount REAL NOT NULL,
+                description TEXT NOT NULL DEFAULT '',
+                timestamp TEXT NOT NULL
+            );
+            INSERT INTO plan VALUES (1, 20.0);
+            INSERT INTO allocations VALUES ('spend', 10.0), ('save', 5.0);
+            INSERT INTO transactions (category, amount, description, timestamp)
+                VALUES ('spend', 4.1, 'Snacks', '2024-01-01T00:00:00'),
+                       ('spend', 0.29, '', '2024-01-02T00:00:00');
+            """
+        )
+    connection.close()
+
+    ledger = AllowanceLedger.load(storage)
+    assert [txn.amount for txn in ledger.state.transactions] == [4.1, 0.29]
+    assert list(ledger.state.plan.allocation) == ["spend", "save"]
+    assert ledger.state.plan.income == 20.0
+    ledger.add_transaction("save", 1.0)
+
+    with sqlite3.connect(storage) as connection:
+        rows = connection.execute("SELECT amount_cents FROM transactions ORDER BY id").fetchall()
+    connection.close()
+    assert rows == [(410,), (29,), (100,)]
+    assert load_summary(storage).spent_for("spend") == 4.39
+
+
+def test_storage_backend_requires_load_and_save() -> None:
+    with pytest.raises(TypeError):
+        StorageBackend()
+
+
+def test_backend_flag_overrides_extension(tmp_path: Path) -> None:
+    storage = tmp_path / "ledger.data"
+    main(["--storage", str(storage), "--backend", "sqlite", "plan", "10", "--spend", "6"])
+    main(["--storage", str(storage), "--backend", "sqlite", "record", "spend", "2"])
+
+    output = main(["--storage", str(storage), "--backend", "sqlite", "summary"])
+
+    assert "Spent:   2.00 | Remaining:   4.00" in output
+    assert AllowanceLedger.load(storage, backend="sqlite").spent_amount("spend") == 2.0
+
+
+def test_streaming_reader_handles_values_across_chunks() -> None:
+    document = '{"plan": {"income": 12.5}, "transactions": [' + ", ".join(
+        f'{{"category": "spend", "amount": {i}}}' for i in range(50)
+    ) + '], "extra": 12345}'
+    reader = JsonStreamReader(io.StringIO(document), chunk_size=7)
+
+    values = {}
+    for key in reader.iter_object():
+        if key == "transactions":
+            values[key] = [item["amount"] for item in reader.iter_array()]
+        else:
+            values[key] = reader.read_value()
+
+    assert values == {"plan": {"income": 12.5}, "transactions": list(range(50)), "extra": 12345}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 4, 5, 8])
+def test_streaming_reader_reads_scalars_split_across_chunks(chunk_size: int) -> None:
+    document = '{"plan": -2500.0, "rate": 1.5e-3, "open": true, "note": null, "n": 12}'
+    reader = JsonStreamReader(io.StringIO(document), chunk_size=chunk_size)
+
+    values = {key: reader.read_value() for key in reader.iter_object()}
+
+    assert values == {"plan": -2500.0, "rate": 1.5e-3, "open": True, "note": None, "n": 12}
+    assert JsonStreamReader(io.StringIO("-2500.0"), chunk_size=chunk_size).read_value() == -2500.0
+
+
+@pytest.mark.parametrize("name", ["data.json", "data.db"])
+def test_projected_load_skips_unneeded_fields(tmp_path: Path, name: str) -> None:
+    storage = tmp_path / name
+    ledger = AllowanceLedger.load(storage)
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    ledger.add_transaction("save", 2.5, "Piggy bank")
+
+    with tracing.collect() as collector:
+        projected = AllowanceLedger.load(storage, fields=("category", "amount"))
+    # Projections skip the verified path and check what they copy instead.
+    assert "storage.read_verified" not in collector.stats
+
+    assert projected.spent_amount("save") == 2.5
+    assert [txn.description for txn in projected.state.transactions] == ["", ""]
+    with pytest.raises(ValueError):
+        projected.save()
+
+    with_text = AllowanceLedger.load(storage, fields=("description",))
+    assert [txn.description for txn in with_text.state.transactions] == ["Snacks", "Piggy bank"]
+
+
+def test_summary_reads_header_and_scans_stale_files(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.set_plan(20.0, {"spend": 10.0})
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    header = read_header(storage)
+    assert header is not None
+    assert header["spent_cents"] == {"spend": 400}
+    assert header["transaction_count"] == 1
+
+    # A journaled record is added on top of the header totals.
+    AllowanceLedger.load(storage, journal=True).add_transaction("spend", 1.0)
+    assert read_summary(storage).spent_for("spend") == 5.0
+
+    # Editing the file by hand invalidates the header...
+    storage.write_text(storage.read_text().replace('"amount": 4.0', '"amount": 40.0'))
+    assert read_header(storage) is None
+
+    # ...so summary falls back to a full scan, without touching the file.
+    edited = storage.read_bytes()
+    summary = load_summary(storage)
+    assert summary.spent_for("spend") == 41.0
+    assert summary.transaction_count == 2
+    assert storage.read_bytes() == edited
+
+    # So does an edit that keeps the length, since it changes the mtime.
+    AllowanceLedger.load(storage).set_plan(20.0, {"spend": 10.0})
+    storage.write_text(storage.read_text().replace('"amount": 40.0', '"amount": 90.0'))
+    assert read_header(storage) is None
+    assert load_summary(storage).spent_for("spend") == 91.0
+
+    # The summary command rewrites the file once, bringing the header back.
+    assert "Spent:  91.00" in main(["--storage", str(storage), "summary"])
+    assert read_header(storage)["spent_cents"] == {"spend": 9100}
+    with tracing.collect() as collector:
+        assert load_summary(storage).spent_for("spend") == 91.0
+    assert "storage.load_state" not in collector.stats
+
+
+@pytest.mark.parametrize("columnar", [False, True])
+def test_verified_files_skip_validation(tmp_path: Path, columnar: bool) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    ledger.add_transaction("save", 2.5)
+    expected = list(ledger.state.transactions)
+
+    with tracing.collect() as collector:
+        state = load_state(storage, columnar=columnar)
+    assert "models.validate" not in collector.stats
+    assert "storage.read_snapshot" not in collector.stats
+    if not columnar:
+        # Timestamps are parsed when they are first read.
+        assert "_raw_timestamp" in state.transactions[0].__dict__
+    assert list(state.transactions) == expected
+    assert state.spent_cents_for("spend") == 400
+
+    # A change that keeps the length still fails the checksum, and the
+    # records are checked one by one again.
+    storage.write_text(storage.read_text().replace('"spend"', '"bogus"'))
+    with pytest.raises(ValueError, match="Unknown category: bogus"):
+        load_state(storage, columnar=columnar)
@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+from pathlib import Path
+
+import pytest
+
+from allowance.cli import main
+from allowance.planner import AllowanceLedger
+from allowance.store import LedgerCache, LedgerStore, estimate_nbytes
+
+
+def test_store_shards_names_and_writes_ledgers_on_eviction(tmp_path: Path) -> None:
+    names = ["alice", "bob", "the smiths/2024", "zoë"]
+    with LedgerStore(tmp_path, max_ledgers=2) as store:
+        for index, name in enumerate(names):
+            ledger = store.ledger(name)
+            ledger.set_plan(20.0, {"spend": 10.0})
+            ledger.add_transaction("spend", float(index + 1))
+            assert len(store.cache) == min(index + 1, 2)
+
+        path = store.path("alice")
+        shard_a, shard_b, filename = path.relative_to(tmp_path).parts
+        assert len(shard_a) == len(shard_b) == 2 and filename == "alice.json"
+        assert store.path("the smiths/2024").name == "the%20smiths%2F2024.json"
+        with pytest.raises(ValueError, match="Invalid ledger name"):
+            store.path("")
+        # Percent-encoding triples non-ASCII names, so the file name is what counts.
+        with pytest.raises(ValueError, match="too long"):
+            store.path("é" * 100)
+        assert store.path("é" * 30).name == "%C3%A9" * 30 + ".json"
+
+        # The two least recently used ledgers were written when evicted.
+        assert store.cache.evictions == 2
+        assert "alice" not in store.cache and "zoë" in store.cache
+        assert AllowanceLedger.load(path).spent_amount("spend") == 1.0
+        assert not store.path("zoë").exists()
+
+        # A cached ledger is handed out again rather than reloaded.
+        assert store.ledger("zoë") is store.ledger("zoë")
+        assert store.evict("zoë").spent_amount("spend") == 4.0
+        assert store.evict("zoë") is None
+    assert sorted(store.names()) == sorted(names)
+    assert AllowanceLedger.load(store.path("the smiths/2024")).spent_amount("spend") == 3.0
+
+
+def test_cache_stays_within_its_memory_bound(tmp_path: Path) -> None:
+    ledgers = [
+        AllowanceLedger.load(tmp_path / f"{index}.json", columnar=True) for index in range(3)
+    ]
+    size = estimate_nbytes(ledgers[0])
+    cache = LedgerCache(max_ledgers=10, max_bytes=2 * size)
+    for index, ledger in enumerate(ledgers):
+        assert cache.get(index, lambda: ledger) is ledger
+    assert [index for index in range(3) if index in cache] == [1, 2]
+    assert cache.nbytes == 2 * size
+
+    # Growing a cached ledger counts against the bound once it is measured.
+    ledgers[2].add_transaction("spend", 1.0)
+    assert cache.flush() == 1
+    assert [index for index in range(3) if index in cache] == [2]
+    assert AllowanceLedger.load(tmp_path / "2.json").spent_amount("spend") == 1.0
+
+
+def test_cache_writes_other_ledgers_when_one_fails(tmp_path: Path) -> None:
+    broken = tmp_path / "broken"
+    broken.mkdir()
+    cache = LedgerCache(max_ledgers=2)
+    for key, path in (("a", broken / "a.json"), ("b", tmp_path / "b.json")):
+        cache.get(key, lambda path=path: AllowanceLedger.load(path)).add_transaction("spend", 1.0)
+    broken.rmdir()
+    broken.write_text("")
+
+    with pytest.raises(OSError):
+        cache.flush()
+    assert AllowanceLedger.load(tmp_path / "b.json").spent_amount("spend") == 1.0
+    assert "a" in cache
+
+    # Evicting the unwritable ledger fails quietly; it stays cached and dirty.
+    other = cache.get("c", lambda: AllowanceLedger.load(tmp_path / "c.json"))
+    assert "a" in cache and "b" not in cache and cache.get("c", lambda: other) is other
+    broken.unlink()
+    broken.mkdir()
+    assert cache.flush() == 1
+    assert AllowanceLedger.load(broken / "a.json").spent_amount("spend") == 1.0
+
+
+def test_cli_selects_a_named_ledger(tmp_path: Path) -> None:
+    base = ["--store", str(tmp_path), "--ledger", "alice"]
+    main([*base, "plan", "20", "--spend", "10"])
+    assert main([*base, "record", "spend", "4"]) == "Recorded 4.00 to spend."
+    assert "Spent:   4.00" in main([*base, "summary"])
+    assert "No transactions recorded yet." in main(
+        ["--store", str(tmp_path), "--ledger", "bob", "summary"]
+    )
+    assert list(LedgerStore(tmp_path).names()) == ["alice"]
+
+    with pytest.raises(SystemExit):
+        main([*base, "--storage", str(tmp_path / "data.json"), "summary"])
@@ -0,0 +1,44 @@
+from __future__ import annotations
+
+from datetime import datetime
+from pathlib import Path
+
+from allowance.models import Transaction
+from allowance.planner import AllowanceLedger
+from allowance.table import TransactionTable
+
+
+def test_table_round_trips_transactions() -> None:
+    when = datetime(2024, 5, 3, 10, 30, 15, 123456)
+    rows = [
+        Transaction("spend", 4.5, "Snacks", when),
+        Transaction("save", 2.0, "", when),
+        Transaction("spend", 0.1, "Snacks", when),
+    ]
+    table = TransactionTable(rows)
+
+    assert len(table) == 3
+    assert list(table) == rows
+    assert table[-1] == rows[2]
+    assert table[:2] == rows[:2]
+    assert table.category_totals() == ({"save": 200, "spend": 460}, {"save": 1, "spend": 2})
+
+    del table[0]
+    assert [txn.category for txn in table] == ["save", "spend"]
+    table.clear()
+    assert not table
+
+
+def test_ledger_can_load_into_a_columnar_table(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.add_transaction("spend", 4.0, "Snacks")
+    ledger.add_transaction("share", 1.25)
+
+    columnar = AllowanceLedger.load(storage, columnar=True)
+    assert isinstance(columnar.state.transactions, TransactionTable)
+    assert columnar.spent_amount("share") == 1.25
+
+    columnar.add_transaction("spend", 0.5)
+    assert columnar.state.verify_totals() == {}
+    assert AllowanceLedger.load(storage).spent_amount("spend") == 4.5
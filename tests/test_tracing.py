@@ -0,0 +1,65 @@
+from __future__ import annotations
+
+import json
+from pathlib import Path
+
+import pytest
+
+from allowance import storage, tracing
+from allowance.cli import main
+from allowance.planner import AllowanceLedger
+
+
+def test_collect_records_nested_spans_and_hot_helpers(tmp_path: Path) -> None:
+    path = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(path)
+    ledger.add_transaction("spend", 2.0)
+    ledger.add_transaction("save", 3.0)
+    # An edited file fails its checksum, so every record is deserialized
+    # and validated.
+    with path.open("a") as handle:
+        handle.write("\n")
+
+    original = storage._deserialize_transaction
+    seen = []
+    with tracing.collect(on_span=seen.append) as collector:
+        assert tracing.enabled()
+        AllowanceLedger.load(path)
+    assert not tracing.enabled()
+    assert storage._deserialize_transaction is original
+
+    assert collector.stats["storage.deserialize"].count == 2
+    assert collector.stats["models.validate"].count == 2
+    load = collector.stats["ledger.load"]
+    assert load.count == 1
+    assert load.self_time <= load.total
+    # Hot helpers are totalled but not recorded as individual events.
+    assert [event.name for event in seen] == [event.name for event in collector.events]
+    assert "storage.deserialize" not in {event.name for event in seen}
+    assert seen[-1].name == "ledger.load" and seen[-1].depth == 0
+    assert "storage.read_snapshot" in collector.report()
+
+
+def test_spans_are_free_when_disabled() -> None:
+    assert tracing.span("anything") is tracing.span("something else")
+
+
+def test_profile_flag_reports_and_writes_chrome_trace(
+    tmp_path: Path, capsys: pytest.CaptureFixture[str]
+) -> None:
+    storage_path = tmp_path / "data.json"
+    main(["--storage", str(storage_path), "record", "spend", "3"])
+    capsys.readouterr()
+
+    trace = tmp_path / "trace.json"
+    output = main(
+        ["--storage", str(storage_path), "--profile-output", str(trace), "summary", "--check"]
+    )
+    captured = capsys.readouterr()
+    assert captured.out.strip() == output
+    assert "cli.summary" in captured.err
+    assert "storage.load_state" in captured.err
+
+    events = json.loads(trace.read_text())["traceEvents"]
+    assert {"cli.summary", "ledger.load"} <= {event["name"] for event in events}
+    assert all(event["ph"] == "X" for event in events)
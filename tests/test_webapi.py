@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import contextlib
+import json
+from pathlib import Path
+import threading
+from typing import Any, Dict, Iterator, Optional, Tuple
+from urllib.error import HTTPError
+from urllib.request import Request, urlopen
+
+from allowance.cli import main
+from allowance.planner import AllowanceLedger
+from allowance.webapi import LedgerFeed, WebServer
+
+
+@contextlib.contextmanager
+def serve_ledger(storage: Path) -> Iterator[Tuple[str, WebServer]]:
+    server = WebServer(("127.0.0.1", 0), AllowanceLedger.load(storage), quiet=True)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}", server
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join(5)
+
+
+def fetch(
+    url: str, etag: Optional[str] = None, body: Optional[Dict[str, Any]] = None
+) -> Tuple[int, Dict[str, Any], Optional[str]]:
+    headers = {"If-None-Match": etag} if etag else {}
+    data = None
+    if body is not None:
+        data = json.dumps(body).encode("utf-8")
+        headers["Content-Type"] = "application/json"
+    try:
+        with urlopen(Request(url, data=data, headers=headers)) as response:
+            return response.status, json.loads(response.read()), response.headers["ETag"]
+    except HTTPError as exc:
+        payload = exc.read()
+        return exc.code, json.loads(payload) if payload else {}, exc.headers["ETag"]
+
+
+def test_pages_follow_the_cursor(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    ledger = AllowanceLedger.load(storage)
+    ledger.set_plan(50, {"spend": 30})
+    for amount in range(1, 6):
+        ledger.add_transaction("spend", amount, f"item {amount}")
+
+    with serve_ledger(storage) as (base, _):
+        status, page, _ = fetch(f"{base}/api/transactions?limit=2")
+        assert status == 200
+        assert [row["cents"] for row in page["transactions"]] == [100, 200]
+        seen = [row["id"] for row in page["transactions"]]
+        while page["next_cursor"] is not None:
+            _, page, _ = fetch(f"{base}/api/transactions?cursor={page['next_cursor']}&limit=2")
+            seen += [row["id"] for row in page["transactions"]]
+        assert seen == [0, 1, 2, 3, 4]
+
+        status, error, _ = fetch(f"{base}/api/transactions?cursor=-1")
+        assert status == 400
+        assert "cursor" in error["error"]
+
+
+def test_summary_etag_and_change_feed(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    AllowanceLedger.load(storage).set_plan(20, {"spend": 10})
+
+    with serve_ledger(storage) as (base, _):
+        status, summary, etag = fetch(f"{base}/api/summary")
+        assert status == 200
+        assert summary["plan"] == {"income_cents": 2000, "allocation_cents": {"spend": 1000}}
+        assert etag == f'"{summary["version"]}"'
+        assert fetch(f"{base}/api/summary", etag)[0] == 304
+
+        version = summary["version"]
+        assert fetch(f"{base}/api/changes?since={version}", etag)[0] == 304
+
+        status, created, _ = fetch(
+            f"{base}/api/transactions", body={"category": "spend", "amount": 4, "description": "Snacks"}
+        )
+        assert status == 201
+        assert created["transaction"]["cents"] == 400
+        assert fetch(f"{base}/api/summary", etag)[0] == 200
+
+        _, delta, new_etag = fetch(f"{base}/api/changes?since={version}", etag)
+        assert delta["reset"] is False
+        assert [row["description"] for row in delta["transactions"]] == ["Snacks"]
+        assert "plan" not in delta
+        assert new_etag == f'"{delta["version"]}"'
+
+        fetch(f"{base}/api/plan", body={"income": 30, "allocation": {"spend": 15}})
+        _, delta, _ = fetch(f"{base}/api/changes?since={delta['version']}")
+        assert delta["transactions"] == []
+        assert delta["plan"]["income_cents"] == 3000
+
+        _, stale, _ = fetch(f"{base}/api/changes?since=00000000.0.0")
+        assert stale["reset"] is True
+        assert stale["spent_cents"] == {"spend": 400}
+
+    assert AllowanceLedger.load(storage).state.spent_for("spend") == 4
+
+
+def test_etag_reflects_writes_from_other_processes(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    AllowanceLedger.load(storage).set_plan(20, {"spend": 10})
+
+    with serve_ledger(storage) as (base, _):
+        _, summary, etag = fetch(f"{base}/api/summary")
+        main(["--storage", str(storage), "record", "spend", "4"])
+        status, summary, _ = fetch(f"{base}/api/summary", etag)
+        assert status == 200
+        assert summary["spent_cents"] == {"spend": 400}
+
+        main(["--storage", str(storage), "record", "spend", "1"])
+        status, delta, _ = fetch(f"{base}/api/changes?since={summary['version']}", etag)
+        assert status == 200
+        assert delta["spent_cents"] == {"spend": 500}
+
+
+def test_change_feed_is_paged(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    with serve_ledger(storage) as (base, server):
+        version = server.feed.version
+        for amount in (1, 2, 3):
+            fetch(f"{base}/api/transactions", body={"category": "save", "amount": amount})
+        _, first, _ = fetch(f"{base}/api/changes?since={version}&limit=2")
+        _, rest, _ = fetch(f"{base}/api/changes?since={first['version']}&limit=2")
+        rows = first["transactions"] + rest["transactions"]
+        assert [row["cents"] for row in rows] == [100, 200, 300]
+        assert rest["version"] == server.feed.version
+
+        status, error, _ = fetch(f"{base}/api/transactions", body={"category": "toys", "amount": 1})
+        assert status == 400
+
+
+def test_static_files_are_served(tmp_path: Path) -> None:
+    with serve_ledger(tmp_path / "data.json") as (base, _):
+        with urlopen(f"{base}/index.html") as response:
+            assert b"tx-form" in response.read()
+
+
+def test_feed_keeps_records_written_by_other_processes(tmp_path: Path) -> None:
+    storage = tmp_path / "data.json"
+    AllowanceLedger.load(storage).add_transaction("spend", 1.0)
+    feed = LedgerFeed(AllowanceLedger.load(storage))
+    version = feed.version
+
+    main(["--storage", str(storage), "record", "spend", "2"])
+    feed.record("spend", 3.0)
+    assert [txn.amount for txn in AllowanceLedger.load(storage).state.transactions] == [1.0, 2.0, 3.0]
+    # The reload started a new epoch, so clients holding old versions start over.
+    assert feed.changes(version)["reset"] is True
+    assert feed.summary()["transaction_count"] == 3